@@ -1,15 +1,17 @@
 from datetime import datetime, timedelta, timezone
 from jose import jwt  # pyright: ignore[reportMissingModuleSource]
-from passlib.context import CryptContext  # pyright: ignore[reportMissingModuleSource]
 from fastapi import Depends, HTTPException, status  # pyright: ignore[reportMissingImports]
 from fastapi.security import OAuth2PasswordBearer  # pyright: ignore[reportMissingImports]
 from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
+from redis.exceptions import RedisError  # pyright: ignore[reportMissingImports]
 from .config import settings
 from .database import get_db
-from .models import UserBase
+from .models import UserBase, RoleEnum
+from .redis_client import redis_client, async_redis_client
+from .services.user_cache import user_cache
+from .services.passwords import pwd_context
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 
@@ -29,20 +31,113 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserBase:
-    credentials_exception = HTTPException(
+def _version_key(user_id: int) -> str:
+    return f"auth:ver:{user_id}"
+
+
+def token_version(user_id: int) -> int:
+    return int(redis_client.get(_version_key(user_id)) or 0)
+
+
+async def token_version_async(user_id: int) -> int:
+    return int(await async_redis_client.get(_version_key(user_id)) or 0)
+
+
+async def revoke_user_tokens_async(user_id: int) -> int:
+    """Invalidate every token issued to the user so far (effective with AUTH_REVOCATION_CHECK=1)."""
+    return await async_redis_client.incr(_version_key(user_id))
+
+
+def create_user_token(user_id: int, username: str, role: RoleEnum, student_id: int | None = None, teacher_id: int | None = None, version: int | None = None) -> str:
+    """Access token whose claims are enough for role checks and sign-in without a user query."""
+    claims = {"sub": username, "uid": user_id, "role": role.value}
+    if student_id is not None:
+        claims["sid"] = student_id
+    if teacher_id is not None:
+        claims["tid"] = teacher_id
+    if version is not None:
+        claims["ver"] = version
+    return create_access_token(claims)
+
+
+class TokenUser:
+    """The caller as described by a verified access token."""
+
+    __slots__ = ("user_id", "username", "role", "student_id", "teacher_id", "version")
+
+    def __init__(self, user_id: int, username: str, role: RoleEnum, student_id: int | None = None, teacher_id: int | None = None, version: int = 0):
+        self.user_id = user_id
+        self.username = username
+        self.role = role
+        self.student_id = student_id
+        self.teacher_id = teacher_id
+        self.version = version
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _token_username(token: str) -> str:
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
         username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except Exception:
-        raise credentials_exception
+        raise _credentials_exception()
+    if username is None:
+        raise _credentials_exception()
+    return username
+
+
+def _token_user(token: str) -> TokenUser:
+    try:
+        payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+        # tokens issued before claims were added carry no uid; their holders must log in again
+        return TokenUser(int(payload["uid"]), payload["sub"], RoleEnum(payload["role"]), payload.get("sid"), payload.get("tid"), payload.get("ver", 0))
+    except Exception:
+        raise _credentials_exception()
+
+
+def _revocation_unavailable() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="认证服务暂不可用，请稍后重试")
+
+
+def get_token_user(token: str = Depends(oauth2_scheme)) -> TokenUser:
+    user = _token_user(token)
+    if settings.auth_revocation_check:
+        try:
+            current = token_version(user.user_id)
+        except RedisError:
+            raise _revocation_unavailable()
+        if user.version != current:
+            raise _credentials_exception()
+    return user
+
+
+async def get_token_user_async(token: str = Depends(oauth2_scheme)) -> TokenUser:
+    user = _token_user(token)
+    if settings.auth_revocation_check:
+        try:
+            current = await token_version_async(user.user_id)
+        except RedisError:
+            raise _revocation_unavailable()
+        if user.version != current:
+            raise _credentials_exception()
+    return user
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserBase:
+    username = _token_username(token)
+    cached = user_cache.get(username)
+    if cached is not None:
+        return db.merge(cached, load=False)
     user = db.query(UserBase).filter(UserBase.username == username).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    user_cache.put(user)
     return user
+
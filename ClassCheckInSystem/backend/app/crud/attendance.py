@@ -1,20 +1,111 @@
 from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
+from sqlalchemy.ext.asyncio import AsyncSession  # pyright: ignore[reportMissingImports]
+from sqlalchemy import insert, select  # pyright: ignore[reportMissingImports]
+from sqlalchemy.dialects import mysql, postgresql, sqlite  # pyright: ignore[reportMissingImports]
 from datetime import datetime
 from ..models import AttendanceRecord, RecordStatus, SignMethod
 
 
+# Columns of record listings and exports, selected as plain rows instead of ORM objects.
+RECORD_LIST_COLUMNS = (
+    AttendanceRecord.record_id,
+    AttendanceRecord.course_id,
+    AttendanceRecord.student_id,
+    AttendanceRecord.status,
+    AttendanceRecord.sign_method,
+    AttendanceRecord.sign_time,
+)
+RECORD_LIST_FIELDS = tuple(c.key for c in RECORD_LIST_COLUMNS)
+
+
+def record_list_select(*criteria):
+    return select(*RECORD_LIST_COLUMNS).where(*criteria)
+
+
+def record_list_item(row) -> dict:
+    record_id, course_id, student_id, status, method, sign_time = row
+    return {
+        "record_id": record_id,
+        "course_id": course_id,
+        "student_id": student_id,
+        "status": status.value,
+        "sign_method": method.value if method is not None else None,
+        "sign_time": sign_time.isoformat() if sign_time else None,
+    }
+
+
+def record_values(*, course_id: int, student_id: int, status: RecordStatus, method: SignMethod, remark: str | None = None, lng: str | None = None, lat: str | None = None, sign_time: datetime | None = None) -> dict:
+    return {
+        "course_id": course_id,
+        "student_id": student_id,
+        "sign_time": sign_time or datetime.utcnow(),
+        "status": status,
+        "sign_method": method,
+        "remark": remark,
+        "sign_location_lng": lng,
+        "sign_location_lat": lat,
+    }
+
+
 def create_record(db: Session, *, course_id: int, student_id: int, status: RecordStatus, method: SignMethod, remark: str | None = None, lng: str | None = None, lat: str | None = None) -> AttendanceRecord:
-    rec = AttendanceRecord(
-        course_id=course_id,
-        student_id=student_id,
-        sign_time=datetime.utcnow(),
-        status=status,
-        sign_method=method,
-        remark=remark,
-        sign_location_lng=lng,
-        sign_location_lat=lat,
-    )
+    rec = AttendanceRecord(**record_values(course_id=course_id, student_id=student_id, status=status, method=method, remark=remark, lng=lng, lat=lat))
     db.add(rec)
     db.commit()
     db.refresh(rec)
     return rec
+
+
+async def create_record_async(db: AsyncSession, *, course_id: int, student_id: int, status: RecordStatus, method: SignMethod, remark: str | None = None, lng: str | None = None, lat: str | None = None) -> AttendanceRecord:
+    rec = AttendanceRecord(**record_values(course_id=course_id, student_id=student_id, status=status, method=method, remark=remark, lng=lng, lat=lat))
+    db.add(rec)
+    await db.commit()
+    return rec
+
+
+def bulk_insert_records(db: Session, rows: list[dict]) -> list[int | None]:
+    """Insert ``rows`` as one multi-row INSERT without committing.
+
+    Returns the new record ids in input order when the dialect can report them
+    for executemany (SQLite, MariaDB, PostgreSQL); MySQL yields ``None`` per row.
+    """
+    if not rows:
+        return []
+    dialect = db.get_bind().dialect
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        stmt = insert(AttendanceRecord).returning(AttendanceRecord.record_id, sort_by_parameter_order=True)
+        return list(db.scalars(stmt, rows))
+    db.execute(insert(AttendanceRecord), rows)
+    return [None] * len(rows)
+
+
+def insert_records_ignoring_duplicates(db: Session, rows: list[dict]) -> int:
+    """Insert ``rows`` as a single multi-row INSERT, skipping rows whose ``sign_key`` already exists.
+
+    Only the unique-key conflict is absorbed; any other error (foreign key,
+    truncation) still raises. Returns the number of rows actually inserted;
+    does not commit.
+    """
+    if not rows:
+        return 0
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        # not INSERT IGNORE, which also turns data errors into warnings. The no-op update is
+        # counted as a found row (FOUND_ROWS), so the inserted count comes from the keys seen before
+        present = len(record_ids_by_sign_key(db, [row["sign_key"] for row in rows]))
+        stmt = mysql.insert(AttendanceRecord).values(rows)
+        db.execute(stmt.on_duplicate_key_update(sign_key=AttendanceRecord.sign_key))
+        return len(rows) - present
+    elif dialect == "postgresql":
+        stmt = postgresql.insert(AttendanceRecord).on_conflict_do_nothing(index_elements=["sign_key"])
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(AttendanceRecord).on_conflict_do_nothing(index_elements=["sign_key"])
+    else:
+        stmt = insert(AttendanceRecord)
+    return db.execute(stmt.values(rows)).rowcount
+
+
+def record_ids_by_sign_key(db: Session, keys: list[str]) -> dict[str, int]:
+    if not keys:
+        return {}
+    rows = db.execute(select(AttendanceRecord.sign_key, AttendanceRecord.record_id).where(AttendanceRecord.sign_key.in_(keys)))
+    return dict(rows.all())
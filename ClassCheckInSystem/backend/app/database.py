@@ -1,11 +1,101 @@
-from typing import Generator
-from sqlalchemy import create_engine  # pyright: ignore[reportMissingImports]
+import time
+from typing import AsyncGenerator, Generator
+from sqlalchemy import create_engine, event  # pyright: ignore[reportMissingImports]
+from sqlalchemy.engine import make_url  # pyright: ignore[reportMissingImports]
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeout  # pyright: ignore[reportMissingImports]
 from sqlalchemy.orm import sessionmaker, DeclarativeBase  # pyright: ignore[reportMissingImports]
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool  # pyright: ignore[reportMissingImports]
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine  # pyright: ignore[reportMissingImports]
 from .config import settings
+from . import metrics
 
 
-engine = create_engine(settings.db_url, pool_pre_ping=True, pool_recycle=3600)
+def timed_pool(name: str, base=QueuePool):
+    """``base`` subclass that records how long each checkout waited for a free connection."""
+    wait = metrics.latency(f"db.pool.{name}.checkout_wait")
+    timeouts = metrics.counter(f"db.pool.{name}.checkout_timeouts")
+
+    class TimedPool(base):
+        def _do_get(self):
+            started = time.perf_counter()
+            try:
+                return super()._do_get()
+            except PoolTimeout:
+                timeouts.inc()
+                raise
+            finally:
+                wait.observe(time.perf_counter() - started)
+
+    TimedPool.__name__ = f"{base.__name__}[{name}]"
+    return TimedPool
+
+
+# SET statements take milliseconds, 0 = no limit. MySQL's max_execution_time only applies to SELECT.
+TIMEOUT_SQL = {"mysql": "SET SESSION max_execution_time = {}", "postgresql": "SET statement_timeout = {}"}
+
+
+def apply_statement_timeout(sync_engine, default_ms: int) -> None:
+    """Per-statement time limit for ``sync_engine``'s connections.
+
+    ``default_ms`` applies unless a statement sets the ``timeout_ms``
+    execution option (0 lifts the limit, e.g. for exports). MySQL and
+    PostgreSQL enforce it server-side; SQLite interrupts the statement from
+    a progress handler.
+    """
+    backend = sync_engine.dialect.name
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        record.info["timeout_ms"] = None
+        if backend == "sqlite":
+            deadline = record.info["deadline"] = [0.0]
+
+            def expired():
+                return int(0 < deadline[0] < time.monotonic())
+
+            if hasattr(dbapi_conn, "run_async"):  # aiosqlite: install on the driver's own thread
+                dbapi_conn.run_async(lambda driver_conn: driver_conn.set_progress_handler(expired, 10000))
+            else:
+                dbapi_conn.set_progress_handler(expired, 10000)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        timeout_ms = int(context.execution_options.get("timeout_ms", default_ms)) if context is not None else default_ms
+        info = conn.info
+        if backend == "sqlite":
+            if "deadline" in info:
+                info["deadline"][0] = time.monotonic() + timeout_ms / 1000 if timeout_ms else 0.0
+        elif backend in TIMEOUT_SQL and info.get("timeout_ms") != timeout_ms:
+            cur = conn.connection.dbapi_connection.cursor()
+            cur.execute(TIMEOUT_SQL[backend].format(timeout_ms))
+            cur.close()
+            info["timeout_ms"] = timeout_ms
+
+
+def is_statement_timeout(exc: DBAPIError) -> bool:
+    orig = exc.orig
+    code = getattr(orig, "args", [None])[0] if getattr(orig, "args", None) else None
+    # MySQL 3024 (max_execution_time), PostgreSQL 57014 (query_canceled), sqlite3 "interrupted"
+    return code == 3024 or getattr(orig, "pgcode", None) == "57014" or "interrupted" in str(orig)
+
+
+def _pool_args(name: str, size: int, overflow: int, timeout: float, base=QueuePool) -> dict:
+    return dict(poolclass=timed_pool(name, base), pool_size=size, max_overflow=overflow, pool_timeout=timeout, pool_pre_ping=True, pool_recycle=3600)
+
+
+# two pools so report load can never take the connections sign-ins need:
+# the OLTP pool (get_db / get_async_db) and the bounded analytics pool (get_read_db), which
+# reads from READ_DB_URL when set and otherwise opens its own connections to the primary
+engine = create_engine(settings.db_url, **_pool_args("oltp", settings.db_pool_size, settings.db_max_overflow, settings.db_pool_timeout))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+read_engine = create_engine(
+    settings.read_db_url or settings.db_url,
+    **_pool_args("analytics", settings.analytics_pool_size, settings.analytics_max_overflow, settings.analytics_pool_timeout),
+)
+apply_statement_timeout(read_engine, settings.analytics_statement_timeout_ms)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+metrics.gauge("db.pool.oltp.checked_out", lambda: engine.pool.checkedout())
+metrics.gauge("db.pool.analytics.checked_out", lambda: read_engine.pool.checkedout())
 
 
 class Base(DeclarativeBase):
@@ -18,3 +108,64 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+
+def get_read_db() -> Generator:
+    """Analytics-pool session (read replica if configured); for routes that only read."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+ASYNC_DRIVERS = {"mysql": "aiomysql", "sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def async_url(url: str) -> str:
+    """Swap the sync DBAPI in ``url`` for its asyncio counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"no async driver known for {backend}")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+_async_engine = None
+_async_session_factory = None
+_async_read_session_factory = None
+
+
+def get_async_engine():
+    # created on first use so the async driver is only required by async routes
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            settings.async_db_url or async_url(settings.db_url),
+            **_pool_args("oltp_async", settings.db_pool_size, settings.db_max_overflow, settings.db_pool_timeout, AsyncAdaptedQueuePool),
+        )
+        _async_session_factory = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    get_async_engine()
+    return _async_session_factory()
+
+
+def AsyncReadSessionLocal() -> AsyncSession:
+    """Async session on the analytics pool, for streamed reports."""
+    global _async_read_session_factory
+    if _async_read_session_factory is None:
+        read = create_async_engine(
+            settings.async_read_db_url or async_url(settings.read_db_url or settings.db_url),
+            **_pool_args("analytics_async", settings.analytics_pool_size, settings.analytics_max_overflow, settings.analytics_pool_timeout, AsyncAdaptedQueuePool),
+        )
+        apply_statement_timeout(read.sync_engine, settings.analytics_statement_timeout_ms)
+        _async_read_session_factory = async_sessionmaker(read, autoflush=False, expire_on_commit=False)
+    return _async_read_session_factory()
+
+
+async def get_async_db() -> AsyncGenerator:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,123 @@
+import math
+import random
+from contextlib import asynccontextmanager
+from fastapi import HTTPException  # pyright: ignore[reportMissingImports]
+from redis.exceptions import RedisError  # pyright: ignore[reportMissingImports]
+from ..config import settings
+from ..schemas import BatchSignItem
+from ..redis_client import async_redis_client
+from .. import metrics
+
+
+# Takes ARGV[1] tokens from every bucket in KEYS, or from none of them.
+# ARGV = cost, rate_1, burst_1, rate_2, burst_2, ...; returns "0" when admitted,
+# otherwise the seconds until the emptiest bucket can pay again. A bucket pays
+# once it holds min(cost, burst) tokens and may then go negative, so a batch
+# larger than the burst is admitted and later requests wait off its debt.
+TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local tokens = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 2])
+  local burst = tonumber(ARGV[i * 2 + 1])
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local level = tonumber(state[1]) or burst
+  local ts = tonumber(state[2]) or now
+  level = math.min(burst, level + (now - ts) / 1000 * rate)
+  tokens[i] = level
+  local need = math.min(cost, burst)
+  if level < need then
+    wait = math.max(wait, (need - level) / rate)
+  end
+end
+if wait > 0 then
+  return tostring(wait)
+end
+for i, key in ipairs(KEYS) do
+  local rate = tonumber(ARGV[i * 2])
+  local burst = tonumber(ARGV[i * 2 + 1])
+  redis.call('HSET', key, 'tokens', tokens[i] - cost, 'ts', now)
+  redis.call('PEXPIRE', key, math.ceil((burst + math.max(0, cost - tokens[i])) / rate * 1000) + 1000)
+end
+return "0"
+"""
+
+_take_tokens = async_redis_client.register_script(TOKEN_BUCKET_LUA)
+_inflight = 0
+
+admitted = metrics.counter("admission.admitted")
+shed_rate = metrics.counter("admission.shed_rate")
+shed_inflight = metrics.counter("admission.shed_inflight")
+redis_errors = metrics.counter("admission.redis_errors")
+metrics.gauge("admission.inflight", lambda: _inflight)
+
+
+def _reject(wait_seconds: float) -> HTTPException:
+    # jitter spreads the retries of a rejected wave instead of re-synchronising it
+    delay = wait_seconds + random.uniform(0, settings.admission_jitter_seconds)
+    return HTTPException(
+        status_code=429,
+        detail="签到人数过多，请稍后重试",
+        headers={"Retry-After": str(max(1, math.ceil(delay)))},
+    )
+
+
+def check_admission_settings() -> None:
+    """Fail at startup on bucket settings the Lua script cannot work with (a zero rate never refills)."""
+    if not settings.admission_enabled:
+        return
+    for name in ("admission_global_rate", "admission_course_rate", "admission_global_burst", "admission_course_burst", "admission_max_inflight"):
+        if getattr(settings, name) <= 0:
+            raise ValueError(f"{name.upper()} must be positive when ADMISSION_ENABLED=1")
+
+
+@asynccontextmanager
+async def _admission(keys: list[str], args: list, cost: int):
+    global _inflight
+    if _inflight >= settings.admission_max_inflight:
+        shed_inflight.inc()
+        raise _reject(0.5)
+    try:
+        wait = float(await _take_tokens(keys=keys, args=[cost, *args]))
+    except RedisError:
+        redis_errors.inc()
+        wait = 0.0
+    if wait > 0:
+        shed_rate.inc()
+        raise _reject(wait)
+    admitted.inc()
+    _inflight += 1
+    try:
+        yield
+    finally:
+        _inflight -= 1
+
+
+async def admit_signin(course_id: int | None = None):
+    """Shed sign-in requests fast (429 + Retry-After) instead of queueing them.
+
+    A per-process in-flight cap protects this worker; global and per-course
+    token buckets in Redis protect the shared database. Redis errors fail open.
+    """
+    if not settings.admission_enabled:
+        yield
+        return
+    keys = ["admission:signin:global"]
+    args = [settings.admission_global_rate, settings.admission_global_burst]
+    if course_id is not None:
+        keys.append(f"admission:signin:course:{course_id}")
+        args += [settings.admission_course_rate, settings.admission_course_burst]
+    async with _admission(keys, args, 1):
+        yield
+
+
+async def admit_signin_batch(items: list[BatchSignItem]):
+    """Admission for ``/student/sign/batch``: one global token per item, since each item is a row."""
+    if not settings.admission_enabled:
+        yield
+        return
+    async with _admission(["admission:signin:global"], [settings.admission_global_rate, settings.admission_global_burst], max(1, len(items))):
+        yield
@@ -0,0 +1,56 @@
+import base64
+import json
+from fastapi import HTTPException, Query  # pyright: ignore[reportMissingImports]
+from ..config import settings
+
+
+class PageParams:
+    """Keyset page request: rows with key below ``after`` (newest first), at most ``limit`` of them."""
+
+    __slots__ = ("after", "limit")
+
+    def __init__(self, after: int | None, limit: int):
+        self.after = after
+        self.limit = limit
+
+
+def encode_cursor(key: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"k": key}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["k"]
+        if isinstance(key, int):
+            return key
+    except Exception:
+        pass
+    raise HTTPException(status_code=400, detail="无效的分页游标")
+
+
+def page_params(default_limit: int):
+    def _params(
+        cursor: str | None = Query(None, description="上一页返回的 next_cursor"),
+        limit: int = Query(default_limit, ge=1, le=settings.page_size_max),
+    ) -> PageParams:
+        return PageParams(decode_cursor(cursor) if cursor else None, limit)
+    return _params
+
+
+def keyset(query, key_column, page: PageParams):
+    """Apply the keyset to an ORM ``Query`` or Core ``Select`` (one extra row detects the last page)."""
+    if page.after is not None:
+        query = query.filter(key_column < page.after)
+    return query.order_by(key_column.desc()).limit(page.limit + 1)
+
+
+def split_page(rows: list, key_column, page: PageParams) -> tuple[list, str | None]:
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[:page.limit]
+    return rows, encode_cursor(getattr(rows[-1], key_column.key))
+
+
+def paginate(query, key_column, page: PageParams) -> tuple[list, str | None]:
+    """Run a keyset page of an ORM query; returns (rows, next_cursor or None on the last page)."""
+    return split_page(keyset(query, key_column, page).all(), key_column, page)
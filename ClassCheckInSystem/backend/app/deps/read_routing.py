@@ -0,0 +1,59 @@
+from typing import Generator
+from redis.exceptions import RedisError  # pyright: ignore[reportMissingImports]
+from ..config import settings
+from ..database import ReadSessionLocal, SessionLocal
+from ..redis_client import redis_client, async_redis_client
+from .. import metrics
+
+
+primary_reads = metrics.counter("read_routing.primary")
+replica_reads = metrics.counter("read_routing.replica")
+
+
+def _wrote_key(student_id: int) -> str:
+    return f"ryw:student:{student_id}"
+
+
+def note_writes(student_ids) -> None:
+    """Pin these students' own reads to the primary for READ_YOUR_WRITES_SECONDS."""
+    if not settings.read_db_url:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for student_id in set(student_ids):
+            pipe.set(_wrote_key(student_id), 1, ex=settings.read_your_writes_seconds)
+        pipe.execute()
+    except RedisError:
+        pass  # readers treat an unreachable Redis as "recently wrote"
+
+
+async def note_writes_async(student_ids) -> None:
+    if not settings.read_db_url:
+        return
+    try:
+        pipe = async_redis_client.pipeline(transaction=False)
+        for student_id in set(student_ids):
+            pipe.set(_wrote_key(student_id), 1, ex=settings.read_your_writes_seconds)
+        await pipe.execute()
+    except RedisError:
+        pass
+
+
+def _recently_wrote(student_id: int) -> bool:
+    try:
+        return bool(redis_client.exists(_wrote_key(student_id)))
+    except RedisError:
+        return True
+
+
+def get_student_read_db(student_id: int) -> Generator:
+    """Replica session for a student's own records, unless they signed in within the lag window."""
+    use_primary = False
+    if settings.read_db_url:
+        use_primary = _recently_wrote(student_id)
+        (primary_reads if use_primary else replica_reads).inc()
+    db = SessionLocal() if use_primary else ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
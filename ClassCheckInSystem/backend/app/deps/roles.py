@@ -1,11 +1,20 @@
 from typing import Iterable
 from fastapi import Depends, HTTPException, status
-from ..auth import get_current_user
-from ..models import UserBase, RoleEnum
+from ..auth import TokenUser, get_token_user, get_token_user_async
+from ..models import RoleEnum
 
 
 def require_roles(*roles: Iterable[RoleEnum]):
-    def _checker(user: UserBase = Depends(get_current_user)) -> UserBase:
+    """Role check from token claims alone; use ``get_current_user`` where the full row is needed."""
+    def _checker(user: TokenUser = Depends(get_token_user)) -> TokenUser:
+        if roles and user.role not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="权限不足")
+        return user
+    return _checker
+
+
+def require_roles_async(*roles: Iterable[RoleEnum]):
+    async def _checker(user: TokenUser = Depends(get_token_user_async)) -> TokenUser:
         if roles and user.role not in roles:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="权限不足")
         return user
@@ -0,0 +1,34 @@
+from sqlalchemy import inspect  # pyright: ignore[reportMissingImports]
+from sqlalchemy.schema import CreateColumn  # pyright: ignore[reportMissingImports]
+from ..database import engine, Base
+from .. import models  # noqa: F401  (register tables on Base.metadata)
+
+
+def run():
+    """Bring an existing database up to the current models.
+
+    Creates missing tables, then adds columns and indexes that were introduced
+    after a table was first created (``create_all`` skips existing tables).
+    Safe to run repeatedly.
+    """
+    Base.metadata.create_all(bind=engine)
+    insp = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            columns = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name not in columns:
+                    ddl = CreateColumn(col).compile(dialect=engine.dialect)
+                    conn.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}")
+                    print(f"added column {table.name}.{col.name}")
+            indexes = {i["name"] for i in insp.get_indexes(table.name)}
+            for idx in table.indexes:
+                if idx.name not in indexes:
+                    idx.create(conn)
+                    print(f"created index {idx.name}")
+    print("Migration done.")
+
+
+if __name__ == "__main__":
+    run()
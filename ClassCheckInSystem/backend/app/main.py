@@ -1,11 +1,53 @@
-from fastapi import FastAPI  # pyright: ignore[reportMissingImports]
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request  # pyright: ignore[reportMissingImports]
+from fastapi.responses import JSONResponse  # pyright: ignore[reportMissingImports]
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeout  # pyright: ignore[reportMissingImports]
 from fastapi.middleware.cors import CORSMiddleware  # pyright: ignore[reportMissingImports]
+from . import metrics
+from .config import settings
+from .database import SessionLocal, is_statement_timeout
+from .deps.admission import check_admission_settings
 from .routers.common import router as common_router
 from .routers.student import router as student_router
 from .routers.teacher import router as teacher_router
 from .routers.admin import router as admin_router
+from .services.signin_buffer import SignInFailed, signin_buffer
+from .services.geofence import geofence_reloader, load_geofences
+from .services.user_cache import user_cache
+from .services.passwords import password_pool
+from .services.export_jobs import export_jobs
+from .services.daily_stats import rollup_refresher
 
-app = FastAPI(title="ClassCheckIn System API")
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_admission_settings()
+    try:
+        with SessionLocal() as db:
+            load_geofences(db)
+    except Exception:
+        logger.exception("could not load classroom geofences; location sign-in falls back to client room coordinates")
+    geofence_reloader.start()
+    if settings.signin_mode == "buffer":
+        signin_buffer.start()
+    if settings.user_cache_size > 0:
+        user_cache.start()
+    if settings.rollup_refresh_seconds > 0:
+        rollup_refresher.start()
+    yield
+    rollup_refresher.stop()
+    geofence_reloader.stop()
+    user_cache.stop()
+    password_pool.shutdown()
+    export_jobs.shutdown()
+    # drain queued sign-ins before the process exits
+    signin_buffer.stop()
+
+
+app = FastAPI(title="ClassCheckIn System API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,6 +57,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(PoolTimeout)
+async def pool_exhausted(request: Request, exc: PoolTimeout):
+    return JSONResponse(status_code=503, content={"detail": "服务繁忙，请稍后重试"}, headers={"Retry-After": "2"})
+
+
+@app.exception_handler(SignInFailed)
+async def signin_failed(request: Request, exc: SignInFailed):
+    return JSONResponse(status_code=503, content={"detail": "签到写入失败，请重试"})
+
+
+@app.exception_handler(DBAPIError)
+async def database_error(request: Request, exc: DBAPIError):
+    if is_statement_timeout(exc):
+        return JSONResponse(status_code=504, content={"detail": "查询超时，请缩小查询范围"})
+    raise exc
+
+
 app.include_router(common_router)
 app.include_router(student_router)
 app.include_router(teacher_router)
@@ -24,3 +83,8 @@ app.include_router(admin_router)
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics")
+async def metrics_snapshot():
+    return metrics.snapshot()
@@ -0,0 +1,93 @@
+import threading
+from collections import deque
+
+
+class Counter:
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def snapshot(self) -> int:
+        return self._value
+
+
+class LatencyStats:
+    """Count/avg/max over all observations, percentiles over a recent window."""
+
+    def __init__(self, window: int = 2048):
+        self._lock = threading.Lock()
+        self._recent: deque = deque(maxlen=window)
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._recent.append(seconds)
+            self._count += 1
+            self._total += seconds
+            self._max = max(self._max, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            count, total, peak = self._count, self._total, self._max
+        if not recent:
+            return {"count": 0}
+
+        def pct(p: float) -> float:
+            return round(recent[min(len(recent) - 1, int(p * len(recent)))] * 1000, 3)
+
+        return {
+            "count": count,
+            "avg_ms": round(total / count * 1000, 3),
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "max_ms": round(peak * 1000, 3),
+        }
+
+
+class Gauge:
+    """Reports the current value of ``fn`` at snapshot time."""
+
+    def __init__(self, fn):
+        self._fn = fn
+
+    def snapshot(self):
+        return self._fn()
+
+
+_registry: dict = {}
+_registry_lock = threading.Lock()
+
+
+def _get(name: str, factory):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = factory()
+        return metric
+
+
+def counter(name: str) -> Counter:
+    return _get(name, Counter)
+
+
+def latency(name: str) -> LatencyStats:
+    return _get(name, LatencyStats)
+
+
+def gauge(name: str, fn) -> Gauge:
+    with _registry_lock:
+        metric = _registry[name] = Gauge(fn)
+        return metric
+
+
+def snapshot() -> dict:
+    with _registry_lock:
+        items = list(_registry.items())
+    return {name: metric.snapshot() for name, metric in sorted(items)}
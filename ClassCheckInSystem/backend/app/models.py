@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Text  # pyright: ignore[reportMissingImports]
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Enum, Text, Index, Float  # pyright: ignore[reportMissingImports]
 from sqlalchemy.orm import relationship  # pyright: ignore[reportMissingImports]
 from .database import Base
 import enum
@@ -84,6 +84,24 @@ class ClassCourse(Base):
     course_id = Column(Integer, ForeignKey("course.course_id"), nullable=False)
 
 
+class Classroom(Base):
+    __tablename__ = "classroom"
+    room_id = Column(Integer, primary_key=True, autoincrement=True)
+    room_name = Column(String(50), nullable=False)
+    lng = Column(Float, nullable=False)
+    lat = Column(Float, nullable=False)
+    radius_m = Column(Integer, default=100)
+    # optional JSON list of [lng, lat] vertices; overrides the radius fence when set
+    polygon = Column(Text)
+
+
+class CourseRoom(Base):
+    __tablename__ = "course_room"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    course_id = Column(Integer, ForeignKey("course.course_id"), nullable=False)
+    room_id = Column(Integer, ForeignKey("classroom.room_id"), nullable=False)
+
+
 class RecordStatus(str, enum.Enum):
     present = "Present"
     absent = "Absent"
@@ -111,6 +129,51 @@ class AttendanceRecord(Base):
     sign_location_address = Column(String(255))
     status = Column(Enum(RecordStatus), nullable=False)
     remark = Column(String(255))
+    # idempotency key for asynchronously ingested sign-ins (Redis stream entry id)
+    sign_key = Column(String(64))
+
+    __table_args__ = (
+        Index("uq_attendance_sign_key", "sign_key", unique=True),
+        # attendance_rate: counts per course and per (course, status)
+        Index("ix_attendance_course_status", "course_id", "status"),
+        # session reconcile / absentee job / query_records by course and time window
+        Index("ix_attendance_course_time", "course_id", "sign_time"),
+        # personal_records and query_records by student/class, newest first
+        Index("ix_attendance_student_record", "student_id", "record_id"),
+        Index("ix_attendance_class_record", "class_id", "record_id"),
+        # export_report / statistics_trend date ranges (status filters present rows)
+        Index("ix_attendance_time_status", "sign_time", "status"),
+    )
+
+
+class AttendanceDailyStats(Base):
+    """Per-day attendance counters per course and class, folded forward from ``attendance_record``.
+
+    ``class_id`` is 0 for records without a class.
+    """
+    __tablename__ = "attendance_daily_stats"
+    stat_date = Column(Date, primary_key=True)
+    course_id = Column(Integer, primary_key=True)
+    class_id = Column(Integer, primary_key=True, default=0)
+    present = Column(Integer, nullable=False, default=0)
+    late = Column(Integer, nullable=False, default=0)
+    absent = Column(Integer, nullable=False, default=0)
+    leave = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # attendance_rate: all days of one course
+        Index("ix_daily_stats_course_date", "course_id", "stat_date"),
+    )
+
+
+class RollupState(Base):
+    """Progress of a rollup over ``attendance_record``: rows up to ``last_record_id`` are folded in."""
+    __tablename__ = "rollup_state"
+    name = Column(String(32), primary_key=True)
+    last_record_id = Column(Integer, nullable=False, default=0)
+    # max record_id seen by the previous run; folded on the next one so in-flight inserts can commit
+    pending_record_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
 
 
 class MakeupStatus(str, enum.Enum):
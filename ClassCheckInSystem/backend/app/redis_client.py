@@ -1,8 +1,18 @@
+import logging
+import threading
+from typing import Callable
 import redis  # pyright: ignore[reportMissingImports]
+import redis.asyncio  # pyright: ignore[reportMissingImports]
+from redis.exceptions import RedisError  # pyright: ignore[reportMissingImports]
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
 
 redis_client = redis.Redis.from_url(settings.redis_url, decode_responses=True)
+async_redis_client = redis.asyncio.Redis.from_url(settings.redis_url, decode_responses=True)
+# bytes in/out, for bitmaps
+raw_redis_client = redis.Redis.from_url(settings.redis_url)
 
 
 def set_with_ttl(key: str, value: str, ttl_seconds: int) -> None:
@@ -15,3 +25,45 @@ def get_and_delete(key: str):
     pipe.delete(key)
     result = pipe.execute()
     return result[0]
+
+
+def stream_add(stream: str, fields: dict, maxlen: int | None = None) -> str:
+    return redis_client.xadd(stream, fields, maxlen=maxlen, approximate=True)
+
+
+async def stream_add_async(stream: str, fields: dict, maxlen: int | None = None) -> str:
+    return await async_redis_client.xadd(stream, fields, maxlen=maxlen, approximate=True)
+
+
+def run_subscriber(channel: str, on_message: Callable[[dict], None], on_subscribe: Callable[[], None], stopping: threading.Event, on_lost: Callable[[], None] | None = None) -> None:
+    """Deliver ``channel``'s messages to ``on_message`` until ``stopping`` is set; meant to be a thread's target.
+
+    Anything published while not subscribed is lost, so ``on_subscribe`` runs
+    after every (re)subscribe to resync; ``on_lost`` runs when the connection
+    drops. Reconnects every second. A handler that raises is logged and the
+    loop carries on.
+    """
+    connected = True
+    while not stopping.is_set():
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(channel)
+            on_subscribe()
+            connected = True
+            while not stopping.is_set():
+                message = pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                try:
+                    on_message(message)
+                except Exception:
+                    logger.exception("handler for %s failed", channel)
+        except RedisError:
+            if connected:
+                logger.warning("subscription to %s lost; retrying", channel)
+            connected = False
+            if on_lost is not None:
+                on_lost()
+            stopping.wait(1.0)
+        finally:
+            pubsub.close()
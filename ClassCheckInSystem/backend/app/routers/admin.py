@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends  # pyright: ignore[reportMissingImports]
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File  # pyright: ignore[reportMissingImports]
 from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
-import pandas as pd  # pyright: ignore[reportMissingImports]
-from io import BytesIO
-from fastapi.responses import StreamingResponse  # pyright: ignore[reportMissingImports]
-from sqlalchemy import func  # pyright: ignore[reportMissingImports]
+import os
+from fastapi.responses import FileResponse, Response, StreamingResponse  # pyright: ignore[reportMissingImports]
 from datetime import datetime
-from ..database import get_db
-from ..models import UserBase, Course, AttendanceRecord, RecordStatus, RoleEnum
-from ..deps.roles import require_roles
+import json
+from sqlalchemy.ext.asyncio import AsyncSession  # pyright: ignore[reportMissingImports]
+from ..database import get_db, get_async_db, get_read_db
+from ..models import UserBase, Course, RecordStatus, RoleEnum, Classroom, CourseRoom
+from ..schemas import ClassroomCreate, UserUpdate
+from ..auth import revoke_user_tokens_async
+from ..config import settings
+from ..deps.roles import require_roles, require_roles_async
+from ..deps.pagination import PageParams, page_params, paginate
+from ..services.geofence import geofences_changed
+from ..services.user_cache import invalidate_user
+from ..services.passwords import PoolBusy, calibrate, hash_password_async
+from ..services.export import EXPORT_FORMATS, FILE_WRITERS, STREAMED_FORMATS, export_criteria, format_available, iter_file_and_remove, stream_records, temp_export_path
+from ..services.daily_stats import rollup_counts
+from ..services.export_jobs import describe_job, export_jobs, get_export_job
+from ..services.roster_import import ImportBusy, RosterError, read_roster, validate_roster, start_import_job, get_import_job
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -15,9 +26,74 @@ admin_only = Depends(require_roles(RoleEnum.admin))
 
 
 @router.get("/users")
-def list_users(db: Session = Depends(get_db), _=admin_only):
-    users = db.query(UserBase).limit(200).all()
-    return [{"user_id": u.user_id, "username": u.username, "name": u.name, "role": u.role.value} for u in users]
+def list_users(db: Session = Depends(get_read_db), _=admin_only, page: PageParams = Depends(page_params(200))):
+    users, next_cursor = paginate(db.query(UserBase), UserBase.user_id, page)
+    items = [{"user_id": u.user_id, "username": u.username, "name": u.name, "role": u.role.value} for u in users]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.patch("/user/{user_id}")
+async def update_user(user_id: int, body: UserUpdate, db: AsyncSession = Depends(get_async_db), _=Depends(require_roles_async(RoleEnum.admin))):
+    try:
+        role = RoleEnum(body.role) if body.role is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="角色无效")
+    password = None
+    if body.password is not None:
+        # hashed on the password pool before the session checks out a connection
+        try:
+            password = await hash_password_async(body.password)
+        except PoolBusy:
+            raise HTTPException(status_code=503, detail="密码计算繁忙，请稍后重试", headers={"Retry-After": "2"})
+    user = await db.get(UserBase, user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="用户不存在")
+    if body.name is not None:
+        user.name = body.name
+    if role is not None:
+        user.role = role
+    if password is not None:
+        user.password = password
+    await db.commit()
+    invalidate_user(user.user_id, user.username)
+    if settings.auth_revocation_check and (role is not None or password is not None):
+        # claims in issued tokens no longer match; force a fresh login
+        await revoke_user_tokens_async(user.user_id)
+    return {"user_id": user.user_id, "username": user.username, "name": user.name, "role": user.role.value}
+
+
+@router.get("/auth/bcrypt-calibration")
+async def bcrypt_calibration(target_ms: float = 250, min_rounds: int = 10, max_rounds: int = 14, _=admin_only):
+    """Time each bcrypt cost on the password pool and recommend a BCRYPT_ROUNDS value."""
+    if not 4 <= min_rounds <= max_rounds <= 16:
+        raise HTTPException(status_code=400, detail="rounds 取值范围为 4-16")
+    try:
+        return await calibrate(list(range(min_rounds, max_rounds + 1)), target_ms=target_ms)
+    except PoolBusy:
+        raise HTTPException(status_code=503, detail="密码计算繁忙，请稍后重试")
+
+
+@router.post("/roster/import")
+def import_roster(file: UploadFile = File(...), rounds: int | None = Query(None, ge=10, le=14), _=admin_only):
+    """Validate a CSV/XLSX student roster and import it in the background."""
+    try:
+        df = validate_roster(read_roster(file.file.read(), file.filename or ""))
+    except RosterError as exc:
+        raise HTTPException(status_code=400, detail={"message": str(exc), "errors": exc.errors[:200]})
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"无法解析名单文件: {exc}")
+    try:
+        return {"job_id": start_import_job(df, rounds), "rows": len(df)}
+    except ImportBusy as exc:
+        raise HTTPException(status_code=409, detail=f"已有名单导入任务在运行: {exc}")
+
+
+@router.get("/roster/import/{job_id}")
+def import_roster_status(job_id: str, _=admin_only):
+    job = get_import_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="导入任务不存在或已过期")
+    return {"job_id": job_id, **job}
 
 
 @router.post("/course")
@@ -29,34 +105,103 @@ def create_course(course_name: str, credit: int = 0, db: Session = Depends(get_d
     return {"course_id": c.course_id}
 
 
+@router.post("/classroom")
+def create_classroom(room: ClassroomCreate, db: Session = Depends(get_db), _=admin_only):
+    c = Classroom(room_name=room.room_name, lng=room.lng, lat=room.lat, radius_m=room.radius_m, polygon=json.dumps(room.polygon) if room.polygon else None)
+    db.add(c)
+    db.commit()
+    db.refresh(c)
+    geofences_changed(db)
+    return {"room_id": c.room_id}
+
+
+@router.post("/course/{course_id}/room")
+def assign_course_room(course_id: int, room_id: int, db: Session = Depends(get_db), _=admin_only):
+    if db.get(Course, course_id) is None:
+        raise HTTPException(status_code=404, detail="课程不存在")
+    if db.get(Classroom, room_id) is None:
+        raise HTTPException(status_code=404, detail="教室不存在")
+    db.add(CourseRoom(course_id=course_id, room_id=room_id))
+    db.commit()
+    geofences_changed(db)
+    return {"course_id": course_id, "room_id": room_id}
+
+
+def export_request(
+    start: str,
+    end: str,
+    format: str = Query("xlsx", pattern="^(xlsx|csv|ndjson|parquet)$"),
+    course_id: int | None = None,
+    class_id: int | None = None,
+    student_id: int | None = None,
+    status: str | None = None,
+) -> tuple[str, dict, list]:
+    try:
+        record_status = RecordStatus(status) if status else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="考勤状态无效")
+    if not format_available(format):
+        raise HTTPException(status_code=501, detail="服务器未安装 pyarrow，无法导出 Parquet")
+    params = {"start": start, "end": end, "course_id": course_id, "class_id": class_id, "student_id": student_id, "status": status}
+    criteria = export_criteria(datetime.fromisoformat(start), datetime.fromisoformat(end), course_id, class_id, student_id, record_status)
+    return format, params, criteria
+
+
 @router.get("/report/export")
-def export_report(start: str, end: str, db: Session = Depends(get_db), _=admin_only):
-    start_dt = datetime.fromisoformat(start)
-    end_dt = datetime.fromisoformat(end)
-    recs = db.query(AttendanceRecord).filter(AttendanceRecord.sign_time >= start_dt, AttendanceRecord.sign_time <= end_dt).all()
-    rows = [{
-        "record_id": r.record_id,
-        "course_id": r.course_id,
-        "student_id": r.student_id,
-        "status": r.status.value if hasattr(r.status, 'value') else str(r.status),
-        "sign_method": r.sign_method.value if hasattr(r.sign_method, 'value') else str(r.sign_method),
-        "sign_time": r.sign_time,
-    } for r in recs]
-    df = pd.DataFrame(rows)
-    buf = BytesIO()
-    df.to_excel(buf, index=False)
-    buf.seek(0)
-    return StreamingResponse(buf, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers={"Content-Disposition": "attachment; filename=attendance.xlsx"})
+def export_report(request: tuple = Depends(export_request), db: Session = Depends(get_read_db), _=admin_only):
+    format, _params, criteria = request
+    media_type, suffix = EXPORT_FORMATS[format]
+    headers = {"Content-Disposition": f"attachment; filename=attendance{suffix}"}
+    if format in STREAMED_FORMATS:
+        return StreamingResponse(stream_records(format, criteria), media_type=media_type, headers=headers)
+    # xlsx/parquet are spooled to a temp file, then streamed; neither step holds the range in memory
+    path = temp_export_path(suffix)
+    try:
+        FILE_WRITERS[format](db, path, criteria)
+    except Exception:
+        os.remove(path)
+        raise
+    headers["Content-Length"] = str(os.path.getsize(path))
+    return StreamingResponse(iter_file_and_remove(path), media_type=media_type, headers=headers)
+
+
+@router.post("/report/jobs", status_code=202)
+def create_export_job(request: tuple = Depends(export_request), _=admin_only):
+    format, params, criteria = request
+    job_id, job = export_jobs.submit(format, params, criteria)
+    return describe_job(job_id, job)
+
+
+@router.get("/report/jobs/{job_id}")
+def export_job_status(job_id: str, _=admin_only):
+    job = get_export_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="导出任务不存在或已过期")
+    return describe_job(job_id, job)
+
+
+@router.get("/report/jobs/{job_id}/download")
+def download_export(job_id: str, _=admin_only):
+    job = get_export_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="导出任务不存在或已过期")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail="导出尚未完成")
+    path = job["path"]
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="导出文件已被清理，请重新创建导出任务")
+    media_type, suffix = EXPORT_FORMATS[job["format"]]
+    filename = f"attendance{suffix}"
+    if settings.export_accel_redirect:
+        # nginx serves the file itself (sendfile) from the internal location mapped to EXPORT_DIR
+        return Response(media_type=media_type, headers={
+            "X-Accel-Redirect": settings.export_accel_redirect.rstrip("/") + "/" + os.path.basename(path),
+            "Content-Disposition": f"attachment; filename={filename}",
+        })
+    return FileResponse(path, media_type=media_type, filename=filename)
 
 
 @router.get("/statistics/trend")
-def statistics_trend(start: str, end: str, db: Session = Depends(get_db), _=admin_only):
-    start_dt = datetime.fromisoformat(start)
-    end_dt = datetime.fromisoformat(end)
-    rows = (
-        db.query(func.date(AttendanceRecord.sign_time), func.count(AttendanceRecord.record_id))
-        .filter(AttendanceRecord.sign_time >= start_dt, AttendanceRecord.sign_time <= end_dt, AttendanceRecord.status == RecordStatus.present)
-        .group_by(func.date(AttendanceRecord.sign_time))
-        .all()
-    )
-    return [{"date": str(d), "count": int(c)} for d, c in rows]
+def statistics_trend(start: str, end: str, db: Session = Depends(get_read_db), _=admin_only):
+    counts = rollup_counts(db, ["stat_date"], datetime.fromisoformat(start).date(), datetime.fromisoformat(end).date())
+    return [{"date": str(day), "count": c["present"]} for (day,), c in sorted(counts.items()) if c["present"]]
@@ -1,17 +1,47 @@
 from fastapi import APIRouter, Depends, HTTPException  # pyright: ignore[reportMissingImports]
 from fastapi.security import OAuth2PasswordRequestForm  # pyright: ignore[reportMissingImports]
-from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
-from ..database import get_db
-from ..models import UserBase
-from ..auth import verify_password, create_access_token
+from sqlalchemy import select, update  # pyright: ignore[reportMissingImports]
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models import UserBase, Student, Teacher
+from ..schemas import UserInfo
+from ..auth import create_user_token, get_current_user, token_version_async
+from ..services.passwords import PoolBusy, verify_password_async
+from ..services.user_cache import invalidate_user
 
 router = APIRouter()
 
 
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(UserBase).filter(UserBase.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    stmt = (
+        select(UserBase.user_id, UserBase.username, UserBase.password, UserBase.role, Student.student_id, Teacher.teacher_id)
+        .outerjoin(Student, Student.user_base_id == UserBase.user_id)
+        .outerjoin(Teacher, Teacher.user_base_id == UserBase.user_id)
+        .where(UserBase.username == form_data.username)
+    )
+    # the session is released before bcrypt runs; a verify costs far longer than the query
+    async with AsyncSessionLocal() as db:
+        user = (await db.execute(stmt)).first()
+    if user is None:
         raise HTTPException(status_code=400, detail="用户名或密码错误")
-    token = create_access_token({"sub": user.username, "role": user.role.value})
+    try:
+        ok, new_hash = await verify_password_async(form_data.password, user.password)
+    except PoolBusy:
+        raise HTTPException(status_code=503, detail="登录人数过多，请稍后重试", headers={"Retry-After": "2"})
+    if not ok:
+        raise HTTPException(status_code=400, detail="用户名或密码错误")
+    if new_hash is not None:
+        # BCRYPT_ROUNDS changed since this hash was made; skip if the password changed meanwhile
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(UserBase).where(UserBase.user_id == user.user_id, UserBase.password == user.password).values(password=new_hash))
+            await db.commit()
+        invalidate_user(user.user_id, user.username)
+    version = await token_version_async(user.user_id) if settings.auth_revocation_check else None
+    token = create_user_token(user.user_id, user.username, user.role, user.student_id, user.teacher_id, version)
     return {"access_token": token, "token_type": "bearer"}
+
+
+@router.get("/me", response_model=UserInfo)
+def me(user: UserBase = Depends(get_current_user)):
+    return UserInfo(user_id=user.user_id, name=user.name, role=user.role.value)
@@ -1,48 +1,244 @@
-from fastapi import APIRouter, Depends, HTTPException  # pyright: ignore[reportMissingImports]
+import asyncio
+import hashlib
+from fastapi import APIRouter, Depends, HTTPException, Query  # pyright: ignore[reportMissingImports]
 from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
-from geopy.distance import geodesic  # pyright: ignore[reportMissingImports]
-from ..database import get_db
-from ..models import AttendanceRecord, RecordStatus, SignMethod, UserBase, RoleEnum
-from ..schemas import AttendanceOut
-from ..deps.roles import require_roles
-from ..services.qrcode_service import generate_qr_token, consume_qr_token
-from ..crud.attendance import create_record
+from sqlalchemy.ext.asyncio import AsyncSession  # pyright: ignore[reportMissingImports]
+from datetime import datetime, timedelta, timezone
+from ..config import settings
+from ..database import get_db, get_async_db
+from ..models import AttendanceRecord, RecordStatus, SignMethod, RoleEnum
+from ..auth import TokenUser
+from ..schemas import AttendancePage, BatchSignItem, BatchSignResult
+from ..deps.roles import require_roles, require_roles_async
+from ..deps.admission import admit_signin, admit_signin_batch
+from ..deps.pagination import PageParams, page_params, paginate
+from ..deps.read_routing import get_student_read_db, note_writes, note_writes_async
+from ..services.qrcode_service import generate_qr_token, consume_qr_token_async, check_qr_tokens, release_qr_tokens, release_qr_tokens_async, open_qr_session, current_session_token, QRResult
+from ..crud.attendance import create_record_async, record_values, insert_records_ignoring_duplicates, record_ids_by_sign_key
+from ..services.signin_buffer import BufferClosed, signin_buffer
+from ..services.signin_stream import enqueue_signin_async
+from ..services.geofence import get_geofence_index, haversine_m
+from ..services.live_attendance import init_session, mark_signed_async, mark_signed_many
 
 router = APIRouter(prefix="/student", tags=["student"])
 
 student_only = require_roles(RoleEnum.student, RoleEnum.teacher, RoleEnum.admin)
+student_only_async = require_roles_async(RoleEnum.student, RoleEnum.teacher, RoleEnum.admin)
+
+
+def _check_self(user: TokenUser, student_id: int) -> None:
+    # students sign only for themselves; teachers/admins may sign on a student's behalf
+    if user.role == RoleEnum.student and user.student_id != student_id:
+        raise HTTPException(status_code=403, detail="只能为本人签到")
+
+
+async def _buffered_insert(values: dict) -> dict | None:
+    """Hand the row to the write-behind buffer; None when the buffer is stopped (caller inserts directly)."""
+    try:
+        ack = asyncio.wrap_future(signin_buffer.submit(record_values(**values)))
+    except BufferClosed:
+        return None
+    try:
+        # shield: a timed-out request must not cancel a row the flusher already holds
+        return {"record_id": await asyncio.wait_for(asyncio.shield(ack), settings.signin_buffer_ack_timeout)}
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="签到繁忙，请稍后重试")
+
+
+async def _save_record(db: AsyncSession, **values) -> dict:
+    if settings.signin_mode == "stream":
+        # accepted once the stream has it; app.signin_worker assigns the record id later
+        saved = {"record_id": None, "queued_id": await enqueue_signin_async(record_values(**values))}
+    else:
+        saved = await _buffered_insert(values) if settings.signin_mode == "buffer" else None
+        if saved is None:
+            record = await create_record_async(db, **values)
+            saved = {"record_id": record.record_id}
+    await mark_signed_async(values["course_id"], values["student_id"])
+    await note_writes_async([values["student_id"]])
+    return saved
 
 
 @router.post("/sign/qrcode/create")
-def create_qr_token(course_id: int, user: UserBase = Depends(require_roles(RoleEnum.teacher, RoleEnum.admin))):
+def create_qr_token(course_id: int, user: TokenUser = Depends(require_roles(RoleEnum.teacher, RoleEnum.admin))):
     token = generate_qr_token(course_id)
     return {"qr_token": token}
 
 
-@router.post("/sign/qrcode/verify")
-def sign_by_qrcode(qr_token: str, course_id: int, student_id: int, db: Session = Depends(get_db), user: UserBase = Depends(student_only)):
-    if not consume_qr_token(qr_token):
+@router.post("/sign/qrcode/session")
+def create_qr_session(course_id: int, rotate_seconds: int | None = Query(None, ge=1), db: Session = Depends(get_db), user: TokenUser = Depends(require_roles(RoleEnum.teacher, RoleEnum.admin))):
+    session_id = open_qr_session(course_id, rotate_seconds)
+    roster = init_session(db, session_id, course_id)
+    return {"session_id": session_id, "roster": roster, **current_session_token(session_id)}
+
+
+@router.get("/sign/qrcode/session/{session_id}")
+def get_qr_session_token(session_id: str, user: TokenUser = Depends(require_roles(RoleEnum.teacher, RoleEnum.admin))):
+    token = current_session_token(session_id)
+    if token is None:
+        raise HTTPException(status_code=404, detail="签到会话不存在或已结束")
+    return {"session_id": session_id, **token}
+
+
+@router.post("/sign/qrcode/verify", dependencies=[Depends(admit_signin)])
+async def sign_by_qrcode(qr_token: str, course_id: int, student_id: int, db: AsyncSession = Depends(get_async_db), user: TokenUser = Depends(student_only_async)):
+    _check_self(user, student_id)
+    result = await consume_qr_token_async(qr_token, course_id, student_id)
+    if result == QRResult.duplicate:
+        raise HTTPException(status_code=400, detail="本节课已签到")
+    if result != QRResult.ok:
         raise HTTPException(status_code=400, detail="二维码无效或过期")
-    record = create_record(db, course_id=course_id, student_id=student_id, status=RecordStatus.present, method=SignMethod.qrcode)
-    return {"record_id": record.record_id}
-
-
-@router.post("/sign/location")
-def sign_by_location(course_id: int, student_id: int, lng: float, lat: float, room_lng: float, room_lat: float, db: Session = Depends(get_db), user: UserBase = Depends(student_only)):
-    distance_m = geodesic((lat, lng), (room_lat, room_lng)).meters
-    if distance_m > 1000:
-        raise HTTPException(status_code=400, detail="位置超出范围，请到教室附近签到")
-    record = create_record(db, course_id=course_id, student_id=student_id, status=RecordStatus.present, method=SignMethod.location, lng=str(lng), lat=str(lat))
-    return {"record_id": record.record_id, "distance_m": round(distance_m, 2)}
-
-
-@router.get("/record/personal", response_model=list[AttendanceOut])
-def personal_records(student_id: int, db: Session = Depends(get_db), user: UserBase = Depends(student_only)):
-    recs = (
-        db.query(AttendanceRecord)
-        .filter(AttendanceRecord.student_id == student_id)
-        .order_by(AttendanceRecord.record_id.desc())
-        .limit(200)
-        .all()
-    )
-    return recs
+    try:
+        return await _save_record(db, course_id=course_id, student_id=student_id, status=RecordStatus.present, method=SignMethod.qrcode)
+    except HTTPException:
+        raise  # ack timeout: the buffered row may still be committed
+    except Exception:
+        # nothing was written, so let the student scan again
+        await release_qr_tokens_async([(qr_token, student_id)])
+        raise
+
+
+@router.post("/sign/location", dependencies=[Depends(admit_signin)])
+async def sign_by_location(course_id: int, student_id: int, lng: float, lat: float, room_lng: float | None = None, room_lat: float | None = None, db: AsyncSession = Depends(get_async_db), user: TokenUser = Depends(student_only_async)):
+    _check_self(user, student_id)
+    index = get_geofence_index()
+    if index.fences_for_course(course_id):
+        # registered classrooms win; client-sent room coordinates are ignored
+        fence = index.match_course(course_id, lat, lng)
+        if fence is None:
+            raise HTTPException(status_code=400, detail="位置超出范围，请到教室附近签到")
+        extra = {"room_id": fence.room_id, "distance_m": round(haversine_m(lat, lng, fence.lat, fence.lng), 2)}
+    else:
+        if not settings.geofence_client_fallback or room_lng is None or room_lat is None:
+            raise HTTPException(status_code=400, detail="该课程未登记教室位置")
+        distance_m = haversine_m(lat, lng, room_lat, room_lng)
+        if distance_m > settings.geofence_default_radius_m:
+            raise HTTPException(status_code=400, detail="位置超出范围，请到教室附近签到")
+        extra = {"distance_m": round(distance_m, 2)}
+    saved = await _save_record(db, course_id=course_id, student_id=student_id, status=RecordStatus.present, method=SignMethod.location, lng=str(lng), lat=str(lat))
+    return {**saved, **extra}
+
+
+def _as_utc(ts: datetime | None) -> datetime | None:
+    if ts is None or ts.tzinfo is None:
+        return ts
+    return ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _batch_sign_key(item: BatchSignItem, sign_time: datetime) -> str:
+    # the same item uploaded again (a retried request) maps to the same key
+    raw = f"{item.course_id}:{item.student_id}:{item.sign_method.value}:{sign_time.isoformat()}"
+    return "batch:" + hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+@router.post("/sign/batch", response_model=list[BatchSignResult], dependencies=[Depends(admit_signin_batch)])
+def sign_batch(items: list[BatchSignItem], db: Session = Depends(get_db), user: TokenUser = Depends(require_roles(RoleEnum.teacher, RoleEnum.admin))):
+    """Replay sign-ins collected by kiosks/offline devices in one request.
+
+    Validation is a single pass: in-payload duplicates, geofences (in-process)
+    and QR tokens (one Redis pipeline for the whole payload). Each row carries
+    a ``sign_key`` derived from the item, so re-uploading an item that was
+    already stored returns its existing record instead of a second row.
+    Accepted rows are inserted with one multi-row INSERT per chunk.
+    """
+    if len(items) > settings.signin_batch_max_items:
+        raise HTTPException(status_code=413, detail=f"单次最多提交 {settings.signin_batch_max_items} 条")
+    now = datetime.utcnow()
+    oldest = now - timedelta(seconds=settings.signin_batch_max_age_seconds)
+    index = get_geofence_index()
+    results = [BatchSignResult(index=i, ok=False) for i in range(len(items))]
+    seen: set[tuple[int, int]] = set()
+    qr_checks: dict[int, tuple] = {}
+    accepted: dict[int, dict] = {}
+    for i, item in enumerate(items):
+        sign_time = _as_utc(item.sign_time) or now
+        if sign_time > now:
+            results[i].error = "签到时间无效"
+            continue
+        if sign_time < oldest:
+            results[i].error = "签到时间超出补传期限"
+            continue
+        key = (item.course_id, item.student_id)
+        if key in seen:
+            results[i].error = "重复签到"
+            continue
+        seen.add(key)
+        values = dict(course_id=item.course_id, student_id=item.student_id, status=RecordStatus.present, sign_time=sign_time)
+        if item.sign_method == SignMethod.qrcode:
+            if not item.qr_token:
+                results[i].error = "缺少二维码"
+                continue
+            at = sign_time.replace(tzinfo=timezone.utc).timestamp()
+            qr_checks[i] = (item.qr_token, item.course_id, item.student_id, at)
+            accepted[i] = record_values(method=SignMethod.qrcode, **values)
+        elif item.sign_method == SignMethod.location:
+            if item.lng is None or item.lat is None:
+                results[i].error = "缺少位置"
+                continue
+            if not index.fences_for_course(item.course_id):
+                results[i].error = "该课程未登记教室位置"
+                continue
+            if index.match_course(item.course_id, item.lat, item.lng) is None:
+                results[i].error = "位置超出范围"
+                continue
+            accepted[i] = record_values(method=SignMethod.location, lng=str(item.lng), lat=str(item.lat), **values)
+        else:
+            results[i].error = "不支持的签到方式"
+            continue
+        accepted[i]["sign_key"] = _batch_sign_key(item, sign_time)
+
+    # items stored by an earlier upload succeed again without re-checking their (now used) QR token
+    stored = {}
+    keys = [values["sign_key"] for values in accepted.values()]
+    for start in range(0, len(keys), settings.signin_batch_chunk_size):
+        stored.update(record_ids_by_sign_key(db, keys[start:start + settings.signin_batch_chunk_size]))
+    for i in [i for i, values in accepted.items() if values["sign_key"] in stored]:
+        results[i].ok = True
+        results[i].record_id = stored[accepted.pop(i)["sign_key"]]
+        qr_checks.pop(i, None)
+
+    if qr_checks:
+        verdicts = check_qr_tokens(list(qr_checks.values()))
+        for i, verdict in zip(qr_checks, verdicts):
+            if verdict != QRResult.ok:
+                results[i].error = "本节课已签到" if verdict == QRResult.duplicate else "二维码无效或过期"
+                del accepted[i]
+
+    pending = list(accepted.items())
+    signed = []
+    chunk = settings.signin_batch_chunk_size
+    for start in range(0, len(pending), chunk):
+        part = pending[start:start + chunk]
+        try:
+            insert_records_ignoring_duplicates(db, [values for _, values in part])
+            db.commit()
+            ids = record_ids_by_sign_key(db, [values["sign_key"] for _, values in part])
+        except Exception:
+            db.rollback()
+            for i, _ in part:
+                results[i].error = "写入失败"
+            release_qr_tokens([(items[i].qr_token, items[i].student_id) for i, _ in part if i in qr_checks])
+            continue
+        missing = []
+        for i, values in part:
+            record_id = ids.get(values["sign_key"])
+            if record_id is None:
+                # not stored, e.g. skipped by a dialect without conflict handling
+                results[i].error = "写入失败"
+                missing.append(i)
+                continue
+            results[i].ok = True
+            results[i].record_id = record_id
+            signed.append((values["course_id"], values["student_id"]))
+        release_qr_tokens([(items[i].qr_token, items[i].student_id) for i in missing if i in qr_checks])
+    mark_signed_many(signed)
+    note_writes(student_id for _, student_id in signed)
+    return results
+
+
+@router.get("/record/personal", response_model=AttendancePage)
+def personal_records(student_id: int, db: Session = Depends(get_student_read_db), user: TokenUser = Depends(student_only), page: PageParams = Depends(page_params(200))):
+    _check_self(user, student_id)
+    query = db.query(AttendanceRecord).filter(AttendanceRecord.student_id == student_id)
+    recs, next_cursor = paginate(query, AttendanceRecord.record_id, page)
+    return {"items": recs, "next_cursor": next_cursor}
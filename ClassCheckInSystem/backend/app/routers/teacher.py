@@ -1,23 +1,115 @@
-from fastapi import APIRouter, Depends  # pyright: ignore[reportMissingImports]
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request  # pyright: ignore[reportMissingImports]
+from fastapi.responses import StreamingResponse  # pyright: ignore[reportMissingImports]
 from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
-from sqlalchemy import func  # pyright: ignore[reportMissingImports]
+from sqlalchemy import select  # pyright: ignore[reportMissingImports]
 from datetime import datetime
-from ..database import get_db
-from ..models import AttendanceRecord, RecordStatus, SignMethod, MakeUpRecord, MakeupStatus, RoleEnum
+from ..database import get_db, get_read_db
+from ..redis_client import async_redis_client
+from ..config import settings
+from ..models import AttendanceRecord, Course, CourseTeach, RecordStatus, SignMethod, MakeUpRecord, MakeupStatus, RoleEnum
 from ..schemas import AttendanceQuery, AttendanceRateOut
-from ..deps.roles import require_roles
+from ..auth import TokenUser
+from ..deps.roles import require_roles, require_roles_async
+from ..deps.pagination import PageParams, page_params, keyset, split_page
+from ..deps.read_routing import note_writes
+from ..crud.attendance import record_list_select, record_list_item
+from ..services.qrcode_service import get_qr_session
+from ..services.live_attendance import live_counts, live_counts_async, missing_students, mark_signed, events_channel
+from ..services.absentee import finish_session
+from ..services.daily_stats import COUNTERS, rollup_counts
 
 router = APIRouter(prefix="/teacher", tags=["teacher"])
 
 teacher_only = Depends(require_roles(RoleEnum.teacher, RoleEnum.admin))
 
 
+def _rates(db: Session, course_ids: list[int], every_course: bool = False) -> list[AttendanceRateOut]:
+    """Counts for every course in one grouped read of the daily rollup (plus its unfolded tail).
+
+    With ``every_course`` the rollup is read unfiltered instead of through an IN list.
+    """
+    counts = rollup_counts(db, ["course_id"], course_ids=None if every_course else course_ids)
+    rates = []
+    for course_id in course_ids:
+        c = counts.get((course_id,), dict.fromkeys(COUNTERS, 0))
+        total = sum(c.values())
+        rates.append(AttendanceRateOut(course_id=course_id, **c, total=total, rate=0.0 if total == 0 else c["present"] / total))
+    return rates
+
+
 @router.get("/attendance/rate", response_model=list[AttendanceRateOut])
-def attendance_rate(course_id: int, db: Session = Depends(get_db), _=teacher_only):
-    total = db.query(func.count(AttendanceRecord.record_id)).filter(AttendanceRecord.course_id == course_id).scalar() or 0
-    present = db.query(func.count(AttendanceRecord.record_id)).filter(AttendanceRecord.course_id == course_id, AttendanceRecord.status == RecordStatus.present).scalar() or 0
-    rate = 0.0 if total == 0 else present / total
-    return [AttendanceRateOut(course_id=course_id, present=present, total=total, rate=rate)]
+def attendance_rate(course_id: int, db: Session = Depends(get_read_db), _=teacher_only):
+    return _rates(db, [course_id])
+
+
+@router.get("/attendance/rates", response_model=list[AttendanceRateOut])
+def attendance_rates(course_ids: list[int] | None = Query(None), db: Session = Depends(get_read_db), user: TokenUser = teacher_only):
+    """Rates for ``course_ids`` (at most PAGE_SIZE_MAX); without them, every course the teacher teaches (all courses for an admin)."""
+    if course_ids is not None:
+        course_ids = list(dict.fromkeys(course_ids))
+        if len(course_ids) > settings.page_size_max:
+            raise HTTPException(status_code=400, detail=f"一次最多查询 {settings.page_size_max} 门课程")
+        return _rates(db, course_ids)
+    if user.role == RoleEnum.admin:
+        return _rates(db, list(db.scalars(select(Course.course_id).order_by(Course.course_id))), every_course=True)
+    return _rates(db, list(db.scalars(select(CourseTeach.course_id).where(CourseTeach.teacher_id == user.teacher_id).distinct().order_by(CourseTeach.course_id))))
+
+
+def _session_or_404(session_id: str) -> dict:
+    session = get_qr_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="签到会话不存在或已过期")
+    return session
+
+
+@router.get("/session/{session_id}/live")
+def session_live(session_id: str, _=teacher_only):
+    session = _session_or_404(session_id)
+    return {"session_id": session_id, "course_id": int(session["course_id"]), **live_counts(session_id)}
+
+
+@router.get("/session/{session_id}/missing")
+def session_missing(session_id: str, _=teacher_only):
+    _session_or_404(session_id)
+    return {"session_id": session_id, "student_ids": missing_students(session_id)}
+
+
+@router.post("/session/{session_id}/close")
+def session_close(session_id: str, db: Session = Depends(get_db), _=teacher_only):
+    return finish_session(db, session_id, _session_or_404(session_id))
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {data if isinstance(data, str) else json.dumps(data)}\n\n"
+
+
+@router.get("/session/{session_id}/events")
+async def session_events(session_id: str, request: Request, _=Depends(require_roles_async(RoleEnum.teacher, RoleEnum.admin))):
+    """Server-Sent Events feed of a session: a snapshot, then one event per new sign-in."""
+    # role check is claims-only, so the stream never holds a pooled DB connection
+    if not await async_redis_client.exists(f"qrsess:{session_id}"):
+        raise HTTPException(status_code=404, detail="签到会话不存在或已过期")
+
+    async def stream():
+        pubsub = async_redis_client.pubsub()
+        await pubsub.subscribe(events_channel(session_id))
+        try:
+            yield _sse("snapshot", {"session_id": session_id, **await live_counts_async(session_id)})
+            while not await request.is_disconnected():
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=15)
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                event = json.loads(message["data"])
+                yield _sse(event["type"], message["data"])
+                if event["type"] == "closed":
+                    break
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @router.post("/sign/makeup")
@@ -42,27 +134,24 @@ def manual_makeup(student_id: int, course_id: int, reason: str, db: Session = De
     )
     db.add(record)
     db.commit()
+    mark_signed(course_id, student_id)
+    note_writes([student_id])
     return {"make_up_id": makeup.make_up_id}
 
 
 @router.post("/record/query")
-def query_records(q: AttendanceQuery, db: Session = Depends(get_db), _=teacher_only):
-    query = db.query(AttendanceRecord)
+def query_records(q: AttendanceQuery, db: Session = Depends(get_read_db), _=teacher_only, page: PageParams = Depends(page_params(500))):
+    criteria = []
     if q.student_id:
-        query = query.filter(AttendanceRecord.student_id == q.student_id)
+        criteria.append(AttendanceRecord.student_id == q.student_id)
     if q.course_id:
-        query = query.filter(AttendanceRecord.course_id == q.course_id)
+        criteria.append(AttendanceRecord.course_id == q.course_id)
     if q.class_id:
-        query = query.filter(AttendanceRecord.class_id == q.class_id)
+        criteria.append(AttendanceRecord.class_id == q.class_id)
     if q.start:
-        query = query.filter(AttendanceRecord.sign_time >= q.start)
+        criteria.append(AttendanceRecord.sign_time >= q.start)
     if q.end:
-        query = query.filter(AttendanceRecord.sign_time <= q.end)
-    return [{
-        "record_id": r.record_id,
-        "course_id": r.course_id,
-        "student_id": r.student_id,
-        "status": r.status.value if hasattr(r.status, 'value') else str(r.status),
-        "sign_method": r.sign_method.value if hasattr(r.sign_method, 'value') else str(r.sign_method),
-        "sign_time": r.sign_time.isoformat() if r.sign_time else None,
-    } for r in query.order_by(AttendanceRecord.record_id.desc()).limit(500).all()]
+        criteria.append(AttendanceRecord.sign_time <= q.end)
+    rows = db.execute(keyset(record_list_select(*criteria), AttendanceRecord.record_id, page)).all()
+    rows, next_cursor = split_page(rows, AttendanceRecord.record_id, page)
+    return {"items": [record_list_item(r) for r in rows], "next_cursor": next_cursor}
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field  # pyright: ignore[reportMissingImports]
-from typing import Optional, List
+from typing import Annotated, Optional, List
 from datetime import datetime
+from .models import SignMethod
 
 
 class Token(BaseModel):
@@ -19,6 +20,12 @@ class UserInfo(BaseModel):
     role: str
 
 
+class UserUpdate(BaseModel):
+    name: Optional[str] = None
+    role: Optional[str] = None
+    password: Optional[str] = None
+
+
 class AttendanceCreate(BaseModel):
     course_id: int
     class_id: Optional[int] = None
@@ -38,13 +45,35 @@ class AttendanceOut(BaseModel):
     class_id: Optional[int] = None
     student_id: int
     status: str
-    sign_method: str
+    sign_method: Optional[str] = None  # absentee rows have none
     sign_time: Optional[datetime]
 
     class Config:
         from_attributes = True
 
 
+class AttendancePage(BaseModel):
+    items: List[AttendanceOut]
+    next_cursor: Optional[str] = None
+
+
+class BatchSignItem(BaseModel):
+    course_id: int
+    student_id: int
+    sign_method: SignMethod = SignMethod.qrcode
+    qr_token: Optional[str] = None
+    lng: Optional[float] = None
+    lat: Optional[float] = None
+    sign_time: Optional[datetime] = Field(None, description="采集时间(UTC)，离线补传时填写")
+
+
+class BatchSignResult(BaseModel):
+    index: int
+    ok: bool
+    record_id: Optional[int] = None
+    error: Optional[str] = None
+
+
 class MakeupApply(BaseModel):
     student_id: int
     course_id: int
@@ -62,5 +91,16 @@ class AttendanceQuery(BaseModel):
 class AttendanceRateOut(BaseModel):
     course_id: int
     present: int
+    late: int = 0
+    absent: int = 0
+    leave: int = 0
     total: int
     rate: float = Field(..., description="0~1")
+
+
+class ClassroomCreate(BaseModel):
+    room_name: str
+    lng: float
+    lat: float
+    radius_m: int = 100
+    polygon: Optional[List[Annotated[List[float], Field(min_length=2, max_length=2)]]] = Field(None, min_length=3, description="[[lng, lat], ...]，至少 3 个顶点")
@@ -0,0 +1,122 @@
+import argparse
+import time
+from datetime import datetime
+import numpy as np  # pyright: ignore[reportMissingImports]
+from sqlalchemy import select  # pyright: ignore[reportMissingImports]
+from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
+from ..database import SessionLocal
+from ..models import AttendanceRecord, ClassCourse, RecordStatus, Student
+from ..redis_client import raw_redis_client, redis_client
+from ..crud.attendance import insert_records_ignoring_duplicates
+from .qrcode_service import get_qr_session, close_qr_session
+from .live_attendance import bits_key, bitmap_to_ids, live_counts, publish_closed, reconcile
+from .. import metrics
+
+
+ABSENT_REMARK = "签到会话关闭，系统记为缺勤"
+
+absent_rows = metrics.counter("absentee.rows_inserted")
+absentee_latency = metrics.latency("absentee.materialize")
+
+
+def absent_sign_key(session_id: str, student_id: int) -> str:
+    return f"absent:{session_id}:{student_id}"
+
+
+def roster_arrays(db: Session, course_id: int) -> tuple[np.ndarray, np.ndarray]:
+    """(student_id, class_id) arrays of every student enrolled through a class taking the course."""
+    stmt = (
+        select(Student.student_id, Student.class_id)
+        .join(ClassCourse, ClassCourse.class_id == Student.class_id)
+        .where(ClassCourse.course_id == course_id)
+    )
+    rows = db.execute(stmt).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    data = np.asarray(rows, dtype=np.int64)
+    student_ids, first = np.unique(data[:, 0], return_index=True)
+    return student_ids, data[first, 1]
+
+
+def accounted_student_ids(db: Session, session_id: str, course_id: int, opened_at: datetime) -> np.ndarray:
+    """Students that already have a row of any status for the session, or a bit still on its way to the table."""
+    stmt = select(AttendanceRecord.student_id).where(
+        AttendanceRecord.course_id == course_id,
+        AttendanceRecord.sign_time >= opened_at,
+    )
+    in_table = np.fromiter(db.scalars(stmt), dtype=np.int64)
+    # stream/buffered sign-ins are in the bitmap before their row is committed
+    in_redis = np.asarray(bitmap_to_ids(raw_redis_client.get(bits_key(session_id))), dtype=np.int64)
+    return np.union1d(in_table, in_redis)
+
+
+def materialize_absentees(db: Session, session_id: str, course_id: int, opened_at: datetime, chunk_size: int = 1000) -> int:
+    """Insert an Absent row for every roster student that did not sign in; returns rows inserted.
+
+    Safe to re-run and to run concurrently for the same session: each row's
+    ``sign_key`` is derived from the session and student, and duplicates are
+    skipped by the database.
+    """
+    started = time.perf_counter()
+    student_ids, class_ids = roster_arrays(db, course_id)
+    mask = ~np.isin(student_ids, accounted_student_ids(db, session_id, course_id, opened_at), assume_unique=True)
+    absent_ids, absent_classes = student_ids[mask], class_ids[mask]
+    now = datetime.utcnow()
+    inserted = 0
+    for start in range(0, len(absent_ids), chunk_size):
+        rows = [
+            {
+                "course_id": course_id,
+                "class_id": class_id,
+                "student_id": student_id,
+                "sign_time": now,
+                "status": RecordStatus.absent,
+                "remark": ABSENT_REMARK,
+                "sign_key": absent_sign_key(session_id, student_id),
+            }
+            for student_id, class_id in zip(absent_ids[start:start + chunk_size].tolist(), absent_classes[start:start + chunk_size].tolist())
+        ]
+        inserted += insert_records_ignoring_duplicates(db, rows)
+    db.commit()
+    absentee_latency.observe(time.perf_counter() - started)
+    absent_rows.inc(inserted)
+    return inserted
+
+
+def finish_session(db: Session, session_id: str, session: dict) -> dict:
+    """Close a QR session: stop its token, reconcile the bitmap and write Absent rows."""
+    course_id = int(session["course_id"])
+    opened_at = datetime.fromisoformat(session["opened_at"])
+    close_qr_session(session_id, course_id)
+    result = reconcile(db, session_id, course_id, opened_at)
+    absent = materialize_absentees(db, session_id, course_id, opened_at)
+    summary = {"session_id": session_id, "course_id": course_id, **result, "absent_inserted": absent, **live_counts(session_id)}
+    publish_closed(session_id, summary)
+    return summary
+
+
+def open_session_ids() -> list[str]:
+    return [redis_client.get(key) for key in redis_client.scan_iter("qrsess:course:*")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Close QR sign-in sessions and materialize Absent records")
+    parser.add_argument("session_ids", nargs="*", help="sessions to close (already closed sessions are re-materialized)")
+    parser.add_argument("--all-open", action="store_true", help="close every session that is still accepting sign-ins")
+    args = parser.parse_args()
+    session_ids = list(args.session_ids) + (open_session_ids() if args.all_open else [])
+    db = SessionLocal()
+    try:
+        for session_id in filter(None, session_ids):
+            session = get_qr_session(session_id)
+            if session is None:
+                print(f"{session_id}: not found or expired")
+                continue
+            summary = finish_session(db, session_id, session)
+            print(f"{session_id}: course {summary['course_id']}, {summary['absent_inserted']} absent rows inserted")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
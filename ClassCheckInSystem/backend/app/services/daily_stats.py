@@ -0,0 +1,272 @@
+import argparse
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import Date, case, delete, func, insert, select, update  # pyright: ignore[reportMissingImports]
+from sqlalchemy.dialects import mysql, postgresql, sqlite  # pyright: ignore[reportMissingImports]
+from sqlalchemy.exc import IntegrityError  # pyright: ignore[reportMissingImports]
+from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
+from ..config import settings
+from ..database import SessionLocal
+from ..models import AttendanceDailyStats, AttendanceRecord, RecordStatus, RollupState
+from .. import metrics
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = "attendance_daily"
+COUNTERS = {"present": RecordStatus.present, "late": RecordStatus.late, "absent": RecordStatus.absent, "leave": RecordStatus.leave}
+UPSERT_CHUNK_ROWS = 500
+
+folded_rows = metrics.counter("daily_stats.groups_folded")
+refresh_latency = metrics.latency("daily_stats.refresh")
+
+_record_dims = {
+    "stat_date": func.date(AttendanceRecord.sign_time, type_=Date),
+    "course_id": AttendanceRecord.course_id,
+    "class_id": func.coalesce(AttendanceRecord.class_id, 0),
+}
+_stats_dims = {
+    "stat_date": AttendanceDailyStats.stat_date,
+    "course_id": AttendanceDailyStats.course_id,
+    "class_id": AttendanceDailyStats.class_id,
+}
+
+
+def _record_aggregate(criteria):
+    """Counters per (date, course, class) over the records matching ``criteria``, in rollup column order."""
+    keys = [dim.label(name) for name, dim in _record_dims.items()]
+    sums = [func.sum(case((AttendanceRecord.status == status, 1), else_=0)).label(name) for name, status in COUNTERS.items()]
+    return select(*keys, *sums).where(AttendanceRecord.sign_time.isnot(None), *criteria).group_by(*keys)
+
+
+def _record_range_criteria(start: date | None, end: date | None) -> list:
+    criteria = []
+    if start is not None:
+        criteria.append(AttendanceRecord.sign_time >= datetime.combine(start, datetime.min.time()))
+    if end is not None:
+        criteria.append(AttendanceRecord.sign_time < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return criteria
+
+
+def _state(db: Session) -> RollupState:
+    state = db.get(RollupState, ROLLUP_NAME)
+    if state is None:
+        try:
+            db.add(RollupState(name=ROLLUP_NAME, last_record_id=0, pending_record_id=0, updated_at=datetime.utcnow()))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+        state = db.get(RollupState, ROLLUP_NAME)
+    return state
+
+
+def _folded_up_to(db: Session) -> int:
+    """Watermark for read paths (possibly on the replica): never writes, a missing state row means nothing is folded."""
+    return db.scalar(select(RollupState.last_record_id).where(RollupState.name == ROLLUP_NAME)) or 0
+
+
+def _claim(db: Session, expected_last: int, **values) -> bool:
+    """Advance the state row only if no other run moved it first (optimistic lock that works on every dialect)."""
+    result = db.execute(
+        update(RollupState)
+        .where(RollupState.name == ROLLUP_NAME, RollupState.last_record_id == expected_last)
+        .values(updated_at=datetime.utcnow(), **values)
+    )
+    return result.rowcount == 1
+
+
+def upsert_increments(db: Session, rows: list[dict]) -> None:
+    """Add counter deltas to existing (date, course, class) rows, inserting the missing ones. Does not commit."""
+    table = AttendanceDailyStats.__table__
+    dialect = db.get_bind().dialect.name
+    for start in range(0, len(rows), UPSERT_CHUNK_ROWS):
+        chunk = rows[start:start + UPSERT_CHUNK_ROWS]
+        if dialect == "mysql":
+            stmt = mysql.insert(table).values(chunk)
+            stmt = stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in COUNTERS})
+        elif dialect in ("postgresql", "sqlite"):
+            stmt = (postgresql if dialect == "postgresql" else sqlite).insert(table).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(_stats_dims),
+                set_={c: table.c[c] + stmt.excluded[c] for c in COUNTERS},
+            )
+        else:
+            for row in chunk:
+                key = [table.c[d] == row[d] for d in _stats_dims]
+                if not db.execute(update(table).where(*key).values({c: table.c[c] + row[c] for c in COUNTERS})).rowcount:
+                    db.execute(insert(table).values(row))
+            continue
+        db.execute(stmt)
+
+
+def refresh(db: Session) -> int:
+    """Fold records committed since the last run into ``attendance_daily_stats``.
+
+    Each run folds up to the highest record_id the *previous* run saw, so a
+    transaction that had already taken an id but not yet committed is not
+    skipped, as long as it commits within one interval. Slower ones are
+    picked up by ``refold_recent``. Safe to run from several workers at once.
+    Returns the number of (date, course, class) groups updated.
+    """
+    started = time.perf_counter()
+    state = _state(db)
+    low, high = state.last_record_id, state.pending_record_id
+    newest = db.scalar(select(func.max(AttendanceRecord.record_id))) or 0
+    if not _claim(db, low, last_record_id=high, pending_record_id=newest):
+        db.rollback()
+        return 0
+    groups = []
+    if high > low:
+        groups = [dict(r._mapping) for r in db.execute(_record_aggregate([AttendanceRecord.record_id > low, AttendanceRecord.record_id <= high]))]
+        upsert_increments(db, groups)
+    db.commit()
+    folded_rows.inc(len(groups))
+    refresh_latency.observe(time.perf_counter() - started)
+    return len(groups)
+
+
+def rebuild(db: Session, start: date | None = None, end: date | None = None) -> int:
+    """Recompute the rollup from ``attendance_record`` for [start, end] (all days when both are None).
+
+    A full rebuild also moves the watermark to the newest record. Returns the number of groups written.
+    """
+    while True:
+        state = _state(db)
+        low = state.last_record_id
+        if start is None and end is None:
+            low = db.scalar(select(func.max(AttendanceRecord.record_id))) or 0
+            claimed = _claim(db, state.last_record_id, last_record_id=low, pending_record_id=low)
+        else:
+            claimed = _claim(db, low)
+        if claimed:
+            break
+        db.rollback()
+    stats_criteria = []
+    if start is not None:
+        stats_criteria.append(AttendanceDailyStats.stat_date >= start)
+    if end is not None:
+        stats_criteria.append(AttendanceDailyStats.stat_date <= end)
+    db.execute(delete(AttendanceDailyStats).where(*stats_criteria))
+    source = _record_aggregate([AttendanceRecord.record_id <= low, *_record_range_criteria(start, end)])
+    db.execute(insert(AttendanceDailyStats).from_select([*_stats_dims, *COUNTERS], source))
+    db.commit()
+    return db.scalar(select(func.count()).select_from(AttendanceDailyStats).where(*stats_criteria)) or 0
+
+
+def refold_recent(db: Session, days: int) -> int:
+    """Rebuild today and the ``days`` days before it (UTC, like ``sign_time``).
+
+    Catches records that committed after a higher record_id had already been
+    folded; ``refresh`` never looks below the watermark again.
+    """
+    today = datetime.utcnow().date()
+    return rebuild(db, today - timedelta(days=days), today)
+
+
+def rollup_counts(db: Session, dims: list[str], start: date | None = None, end: date | None = None, course_ids: list[int] | None = None) -> dict[tuple, dict]:
+    """Counters per ``dims`` (subset of stat_date/course_id/class_id) up to the newest committed record.
+
+    Reads the rollup plus the not-yet-folded tail of ``attendance_record``
+    (a short record_id range), so the cost follows the number of days and
+    groups rather than the number of records. A record that committed after
+    a higher id was folded is missing until the next ``refold_recent``.
+    """
+    stats_criteria = []
+    if start is not None:
+        stats_criteria.append(AttendanceDailyStats.stat_date >= start)
+    if end is not None:
+        stats_criteria.append(AttendanceDailyStats.stat_date <= end)
+    if course_ids is not None:
+        stats_criteria.append(AttendanceDailyStats.course_id.in_(course_ids))
+    keys = [_stats_dims[d] for d in dims]
+    for _ in range(3):
+        low = _folded_up_to(db)
+        stats = db.execute(
+            select(*keys, *[func.sum(getattr(AttendanceDailyStats, c)).label(c) for c in COUNTERS]).where(*stats_criteria).group_by(*keys)
+        ).all()
+        # the tail is selected by primary key range only (other filters could steer the planner onto a
+        # wide secondary-index scan) and filtered here; it holds at most a couple of refresh intervals
+        tail = db.execute(_record_aggregate([AttendanceRecord.record_id > low])).all()
+        if _folded_up_to(db) == low:
+            break
+    counts: dict[tuple, dict] = {}
+    for row in stats:
+        counts[tuple(row[:len(dims)])] = {c: int(row[len(dims) + i] or 0) for i, c in enumerate(COUNTERS)}
+    positions = [list(_record_dims).index(d) for d in dims]
+    for row in tail:
+        stat_date, course_id = row[0], row[1]
+        if (start is not None and stat_date < start) or (end is not None and stat_date > end):
+            continue
+        if course_ids is not None and course_id not in course_ids:
+            continue
+        bucket = counts.setdefault(tuple(row[p] for p in positions), dict.fromkeys(COUNTERS, 0))
+        for i, c in enumerate(COUNTERS):
+            bucket[c] += int(row[3 + i] or 0)
+    return counts
+
+
+class RollupRefresher:
+    """Runs ``refresh`` every ``interval`` seconds on a daemon thread, and
+    ``refold_recent(recheck_days)`` every ``recheck_interval`` seconds (0 = never)."""
+
+    def __init__(self, interval: float, recheck_interval: float = 0, recheck_days: int = 1, session_factory=SessionLocal):
+        self.interval = interval
+        self.recheck_interval = recheck_interval
+        self.recheck_days = recheck_days
+        self._session_factory = session_factory
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="daily-stats-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self) -> None:
+        last_recheck = time.monotonic()
+        while not self._stopping.wait(self.interval):
+            try:
+                with self._session_factory() as db:
+                    refresh(db)
+                    if self.recheck_interval > 0 and time.monotonic() - last_recheck >= self.recheck_interval:
+                        last_recheck = time.monotonic()
+                        refold_recent(db, self.recheck_days)
+            except Exception:
+                logger.exception("daily attendance rollup refresh failed")
+
+
+rollup_refresher = RollupRefresher(settings.rollup_refresh_seconds, settings.rollup_recheck_seconds, settings.rollup_recheck_days)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain attendance_daily_stats")
+    parser.add_argument("--rebuild", action="store_true", help="recompute from attendance_record (backfill)")
+    parser.add_argument("--start", type=date.fromisoformat, default=None, help="first day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="last day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--loop", type=float, default=0, help="keep refreshing every N seconds")
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        if args.rebuild:
+            started = time.perf_counter()
+            groups = rebuild(db, args.start, args.end)
+            print(f"rebuilt {groups} day/course/class groups in {time.perf_counter() - started:.1f}s")
+            return
+        while True:
+            print(f"folded {refresh(db)} groups")
+            if not args.loop:
+                return
+            time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import csv
+import importlib.util
+import io
+import json
+import os
+import tempfile
+from datetime import datetime
+from functools import partial
+from itertools import islice
+from openpyxl import Workbook  # pyright: ignore[reportMissingModuleSource]
+from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
+from ..config import settings
+from ..database import AsyncReadSessionLocal
+from ..models import AttendanceRecord, RecordStatus
+from ..crud.attendance import RECORD_LIST_FIELDS, record_list_select
+
+
+EXPORT_BATCH_ROWS = 5000
+FILE_CHUNK_BYTES = 64 * 1024
+
+# format -> (media type, file suffix)
+EXPORT_FORMATS = {
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx"),
+    "csv": ("text/csv; charset=utf-8", ".csv"),
+    "ndjson": ("application/x-ndjson", ".ndjson"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+# produced row by row straight from the database cursor; the others need a complete file
+STREAMED_FORMATS = {"csv", "ndjson"}
+
+
+class ExportUnavailable(RuntimeError):
+    """The requested format needs an optional dependency that is not installed."""
+
+
+def format_available(fmt: str) -> bool:
+    return fmt != "parquet" or importlib.util.find_spec("pyarrow") is not None
+
+
+def export_criteria(start: datetime, end: datetime, course_id: int | None = None, class_id: int | None = None,
+                    student_id: int | None = None, status: RecordStatus | None = None) -> list:
+    criteria = [AttendanceRecord.sign_time >= start, AttendanceRecord.sign_time <= end]
+    if course_id is not None:
+        criteria.append(AttendanceRecord.course_id == course_id)
+    if class_id is not None:
+        criteria.append(AttendanceRecord.class_id == class_id)
+    if student_id is not None:
+        criteria.append(AttendanceRecord.student_id == student_id)
+    if status is not None:
+        criteria.append(AttendanceRecord.status == status)
+    return criteria
+
+
+def _export_stmt(criteria):
+    return record_list_select(*criteria).order_by(AttendanceRecord.record_id).execution_options(
+        yield_per=EXPORT_BATCH_ROWS, timeout_ms=settings.export_statement_timeout_ms,
+    )
+
+
+def _export_row(row) -> tuple:
+    record_id, course_id, student_id, status, method, sign_time = row
+    return record_id, course_id, student_id, status.value, method.value if method is not None else None, sign_time
+
+
+def iter_record_rows(db: Session, criteria, progress=None):
+    """Export rows in record_id order, fetched ``EXPORT_BATCH_ROWS`` at a time from a server-side cursor.
+
+    ``progress(rows_done)`` is called after every batch.
+    """
+    count = 0
+    for partition in db.execute(_export_stmt(criteria)).partitions(EXPORT_BATCH_ROWS):
+        for row in partition:
+            yield _export_row(row)
+        count += len(partition)
+        if progress:
+            progress(count)
+
+
+def _batches(rows, size: int = EXPORT_BATCH_ROWS):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def csv_header() -> bytes:
+    return (",".join(RECORD_LIST_FIELDS) + "\r\n").encode()
+
+
+def csv_chunk(rows: list[tuple]) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf).writerows((*r[:5], r[5].isoformat(sep=" ") if r[5] else None) for r in rows)
+    return buf.getvalue().encode()
+
+
+def ndjson_chunk(rows: list[tuple]) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(RECORD_LIST_FIELDS, (*r[:5], r[5].isoformat() if r[5] else None))), ensure_ascii=False) + "\n"
+        for r in rows
+    ).encode()
+
+
+TEXT_ENCODERS = {"csv": (csv_header, csv_chunk), "ndjson": (lambda: b"", ndjson_chunk)}
+
+
+async def stream_records(fmt: str, criteria):
+    """CSV/NDJSON bytes produced as rows arrive, on an async session owned by the stream itself."""
+    header, encode = TEXT_ENCODERS[fmt]
+    if first := header():
+        yield first
+    async with AsyncReadSessionLocal() as db:
+        result = await db.stream(_export_stmt(criteria))
+        async for partition in result.partitions(EXPORT_BATCH_ROWS):
+            yield encode([_export_row(r) for r in partition])
+
+
+def write_records_text(fmt: str, db: Session, path: str, criteria, progress=None) -> int:
+    header, encode = TEXT_ENCODERS[fmt]
+    count = 0
+    with open(path, "wb") as f:
+        f.write(header())
+        for batch in _batches(iter_record_rows(db, criteria, progress)):
+            f.write(encode(batch))
+            count += len(batch)
+    return count
+
+
+def write_records_xlsx(db: Session, path: str, criteria, progress=None) -> int:
+    """Write the matching records to ``path`` with a write-only workbook (rows go to disk as they are appended)."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("attendance")
+    ws.append(RECORD_LIST_FIELDS)
+    count = 0
+    for row in iter_record_rows(db, criteria, progress):
+        ws.append(row)
+        count += 1
+    wb.save(path)
+    return count
+
+
+def write_records_parquet(db: Session, path: str, criteria, progress=None) -> int:
+    try:
+        import pyarrow as pa  # pyright: ignore[reportMissingImports]
+        import pyarrow.parquet as pq  # pyright: ignore[reportMissingImports]
+    except ImportError:
+        raise ExportUnavailable("parquet export requires pyarrow")
+    schema = pa.schema([
+        ("record_id", pa.int64()), ("course_id", pa.int64()), ("student_id", pa.int64()),
+        ("status", pa.string()), ("sign_method", pa.string()), ("sign_time", pa.timestamp("us")),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in _batches(iter_record_rows(db, criteria, progress)):
+            writer.write_table(pa.Table.from_arrays([list(col) for col in zip(*batch)], schema=schema))
+            count += len(batch)
+    return count
+
+
+FILE_WRITERS = {
+    "xlsx": write_records_xlsx,
+    "parquet": write_records_parquet,
+    "csv": partial(write_records_text, "csv"),
+    "ndjson": partial(write_records_text, "ndjson"),
+}
+
+
+def temp_export_path(suffix: str) -> str:
+    fd, path = tempfile.mkstemp(prefix="attendance-export-", suffix=suffix)
+    os.close(fd)
+    return path
+
+
+def iter_file_and_remove(path: str, chunk_size: int = FILE_CHUNK_BYTES):
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+    finally:
+        os.remove(path)
@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import func, select  # pyright: ignore[reportMissingImports]
+from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
+from ..config import settings
+from ..database import ReadSessionLocal
+from ..models import AttendanceRecord
+from ..redis_client import redis_client
+from .. import metrics
+from .export import EXPORT_FORMATS, FILE_WRITERS
+
+
+JOB_TTL_SECONDS = 7 * 24 * 3600
+# a queued/running job whose heartbeat is older than this is assumed lost (e.g. the worker restarted);
+# running builds beat for themselves and for the jobs queued behind them on the same worker
+JOB_STALE_SECONDS = 300
+
+cache_hits = metrics.counter("export_jobs.cache_hits")
+jobs_started = metrics.counter("export_jobs.started")
+jobs_failed = metrics.counter("export_jobs.failed")
+build_latency = metrics.latency("export_jobs.build")
+
+
+def data_watermark(db: Session, criteria) -> tuple[int, int]:
+    """(row count, highest record_id) over the rows an export would contain.
+
+    ``attendance_record`` is append-only, so any change to the matching rows
+    moves one of the two numbers.
+    """
+    total, top = db.execute(select(func.count(), func.max(AttendanceRecord.record_id)).where(*criteria)).one()
+    return total, top or 0
+
+
+def result_key(params: dict, watermark: tuple[int, int]) -> str:
+    payload = json.dumps({"params": params, "watermark": watermark}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _job_key(job_id: str) -> str:
+    return f"export_job:{job_id}"
+
+
+def _cache_key(key: str) -> str:
+    return f"export_cache:{key}"
+
+
+def get_export_job(job_id: str) -> dict | None:
+    return redis_client.hgetall(_job_key(job_id)) or None
+
+
+def _lost(job: dict) -> bool:
+    return job.get("status") in ("queued", "running") and time.time() - float(job.get("updated_at", 0)) >= JOB_STALE_SECONDS
+
+
+def _reusable(job: dict) -> bool:
+    if job.get("status") == "done":
+        return os.path.exists(job.get("path", ""))
+    return job.get("status") in ("queued", "running") and not _lost(job)
+
+
+def describe_job(job_id: str, job: dict) -> dict:
+    """Job hash as returned to clients, with progress and an ETA derived from the rate so far.
+
+    A queued/running job without a heartbeat for ``JOB_STALE_SECONDS`` is
+    reported as failed: its worker is gone and nothing will finish it. Jobs
+    waiting for a free thread are kept fresh by the builds ahead of them.
+    """
+    if _lost(job):
+        job = {**job, "status": "failed", "error": f"lost: no progress for {JOB_STALE_SECONDS}s (worker restarted?)"}
+    total, done = int(job.get("rows_total", 0)), int(job.get("rows_done", 0))
+    info = {
+        "job_id": job_id,
+        "status": job["status"],
+        "format": job["format"],
+        "rows_total": total,
+        "rows_done": done,
+        "progress": round(done / total, 4) if total else (1.0 if job["status"] == "done" else 0.0),
+        "eta_seconds": None,
+        "cached": job.get("cached") == "1",
+    }
+    if job["status"] == "running" and done and job.get("started_at"):
+        rate = done / max(time.time() - float(job["started_at"]), 1e-6)
+        info["eta_seconds"] = round((total - done) / rate, 1)
+    if job["status"] == "done":
+        info["size"] = int(job.get("size", 0))
+    if job["status"] == "failed":
+        info["error"] = job.get("error")
+    return info
+
+
+def prune_exports(max_age: float) -> int:
+    """Delete export files older than ``max_age`` seconds; their cache entries have expired by then."""
+    removed = 0
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(settings.export_dir))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+class ExportJobs:
+    """Builds export files on a small thread pool; job state lives in Redis so any worker can report it.
+
+    Finished files are keyed by (format, range, filters, data watermark), so a
+    repeated request for unchanged data is answered with the existing job.
+    Files are on this host's disk (``EXPORT_DIR``); with several hosts the
+    download must be routed to the one that built it, or the directory shared.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._queued: set[str] = set()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="export-job")
+        return self._executor
+
+    def submit(self, fmt: str, params: dict, criteria) -> tuple[str, dict]:
+        with ReadSessionLocal() as db:
+            total, top = data_watermark(db, criteria)
+        key = result_key({**params, "format": fmt}, (total, top))
+        existing = redis_client.get(_cache_key(key))
+        if existing:
+            job = get_export_job(existing)
+            if job and _reusable(job):
+                cache_hits.inc()
+                return existing, {**job, "cached": "1"}
+        job_id = secrets.token_hex(8)
+        path = os.path.join(settings.export_dir, key + EXPORT_FORMATS[fmt][1])
+        now = time.time()
+        job = {
+            "status": "queued", "format": fmt, "result_key": key, "path": path,
+            "rows_total": total, "rows_done": 0, "created_at": now, "updated_at": now,
+        }
+        pipe = redis_client.pipeline()
+        pipe.hset(_job_key(job_id), mapping=job)
+        pipe.expire(_job_key(job_id), JOB_TTL_SECONDS)
+        pipe.set(_cache_key(key), job_id, ex=settings.export_cache_ttl_seconds)
+        pipe.execute()
+        jobs_started.inc()
+        with self._lock:
+            self._queued.add(job_id)
+        self._get_executor().submit(self._build, job_id, fmt, criteria, path)
+        return job_id, {k: str(v) for k, v in job.items()}
+
+    def _beat_queued(self, now: float) -> None:
+        with self._lock:
+            queued = list(self._queued)
+        if queued:
+            pipe = redis_client.pipeline(transaction=False)
+            for job_id in queued:
+                pipe.hset(_job_key(job_id), "updated_at", now)
+            pipe.execute()
+
+    def _build(self, job_id: str, fmt: str, criteria, path: str) -> None:
+        key = _job_key(job_id)
+        with self._lock:
+            self._queued.discard(job_id)
+        started = time.time()
+        redis_client.hset(key, mapping={"status": "running", "started_at": started, "updated_at": started})
+        self._beat_queued(started)
+
+        def progress(done):
+            now = time.time()
+            redis_client.hset(key, mapping={"rows_done": done, "updated_at": now})
+            self._beat_queued(now)
+
+        os.makedirs(settings.export_dir, exist_ok=True)
+        prune_exports(settings.export_cache_ttl_seconds)
+        # built under a private name and renamed, so a download never sees a partial file
+        part = f"{path}.{job_id}.part"
+        try:
+            with ReadSessionLocal() as db:
+                rows = FILE_WRITERS[fmt](db, part, criteria, progress)
+            os.replace(part, path)
+        except Exception as exc:
+            jobs_failed.inc()
+            if os.path.exists(part):
+                os.remove(part)
+            redis_client.hset(key, mapping={"status": "failed", "error": str(exc)[:500], "updated_at": time.time()})
+            return
+        finished = time.time()
+        build_latency.observe(finished - started)
+        redis_client.hset(key, mapping={
+            "status": "done", "rows_done": rows, "rows_total": rows, "size": os.path.getsize(path),
+            "finished_at": finished, "updated_at": finished,
+        })
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        with self._lock:
+            self._queued.clear()
+
+
+export_jobs = ExportJobs(settings.export_workers)
@@ -0,0 +1,161 @@
+import json
+import logging
+import math
+import threading
+from collections import defaultdict
+from redis.exceptions import RedisError  # pyright: ignore[reportMissingImports]
+from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
+from ..database import SessionLocal
+from ..models import Classroom, CourseRoom
+from ..redis_client import redis_client, run_subscriber
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG_LAT = 111320.0
+RELOAD_CHANNEL = "geofence:reload"
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def point_in_polygon(lng: float, lat: float, polygon: list) -> bool:
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        xi, yi = polygon[i]
+        xj, yj = polygon[j]
+        if (yi > lat) != (yj > lat) and lng < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+class Fence:
+    """A classroom fence: a polygon if one is registered, else a circle."""
+
+    __slots__ = ("room_id", "room_name", "lat", "lng", "radius_m", "polygon", "bbox")
+
+    def __init__(self, room_id: int, room_name: str, lat: float, lng: float, radius_m: float, polygon: list | None = None):
+        self.room_id = room_id
+        self.room_name = room_name
+        self.lat = lat
+        self.lng = lng
+        self.radius_m = radius_m
+        self.polygon = polygon
+        if polygon is not None and (len(polygon) < 3 or any(len(p) != 2 for p in polygon)):
+            raise ValueError("polygon needs at least 3 [lng, lat] vertices")
+        if polygon:
+            lngs = [p[0] for p in polygon]
+            lats = [p[1] for p in polygon]
+            self.bbox = (min(lats), min(lngs), max(lats), max(lngs))
+        else:
+            dlat = radius_m / METERS_PER_DEG_LAT
+            dlng = radius_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+            self.bbox = (lat - dlat, lng - dlng, lat + dlat, lng + dlng)
+
+    def in_bbox(self, lat: float, lng: float) -> bool:
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
+
+    def contains(self, lat: float, lng: float) -> bool:
+        if not self.in_bbox(lat, lng):
+            return False
+        if self.polygon:
+            return point_in_polygon(lng, lat, self.polygon)
+        return haversine_m(lat, lng, self.lat, self.lng) <= self.radius_m
+
+
+class GeofenceIndex:
+    """In-process fence registry, keyed by course."""
+
+    def __init__(self, fences: list[Fence] | None = None, course_rooms: list[tuple[int, int]] | None = None):
+        self._rooms = {f.room_id: f for f in fences or []}
+        self._by_course: dict[int, list[Fence]] = defaultdict(list)
+        for course_id, room_id in course_rooms or []:
+            if room_id in self._rooms:
+                self._by_course[course_id].append(self._rooms[room_id])
+
+    def fences_for_course(self, course_id: int) -> list[Fence]:
+        return self._by_course.get(course_id, [])
+
+    def match_course(self, course_id: int, lat: float, lng: float) -> Fence | None:
+        for fence in self.fences_for_course(course_id):
+            if fence.contains(lat, lng):
+                return fence
+        return None
+
+
+def build_index(db: Session) -> GeofenceIndex:
+    """Index every classroom; a row with an unusable polygon is logged and left out."""
+    fences = []
+    for r in db.query(Classroom).all():
+        try:
+            fences.append(Fence(r.room_id, r.room_name, r.lat, r.lng, r.radius_m or 0, json.loads(r.polygon) if r.polygon else None))
+        except (ValueError, TypeError, IndexError):
+            logger.error("classroom %s has an invalid fence and is ignored", r.room_id)
+    course_rooms = [(cr.course_id, cr.room_id) for cr in db.query(CourseRoom).all()]
+    return GeofenceIndex(fences, course_rooms)
+
+
+geofence_index = GeofenceIndex()
+
+
+def load_geofences(db: Session) -> GeofenceIndex:
+    global geofence_index
+    geofence_index = build_index(db)
+    return geofence_index
+
+
+def get_geofence_index() -> GeofenceIndex:
+    return geofence_index
+
+
+def geofences_changed(db: Session) -> None:
+    """Reload this worker's index and tell every other worker to reload theirs."""
+    load_geofences(db)
+    try:
+        redis_client.publish(RELOAD_CHANNEL, "1")
+    except RedisError:
+        logger.warning("could not publish geofence reload; other workers keep their fences until restart")
+
+
+class GeofenceReloader:
+    """Reloads the index when another worker publishes a change on ``RELOAD_CHANNEL``."""
+
+    def __init__(self, session_factory=SessionLocal):
+        self._session_factory = session_factory
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="geofence-reload", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _reload(self) -> None:
+        try:
+            with self._session_factory() as db:
+                load_geofences(db)
+        except Exception:
+            logger.exception("geofence reload failed; keeping the previous fences")
+
+    def _listen(self) -> None:
+        # changes published while unsubscribed are lost, so every (re)subscribe reloads too
+        run_subscriber(RELOAD_CHANNEL, lambda message: self._reload(), self._reload, self._stopping)
+
+
+geofence_reloader = GeofenceReloader()
@@ -0,0 +1,191 @@
+import json
+import numpy as np  # pyright: ignore[reportMissingImports]
+from datetime import datetime
+from redis.exceptions import RedisError  # pyright: ignore[reportMissingImports]
+from sqlalchemy import select  # pyright: ignore[reportMissingImports]
+from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
+from ..config import settings
+from ..models import AttendanceRecord, ClassCourse, RecordStatus, Student
+from ..redis_client import redis_client, async_redis_client, raw_redis_client
+from .. import metrics
+
+
+# Per-session bitmaps, bit offset = student_id:
+#   qrsess:<session_id>:bits    students who signed in so far
+#   qrsess:<session_id>:roster  students expected in the session (built at open)
+# New sign-ins are also published on qrsess:<session_id>:events for the teacher feed.
+# The active session of a course is qrsess:course:<course_id> (see qrcode_service).
+
+mark_errors = metrics.counter("live_attendance.mark_errors")
+
+# Resolve the course's active session, set the student's bit and publish the
+# new count to the session's event channel, all in one round trip. Only
+# roster students count, so the published figure matches live_counts().
+MARK_LUA = """
+local session_id = redis.call('GET', KEYS[1])
+if not session_id then
+  return false
+end
+local prefix = 'qrsess:' .. session_id
+local key = prefix .. ':bits'
+local before = redis.call('SETBIT', key, ARGV[1], 1)
+redis.call('EXPIRE', key, ARGV[2])
+if before == 0 and redis.call('GETBIT', prefix .. ':roster', ARGV[1]) == 1 then
+  local tmp = prefix .. ':on_roster'
+  redis.call('BITOP', 'AND', tmp, prefix .. ':roster', key)
+  local signed = redis.call('BITCOUNT', tmp)
+  redis.call('DEL', tmp)
+  local event = cjson.encode({type = 'signin', student_id = tonumber(ARGV[1]), delta = 1, signed = signed})
+  redis.call('PUBLISH', prefix .. ':events', event)
+end
+return session_id
+"""
+
+_mark = redis_client.register_script(MARK_LUA)
+_mark_async = async_redis_client.register_script(MARK_LUA)
+
+
+def bits_key(session_id: str) -> str:
+    return f"qrsess:{session_id}:bits"
+
+
+def roster_key(session_id: str) -> str:
+    return f"qrsess:{session_id}:roster"
+
+
+def events_channel(session_id: str) -> str:
+    return f"qrsess:{session_id}:events"
+
+
+def ids_to_bitmap(ids) -> bytes:
+    ids = np.asarray(list(ids), dtype=np.int64)
+    if ids.size == 0:
+        return b""
+    bits = np.zeros(int(ids.max()) + 1, dtype=np.uint8)
+    bits[ids] = 1
+    # Redis bit 0 is the most significant bit of byte 0, same as np.packbits
+    return np.packbits(bits).tobytes()
+
+
+def bitmap_to_ids(bitmap: bytes | None) -> list[int]:
+    if not bitmap:
+        return []
+    return np.flatnonzero(np.unpackbits(np.frombuffer(bitmap, dtype=np.uint8))).tolist()
+
+
+def roster_student_ids(db: Session, course_id: int) -> list[int]:
+    stmt = (
+        select(Student.student_id)
+        .join(ClassCourse, ClassCourse.class_id == Student.class_id)
+        .where(ClassCourse.course_id == course_id)
+    )
+    return list(db.scalars(stmt))
+
+
+def init_session(db: Session, session_id: str, course_id: int) -> int:
+    """Write the session's roster bitmap; returns the roster size."""
+    ids = roster_student_ids(db, course_id)
+    pipe = raw_redis_client.pipeline()
+    pipe.set(roster_key(session_id), ids_to_bitmap(ids), ex=settings.qr_session_ttl_seconds)
+    pipe.delete(bits_key(session_id))
+    pipe.execute()
+    return len(ids)
+
+
+def mark_signed(course_id: int, student_id: int) -> None:
+    try:
+        _mark(keys=[f"qrsess:course:{course_id}"], args=[student_id, settings.qr_session_ttl_seconds])
+    except RedisError:
+        mark_errors.inc()
+
+
+async def mark_signed_async(course_id: int, student_id: int) -> None:
+    try:
+        await _mark_async(keys=[f"qrsess:course:{course_id}"], args=[student_id, settings.qr_session_ttl_seconds])
+    except RedisError:
+        mark_errors.inc()
+
+
+def mark_signed_many(pairs: list[tuple[int, int]]) -> None:
+    if not pairs:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for course_id, student_id in pairs:
+            _mark(keys=[f"qrsess:course:{course_id}"], args=[student_id, settings.qr_session_ttl_seconds], client=pipe)
+        pipe.execute()
+    except RedisError:
+        mark_errors.inc()
+
+
+def _queue_counts(pipe, session_id: str) -> None:
+    # roster AND signed: sign-ins by students outside the roster (e.g. a teacher signing on someone's behalf) do not count
+    tmp = f"qrsess:{session_id}:on_roster"
+    pipe.bitop("AND", tmp, roster_key(session_id), bits_key(session_id))
+    pipe.bitcount(tmp)
+    pipe.bitcount(roster_key(session_id))
+    pipe.delete(tmp)
+
+
+def _counts(replies: list) -> dict:
+    _, signed, roster, _ = replies
+    return {"signed": signed, "roster": roster, "rate": 0.0 if roster == 0 else signed / roster}
+
+
+def live_counts(session_id: str) -> dict:
+    pipe = redis_client.pipeline()
+    _queue_counts(pipe, session_id)
+    return _counts(pipe.execute())
+
+
+async def live_counts_async(session_id: str) -> dict:
+    pipe = async_redis_client.pipeline()
+    _queue_counts(pipe, session_id)
+    return _counts(await pipe.execute())
+
+
+def publish_closed(session_id: str, summary: dict) -> None:
+    redis_client.publish(events_channel(session_id), json.dumps({"type": "closed", **summary}))
+
+
+def missing_students(session_id: str) -> list[int]:
+    """Roster AND NOT signed, computed server-side with BITOP."""
+    tmp = f"qrsess:{session_id}:missing"
+    pipe = raw_redis_client.pipeline()
+    # roster XOR (roster AND signed) == roster AND NOT signed, without NOT's length padding
+    pipe.bitop("AND", tmp, roster_key(session_id), bits_key(session_id))
+    pipe.bitop("XOR", tmp, roster_key(session_id), tmp)
+    pipe.get(tmp)
+    pipe.delete(tmp)
+    return bitmap_to_ids(pipe.execute()[2])
+
+
+def signed_in_table(db: Session, course_id: int, opened_at: datetime) -> list[int]:
+    stmt = select(AttendanceRecord.student_id).where(
+        AttendanceRecord.course_id == course_id,
+        AttendanceRecord.sign_time >= opened_at,
+        AttendanceRecord.status.in_([RecordStatus.present, RecordStatus.late]),
+    )
+    return list(set(db.scalars(stmt)))
+
+
+def reconcile(db: Session, session_id: str, course_id: int, opened_at: datetime) -> dict:
+    """Make the session bitmap agree with attendance_record at session close.
+
+    The table is authoritative: bits missing for stored rows are set, and bits
+    without a row (e.g. stream entries not yet written) are reported.
+    """
+    table_ids = set(signed_in_table(db, course_id, opened_at))
+    redis_ids = set(bitmap_to_ids(raw_redis_client.get(bits_key(session_id))))
+    added = sorted(table_ids - redis_ids)
+    if added:
+        pipe = redis_client.pipeline(transaction=False)
+        for student_id in added:
+            pipe.setbit(bits_key(session_id), student_id, 1)
+        pipe.expire(bits_key(session_id), settings.qr_session_ttl_seconds)
+        pipe.execute()
+    return {
+        "signed_in_table": len(table_ids),
+        "bits_added": len(added),
+        "bits_without_record": sorted(redis_ids - table_ids),
+    }
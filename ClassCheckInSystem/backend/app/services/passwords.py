@@ -0,0 +1,132 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from passlib.context import CryptContext  # pyright: ignore[reportMissingModuleSource]
+from ..config import settings
+from .. import metrics
+
+
+hash_latency = metrics.latency("passwords.hash")
+verify_latency = metrics.latency("passwords.verify")
+rehashed = metrics.counter("passwords.rehashed")
+rejected = metrics.counter("passwords.rejected_busy")
+
+
+def make_context(rounds: int) -> CryptContext:
+    # min == max == default: any hash made with a different cost "needs update"
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds)
+
+
+pwd_context = make_context(settings.bcrypt_rounds)
+
+
+class PoolBusy(Exception):
+    """More password operations are queued than PASSWORD_POOL_MAX_PENDING allows."""
+
+
+# The functions below run in the pool's worker processes.
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+@lru_cache(maxsize=None)
+def _context_for(rounds: int) -> CryptContext:
+    return make_context(rounds)
+
+
+def hash_with_rounds(password: str, rounds: int) -> str:
+    return _context_for(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(password, hashed)
+
+
+def _time_rounds(rounds: int, samples: int) -> float:
+    ctx = make_context(rounds)
+    started = time.perf_counter()
+    for _ in range(samples):
+        ctx.hash("calibration-password")
+    return (time.perf_counter() - started) / samples
+
+
+class PasswordPool:
+    """Process pool dedicated to bcrypt so logins never burn event-loop or threadpool time.
+
+    ``max_pending`` bounds queued + running operations; beyond it callers get
+    ``PoolBusy`` instead of an ever-growing queue.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the parent already runs the buffer / listener threads
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                rejected.inc()
+                raise PoolBusy()
+            self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def pending(self) -> int:
+        return self._pending
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+password_pool = PasswordPool(settings.password_pool_workers, settings.password_pool_max_pending)
+metrics.gauge("passwords.pending", password_pool.pending)
+
+
+async def hash_password_async(password: str) -> str:
+    started = time.perf_counter()
+    hashed = await password_pool.run(_hash, password)
+    hash_latency.observe(time.perf_counter() - started)
+    return hashed
+
+
+async def verify_password_async(password: str, hashed: str) -> tuple[bool, str | None]:
+    """(matches, new_hash); ``new_hash`` is set when the stored hash uses another cost."""
+    started = time.perf_counter()
+    ok, new_hash = await password_pool.run(_verify_and_update, password, hashed)
+    verify_latency.observe(time.perf_counter() - started)
+    if new_hash is not None:
+        rehashed.inc()
+    return ok, new_hash
+
+
+async def calibrate(rounds: list[int], samples: int = 3, target_ms: float = 250) -> dict:
+    """Time one hash per bcrypt cost on a pool worker and pick the highest cost within ``target_ms``."""
+    timings = {r: await password_pool.run(_time_rounds, r, samples) * 1000 for r in rounds}
+    within = [r for r, ms in timings.items() if ms <= target_ms]
+    return {
+        "configured_rounds": settings.bcrypt_rounds,
+        "target_ms": target_ms,
+        "recommended_rounds": max(within) if within else min(rounds),
+        "ms_per_hash": {r: round(ms, 1) for r, ms in timings.items()},
+        "pool_workers": password_pool.workers,
+        "logins_per_second": round(password_pool.workers * 1000 / timings[settings.bcrypt_rounds], 1) if settings.bcrypt_rounds in timings else None,
+    }
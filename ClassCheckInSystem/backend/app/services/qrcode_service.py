@@ -1,12 +1,272 @@
+import base64
+import enum
+import hashlib
+import hmac
+import secrets
+import time
 from datetime import datetime
-from ..redis_client import set_with_ttl, get_and_delete
+from ..config import settings
+from ..redis_client import redis_client, async_redis_client
 
 
-def generate_qr_token(course_id: int) -> str:
-    token = f"QR:{course_id}:{int(datetime.utcnow().timestamp())}"
-    set_with_ttl(f"qr:{token}", "1", 300)
-    return token
+SIGNED_PREFIX = "QR2"
+SESSION_PREFIX = "QS"
 
 
-def consume_qr_token(qr_token: str) -> bool:
-    return get_and_delete(f"qr:{qr_token}") is not None
+class QRResult(str, enum.Enum):
+    ok = "ok"
+    invalid = "invalid"
+    duplicate = "duplicate"
+
+
+# Single-use QR: QR2.<course_id>.<issued_at>.<expires_at>.<nonce>.<sig>, where
+# sig is an HMAC over everything before it. Validity and expiry are checked in
+# pure CPU; Redis is only hit once, for the SET NX that makes the token single-use.
+
+def _sign(payload: str) -> str:
+    digest = hmac.new(settings.qr_secret.encode(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).rstrip(b"=").decode()
+
+
+def generate_qr_token(course_id: int, ttl_seconds: int | None = None) -> str:
+    issued_at = int(time.time())
+    expires_at = issued_at + (ttl_seconds or settings.qr_token_ttl_seconds)
+    payload = f"{SIGNED_PREFIX}.{course_id}.{issued_at}.{expires_at}.{secrets.token_urlsafe(6)}"
+    return f"{payload}.{_sign(payload)}"
+
+
+def _signed_claims(qr_token: str) -> dict | None:
+    payload, _, sig = qr_token.rpartition(".")
+    parts = payload.split(".")
+    if len(parts) != 5 or parts[0] != SIGNED_PREFIX:
+        return None
+    if not hmac.compare_digest(sig.encode(), _sign(payload).encode()):
+        return None
+    try:
+        course_id, issued_at, expires_at = int(parts[1]), int(parts[2]), int(parts[3])
+    except ValueError:
+        return None
+    return {"course_id": course_id, "issued_at": issued_at, "expires_at": expires_at, "nonce": parts[4]}
+
+
+def _nonce_key(nonce: str) -> str:
+    return f"qr:used:{nonce}"
+
+
+def verify_qr_token(qr_token: str, now: float | None = None) -> dict | None:
+    """Return the token claims if the signature is valid and unexpired, else None."""
+    claims = _signed_claims(qr_token)
+    if claims is None or (now or time.time()) >= claims["expires_at"]:
+        return None
+    return claims
+
+
+# Session QR: one rotating token per class session, usable once per student.
+# Tokens look like QS:<session_id>:<window>:<code>, where window is
+# now // rotate_seconds and code is an HMAC of (session_id, window), so the
+# displayed code changes every window without any Redis write.
+
+def _session_key(session_id: str) -> str:
+    return f"qrsess:{session_id}"
+
+
+def _session_code(session_id: str, window: int) -> str:
+    msg = f"{session_id}:{window}".encode()
+    return hmac.new(settings.qr_secret.encode(), msg, hashlib.sha256).hexdigest()[:16]
+
+
+def is_session_token(qr_token: str) -> bool:
+    return qr_token.startswith(SESSION_PREFIX + ":")
+
+
+def open_qr_session(course_id: int, rotate_seconds: int | None = None, ttl_seconds: int | None = None) -> str:
+    rotate = settings.qr_session_rotate_seconds if rotate_seconds is None else rotate_seconds
+    ttl = settings.qr_session_ttl_seconds if ttl_seconds is None else ttl_seconds
+    if rotate <= 0 or ttl <= 0:
+        raise ValueError("rotate_seconds and ttl_seconds must be positive")
+    session_id = secrets.token_hex(8)
+    pipe = redis_client.pipeline()
+    pipe.hset(_session_key(session_id), mapping={
+        "course_id": course_id,
+        "rotate_seconds": rotate,
+        "opened_at": datetime.utcnow().isoformat(),
+    })
+    pipe.expire(_session_key(session_id), ttl)
+    pipe.set(f"qrsess:course:{course_id}", session_id, ex=ttl)
+    pipe.execute()
+    return session_id
+
+
+def get_qr_session(session_id: str) -> dict | None:
+    return redis_client.hgetall(_session_key(session_id)) or None
+
+
+# Deletes KEYS[1] only while it still names ARGV[1], so closing an old session
+# cannot unset a newer one opened for the same course in between.
+DELETE_IF_EQUALS_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def close_qr_session(session_id: str, course_id: int) -> None:
+    """Stop accepting the session's QR token; its keys stay until they expire."""
+    redis_client.hset(_session_key(session_id), "closed_at", datetime.utcnow().isoformat())
+    redis_client.eval(DELETE_IF_EQUALS_LUA, 1, f"qrsess:course:{course_id}", session_id)
+
+
+def current_session_token(session_id: str) -> dict | None:
+    rotate, closed_at = redis_client.hmget(_session_key(session_id), "rotate_seconds", "closed_at")
+    if rotate is None or closed_at is not None:
+        return None
+    rotate = int(rotate)
+    now = time.time()
+    window = int(now // rotate)
+    return {
+        "qr_token": f"{SESSION_PREFIX}:{session_id}:{window}:{_session_code(session_id, window)}",
+        "expires_in": round(rotate - now % rotate, 1),
+    }
+
+
+def _parse_session_token(qr_token: str) -> tuple[str, int] | None:
+    try:
+        _, session_id, window, code = qr_token.split(":")
+        window = int(window)
+    except ValueError:
+        return None
+    if not hmac.compare_digest(code.encode(), _session_code(session_id, window).encode()):
+        return None
+    return session_id, window
+
+
+def _queue_checks(pipe, checks: list) -> list:
+    """Queue the Redis side of each check on ``pipe``; returns the reply plan."""
+    plans = []
+    for i, (token, course_id, student_id, at) in enumerate(checks):
+        if is_session_token(token):
+            parsed = _parse_session_token(token)
+            if parsed is None:
+                continue
+            session_id, window = parsed
+            signed_key = f"{_session_key(session_id)}:signed"
+            pipe.hmget(_session_key(session_id), "course_id", "rotate_seconds", "closed_at")
+            pipe.sadd(signed_key, student_id)
+            pipe.expire(signed_key, settings.qr_session_ttl_seconds)
+            plans.append((i, "session", (signed_key, window, course_id, student_id, at)))
+        elif token.startswith("QR:"):
+            # Redis-stored tokens issued before the signed format; they expire within minutes
+            pipe.get(f"qr:{token}")
+            pipe.delete(f"qr:{token}")
+            plans.append((i, "legacy", None))
+        else:
+            claims = verify_qr_token(token, now=at)
+            if claims is None or claims["course_id"] != course_id:
+                continue
+            # a batch upload may present the token up to signin_batch_max_age_seconds after it expired
+            ttl = max(1, claims["expires_at"] + settings.signin_batch_max_age_seconds - int(time.time()))
+            pipe.set(_nonce_key(claims["nonce"]), "1", nx=True, ex=ttl)
+            plans.append((i, "signed", None))
+    return plans
+
+
+def _read_replies(plans: list, replies: list, results: list) -> list:
+    """Fill ``results`` from pipeline replies; returns (key, member) SADDs to undo."""
+    replies = iter(replies)
+    undo = []
+    for i, kind, extra in plans:
+        if kind == "session":
+            (session_course, rotate, closed_at), added, _ = next(replies), next(replies), next(replies)
+            signed_key, window, course_id, student_id, at = extra
+            valid = session_course is not None and closed_at is None and int(session_course) == course_id
+            if valid:
+                current = int((at or time.time()) // int(rotate))
+                valid = window in (current, current - 1)
+            if not valid:
+                if added:
+                    undo.append((signed_key, student_id))
+                continue
+            results[i] = QRResult.ok if added else QRResult.duplicate
+        elif kind == "legacy":
+            value, _ = next(replies), next(replies)
+            if value is not None:
+                results[i] = QRResult.ok
+        elif next(replies):
+            results[i] = QRResult.ok
+    return undo
+
+
+def check_qr_tokens(checks: list[tuple[str, int, int, float | None]]) -> list[QRResult]:
+    """Validate and consume QR tokens given as (token, course_id, student_id, at).
+
+    Signatures, expiry and session windows are checked in pure CPU; every Redis
+    operation for the whole list (nonce SET NX, session lookup + per-student
+    SADD, legacy GET+DEL) goes out in a single pipeline. ``at`` is the epoch
+    time the scan happened, defaulting to now.
+    """
+    results = [QRResult.invalid] * len(checks)
+    pipe = redis_client.pipeline(transaction=False)
+    plans = _queue_checks(pipe, checks)
+    if not plans:
+        return results
+    undo = _read_replies(plans, pipe.execute(), results)
+    if undo:
+        pipe = redis_client.pipeline(transaction=False)
+        for signed_key, student_id in undo:
+            pipe.srem(signed_key, student_id)
+        pipe.execute()
+    return results
+
+
+async def check_qr_tokens_async(checks: list[tuple[str, int, int, float | None]]) -> list[QRResult]:
+    results = [QRResult.invalid] * len(checks)
+    pipe = async_redis_client.pipeline(transaction=False)
+    plans = _queue_checks(pipe, checks)
+    if not plans:
+        return results
+    undo = _read_replies(plans, await pipe.execute(), results)
+    if undo:
+        pipe = async_redis_client.pipeline(transaction=False)
+        for signed_key, student_id in undo:
+            pipe.srem(signed_key, student_id)
+        await pipe.execute()
+    return results
+
+
+def _queue_releases(pipe, releases: list) -> bool:
+    queued = False
+    for token, student_id in releases:
+        if is_session_token(token):
+            parsed = _parse_session_token(token)
+            if parsed is not None:
+                pipe.srem(f"{_session_key(parsed[0])}:signed", student_id)
+                queued = True
+        else:
+            claims = _signed_claims(token)
+            if claims is not None:
+                pipe.delete(_nonce_key(claims["nonce"]))
+                queued = True
+    return queued
+
+
+def release_qr_tokens(releases: list[tuple[str, int]]) -> None:
+    """Undo the consumption of (token, student_id) pairs whose record could not be written,
+    so the student can scan again instead of being told they already signed in."""
+    pipe = redis_client.pipeline(transaction=False)
+    if _queue_releases(pipe, releases):
+        pipe.execute()
+
+
+async def release_qr_tokens_async(releases: list[tuple[str, int]]) -> None:
+    pipe = async_redis_client.pipeline(transaction=False)
+    if _queue_releases(pipe, releases):
+        await pipe.execute()
+
+
+def consume_qr_token(qr_token: str, course_id: int, student_id: int) -> QRResult:
+    return check_qr_tokens([(qr_token, course_id, student_id, None)])[0]
+
+
+async def consume_qr_token_async(qr_token: str, course_id: int, student_id: int) -> QRResult:
+    return (await check_qr_tokens_async([(qr_token, course_id, student_id, None)]))[0]
@@ -0,0 +1,219 @@
+import argparse
+import io
+import multiprocessing
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np  # pyright: ignore[reportMissingImports]
+import pandas as pd  # pyright: ignore[reportMissingImports]
+from sqlalchemy import insert, select  # pyright: ignore[reportMissingImports]
+from sqlalchemy.orm import Session  # pyright: ignore[reportMissingImports]
+from ..config import settings
+from ..database import SessionLocal
+from ..models import Class, RoleEnum, Student, UserBase
+from ..redis_client import redis_client
+from .passwords import hash_with_rounds
+from .qrcode_service import DELETE_IF_EQUALS_LUA
+
+
+# an initial password is required: the student number is semi-public and nothing forces a change
+REQUIRED_COLUMNS = ["username", "name", "class_name", "password"]
+OPTIONAL_COLUMNS = ["grade", "major"]
+# Chinese headers used by the school's registrar exports
+HEADER_ALIASES = {"学号": "username", "姓名": "name", "班级": "class_name", "年级": "grade", "专业": "major", "密码": "password"}
+MAX_LENGTHS = {"username": 50, "name": 50, "class_name": 50, "major": 50}
+JOB_TTL_SECONDS = 7 * 24 * 3600
+# one import at a time across workers; the holder refreshes the lock after every chunk
+LOCK_KEY = "roster_import:lock"
+LOCK_TTL_SECONDS = 600
+
+
+class RosterError(ValueError):
+    """The roster cannot be imported; ``errors`` lists the offending rows."""
+
+    def __init__(self, message: str, errors: list[dict] | None = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+class ImportBusy(RuntimeError):
+    """Another roster import is still running."""
+
+
+def read_roster(data: bytes | str, filename: str) -> pd.DataFrame:
+    source = io.BytesIO(data) if isinstance(data, bytes) else data
+    name = filename.lower()
+    if name.endswith(".xlsx"):
+        df = pd.read_excel(source, dtype=str, engine="openpyxl")
+    elif name.endswith(".csv"):
+        df = pd.read_csv(source, dtype=str, encoding="utf-8-sig")
+    else:
+        raise RosterError("仅支持 .xlsx 或 .csv 文件")
+    return df.rename(columns=lambda c: HEADER_ALIASES.get(str(c).strip(), str(c).strip()))
+
+
+def validate_roster(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalize the roster and reject it as a whole if any row is invalid.
+
+    Checks run column-wise over the frame; ``RosterError.errors`` holds
+    ``{"row", "error"}`` with 1-based data row numbers (header excluded).
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        raise RosterError(f"缺少列: {', '.join(missing)}")
+    df = df.reindex(columns=REQUIRED_COLUMNS + OPTIONAL_COLUMNS)
+    text_cols = ["username", "name", "class_name", "major", "password"]
+    df[text_cols] = df[text_cols].astype("string").apply(lambda col: col.str.strip()).replace("", pd.NA)
+    df["grade"] = pd.to_numeric(df["grade"], errors="coerce").astype("Int64")
+
+    checks = [(df[c].isna(), f"{c} 不能为空") for c in REQUIRED_COLUMNS]
+    checks += [(df[c].str.len() > n, f"{c} 超过 {n} 个字符") for c, n in MAX_LENGTHS.items()]
+    checks.append((df["username"].duplicated(keep=False) & df["username"].notna(), "学号重复"))
+    checks.append((df["password"] == df["username"], "password 不能与学号相同"))
+    errors = []
+    for mask, message in checks:
+        errors += [{"row": int(i) + 1, "error": message} for i in np.flatnonzero(mask.fillna(False).to_numpy())]
+    if errors:
+        raise RosterError(f"{len(errors)} 处错误", sorted(errors, key=lambda e: e["row"]))
+    return df.reset_index(drop=True)
+
+
+def _ensure_classes(db: Session, df: pd.DataFrame) -> dict[str, int]:
+    names = df["class_name"].unique().tolist()
+    existing = dict(db.execute(select(Class.class_name, Class.class_id).where(Class.class_name.in_(names))).all())
+    new = df[~df["class_name"].isin(list(existing))].drop_duplicates("class_name")
+    if not new.empty:
+        db.execute(insert(Class), [{"class_name": r.class_name, "grade": None if pd.isna(r.grade) else int(r.grade)} for r in new.itertuples()])
+        db.commit()
+        existing.update(db.execute(select(Class.class_name, Class.class_id).where(Class.class_name.in_(names))).all())
+    return existing
+
+
+def _existing_usernames(db: Session, usernames: list[str], chunk_size: int) -> set[str]:
+    found = set()
+    for start in range(0, len(usernames), chunk_size):
+        found.update(db.scalars(select(UserBase.username).where(UserBase.username.in_(usernames[start:start + chunk_size]))))
+    return found
+
+
+def import_roster(df: pd.DataFrame, *, rounds: int | None = None, chunk_size: int = 1000, workers: int | None = None, progress=None, session_factory=SessionLocal) -> dict:
+    """Insert a validated roster; students whose username already exists are skipped.
+
+    Each chunk of ``user_base`` + ``student`` rows commits in its own
+    transaction, so after a failure re-running the same file resumes where it
+    stopped. ``progress(done, total)`` is called once the existing students
+    are known and after every chunk; ``total`` counts the students to insert.
+    """
+    rounds = rounds or settings.bcrypt_rounds
+    workers = workers or settings.roster_import_workers
+    db = session_factory()
+    executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        class_ids = _ensure_classes(db, df)
+        skipped = _existing_usernames(db, df["username"].tolist(), chunk_size)
+        todo = df[~df["username"].isin(list(skipped))].reset_index(drop=True)
+        total = len(todo)
+        if progress:
+            progress(0, total)
+        # hashing for later chunks keeps running while earlier chunks are inserted
+        hashes = executor.map(hash_with_rounds, todo["password"].tolist(), repeat(rounds), chunksize=max(1, min(64, total // (4 * workers))))
+        done = 0
+        for start in range(0, total, chunk_size):
+            chunk = todo.iloc[start:start + chunk_size]
+            users = [
+                {"username": r.username, "name": r.name, "role": RoleEnum.student, "password": next(hashes)}
+                for r in chunk.itertuples()
+            ]
+            db.execute(insert(UserBase), users)
+            user_ids = dict(db.execute(select(UserBase.username, UserBase.user_id).where(UserBase.username.in_(chunk["username"].tolist()))).all())
+            db.execute(insert(Student), [
+                {
+                    "user_base_id": user_ids[r.username],
+                    "class_id": class_ids[r.class_name],
+                    "grade": None if pd.isna(r.grade) else int(r.grade),
+                    "major": None if pd.isna(r.major) else r.major,
+                }
+                for r in chunk.itertuples()
+            ])
+            db.commit()
+            done += len(chunk)
+            if progress:
+                progress(done, total)
+        return {"rows": len(df), "inserted": done, "skipped": len(skipped), "classes": len(class_ids)}
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        executor.shutdown(cancel_futures=True)
+        db.close()
+
+
+def _job_key(job_id: str) -> str:
+    return f"roster_import:{job_id}"
+
+
+def get_import_job(job_id: str) -> dict | None:
+    return redis_client.hgetall(_job_key(job_id)) or None
+
+
+def start_import_job(df: pd.DataFrame, rounds: int | None = None) -> str:
+    """Run ``import_roster`` on a background thread; progress is kept in Redis for any worker to read.
+
+    Raises ``ImportBusy`` while another import holds ``LOCK_KEY``.
+    """
+    job_id = secrets.token_hex(8)
+    if not redis_client.set(LOCK_KEY, job_id, nx=True, ex=LOCK_TTL_SECONDS):
+        raise ImportBusy(redis_client.get(LOCK_KEY) or "")
+    key = _job_key(job_id)
+    redis_client.hset(key, mapping={"status": "running", "rows": len(df), "total": len(df), "done": 0, "started_at": time.time()})
+    redis_client.expire(key, JOB_TTL_SECONDS)
+
+    def progress(done, total):
+        pipe = redis_client.pipeline()
+        pipe.hset(key, mapping={"done": done, "total": total})
+        pipe.expire(LOCK_KEY, LOCK_TTL_SECONDS)
+        pipe.execute()
+
+    def run():
+        try:
+            result = import_roster(df, rounds=rounds, progress=progress)
+            redis_client.hset(key, mapping={"status": "done", **result})
+        except Exception as exc:
+            redis_client.hset(key, mapping={"status": "failed", "error": str(exc)[:500]})
+        finally:
+            redis_client.eval(DELETE_IF_EQUALS_LUA, 1, LOCK_KEY, job_id)
+
+    threading.Thread(target=run, name=f"roster-import-{job_id}", daemon=True).start()
+    return job_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import a student roster (CSV/XLSX: 学号/username, 姓名/name, 班级/class_name, 密码/password[, 年级, 专业])")
+    parser.add_argument("path")
+    parser.add_argument("--rounds", type=int, default=None, help="bcrypt cost for the initial hashes (default BCRYPT_ROUNDS)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="hashing processes (default ROSTER_IMPORT_WORKERS)")
+    args = parser.parse_args()
+    with open(args.path, "rb") as f:
+        data = f.read()
+    try:
+        df = validate_roster(read_roster(data, args.path))
+    except RosterError as exc:
+        print(f"roster rejected: {exc}")
+        for err in exc.errors[:50]:
+            print(f"  row {err['row']}: {err['error']}")
+        raise SystemExit(1)
+    started = time.perf_counter()
+
+    def progress(done, total):
+        rate = done / (time.perf_counter() - started)
+        print(f"\r{done}/{total} students  {rate:.0f}/s", end="", flush=True)
+
+    result = import_roster(df, rounds=args.rounds, chunk_size=args.chunk_size, workers=args.workers, progress=progress)
+    print(f"\nimported {result['inserted']} students, skipped {result['skipped']} existing, {result['classes']} classes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from ..config import settings
+from ..database import SessionLocal
+from ..crud.attendance import bulk_insert_records
+from .. import metrics
+
+
+flush_latency = metrics.latency("signin_buffer.flush")
+ack_latency = metrics.latency("signin_buffer.ack")
+flushed_rows = metrics.counter("signin_buffer.rows_flushed")
+flushed_batches = metrics.counter("signin_buffer.batches_flushed")
+failed_rows = metrics.counter("signin_buffer.rows_failed")
+
+
+class BufferClosed(RuntimeError):
+    """The buffer is stopped or stopping; the caller should write the row itself."""
+
+
+class SignInFailed(RuntimeError):
+    """The row was accepted but could not be committed."""
+
+
+class SignInBuffer:
+    """Write-behind buffer for attendance rows.
+
+    Request threads ``submit`` a row and block on the returned future; a single
+    flusher thread drains the queue every ``max_delay_ms`` or ``max_rows``
+    (whichever comes first) and commits the batch as one multi-row INSERT.
+    The future resolves only after that commit, so a resolved future is a
+    durable acknowledgment.
+    """
+
+    def __init__(self, max_rows: int, max_delay_ms: int, session_factory=SessionLocal):
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._stopping = threading.Event()
+        # orders submit() against stop(): nothing is queued once stop() has begun
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._session_factory = session_factory
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stopping.is_set()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="signin-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop accepting rows and flush whatever is still queued.
+
+        Rows the flusher could not write within ``timeout`` are failed with
+        ``SignInFailed`` so no caller is left waiting on them.
+        """
+        if self._thread is None:
+            return
+        with self._lock:
+            self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+        while True:
+            try:
+                _, fut, _ = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            failed_rows.inc()
+            fut.set_exception(SignInFailed("sign-in buffer stopped before the row was written"))
+
+    def submit(self, values: dict) -> Future:
+        """Queue a row; raises ``BufferClosed`` when the buffer is not accepting rows."""
+        with self._lock:
+            if not self.running:
+                raise BufferClosed("sign-in buffer is not running")
+            fut: Future = Future()
+            self._queue.put((values, fut, time.perf_counter()))
+        return fut
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+            elif self._stopping.is_set() and self._queue.empty():
+                return
+
+    def _collect(self) -> list:
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush(self, batch: list) -> None:
+        started = time.perf_counter()
+        try:
+            ids = self._insert([values for values, _, _ in batch])
+        except Exception:
+            if len(batch) == 1:
+                failed_rows.inc()
+                _, fut, _ = batch[0]
+                fut.set_exception(SignInFailed("sign-in insert failed"))
+                return
+            # isolate the bad row(s) instead of failing every neighbour in the batch
+            for item in batch:
+                self._flush([item])
+            return
+        flush_latency.observe(time.perf_counter() - started)
+        flushed_batches.inc()
+        flushed_rows.inc(len(batch))
+        done = time.perf_counter()
+        for (_, fut, queued_at), record_id in zip(batch, ids):
+            ack_latency.observe(done - queued_at)
+            fut.set_result(record_id)
+
+    def _insert(self, rows: list[dict]) -> list[int | None]:
+        db = self._session_factory()
+        try:
+            ids = bulk_insert_records(db, rows)
+            db.commit()
+            return ids
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+signin_buffer = SignInBuffer(settings.signin_buffer_max_rows, settings.signin_buffer_max_delay_ms)
+metrics.gauge("signin_buffer.queue_depth", signin_buffer.queue_depth)
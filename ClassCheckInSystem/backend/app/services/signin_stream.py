@@ -0,0 +1,44 @@
+from datetime import datetime
+from ..config import settings
+from ..models import RecordStatus, SignMethod
+from ..redis_client import stream_add, stream_add_async
+
+
+def encode_signin(values: dict) -> dict:
+    fields = {}
+    for key, value in values.items():
+        if value is None:
+            continue
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif hasattr(value, "value"):
+            value = value.value
+        fields[key] = str(value)
+    return fields
+
+
+OPTIONAL_FIELDS = ("class_id", "remark", "sign_location_lng", "sign_location_lat")
+
+
+def decode_signin(fields: dict) -> dict:
+    # every row carries the same keys so a batch stays a single executemany
+    values = {key: None for key in OPTIONAL_FIELDS}
+    values.update(fields)
+    for key in ("course_id", "class_id", "student_id"):
+        if values.get(key) is not None:
+            values[key] = int(values[key])
+    if "sign_time" in values:
+        values["sign_time"] = datetime.fromisoformat(values["sign_time"])
+    values["status"] = RecordStatus(values["status"])
+    if "sign_method" in values:
+        values["sign_method"] = SignMethod(values["sign_method"])
+    return values
+
+
+def enqueue_signin(values: dict) -> str:
+    """XADD a sign-in for ``app.signin_worker``; returns the stream entry id."""
+    return stream_add(settings.signin_stream, encode_signin(values), maxlen=settings.signin_stream_maxlen)
+
+
+async def enqueue_signin_async(values: dict) -> str:
+    return await stream_add_async(settings.signin_stream, encode_signin(values), maxlen=settings.signin_stream_maxlen)
@@ -0,0 +1,128 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import inspect  # pyright: ignore[reportMissingImports]
+from sqlalchemy.orm import make_transient_to_detached  # pyright: ignore[reportMissingImports]
+from redis.exceptions import RedisError  # pyright: ignore[reportMissingImports]
+from ..config import settings
+from ..models import UserBase
+from ..redis_client import redis_client, run_subscriber
+from .. import metrics
+
+logger = logging.getLogger(__name__)
+
+INVALIDATE_CHANNEL = "auth:user:invalidate"
+
+hits = metrics.counter("user_cache.hits")
+misses = metrics.counter("user_cache.misses")
+invalidations = metrics.counter("user_cache.invalidations")
+
+
+def detached_copy(user: UserBase) -> UserBase:
+    """Column-only copy of ``user`` that any session can ``merge(load=False)`` without a query."""
+    copy = UserBase(**{attr.key: getattr(user, attr.key) for attr in inspect(UserBase).column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+class UserCache:
+    """Bounded LRU of resolved users with a per-entry TTL, keyed by username.
+
+    Entries are dropped on expiry, on LRU eviction, or when any worker
+    publishes an invalidation for the user on ``INVALIDATE_CHANNEL``.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, UserBase]] = OrderedDict()
+        self._usernames: dict[int, str] = {}
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def get(self, username: str) -> UserBase | None:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(username)
+                hits.inc()
+                return entry[1]
+            if entry is not None:
+                self._drop(username)
+        misses.inc()
+        return None
+
+    def put(self, user: UserBase) -> None:
+        if self.max_size <= 0:
+            return
+        copy = detached_copy(user)
+        with self._lock:
+            self._drop(copy.username)
+            self._entries[copy.username] = (time.monotonic() + self.ttl, copy)
+            self._usernames[copy.user_id] = copy.username
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_local(self, user_id: int | None = None, username: str | None = None) -> None:
+        with self._lock:
+            if user_id is not None and user_id in self._usernames:
+                self._drop(self._usernames[user_id])
+            if username is not None:
+                self._drop(username)
+        invalidations.inc()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._usernames.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, username: str) -> None:
+        entry = self._entries.pop(username, None)
+        if entry is not None:
+            self._usernames.pop(entry[1].user_id, None)
+
+    def start(self) -> None:
+        """Listen for invalidations from other workers."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._listen, name="user-cache-invalidation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _handle(self, message: dict) -> None:
+        # a bad payload must not take the listener down with it
+        try:
+            data = json.loads(message["data"])
+            self.invalidate_local(data.get("user_id"), data.get("username"))
+        except (ValueError, TypeError, KeyError, AttributeError):
+            logger.warning("ignoring malformed user cache invalidation: %r", message.get("data"))
+
+    def _listen(self) -> None:
+        # invalidations missed while unsubscribed are unknown, so start over on every (re)subscribe and on loss
+        run_subscriber(INVALIDATE_CHANNEL, self._handle, self.clear, self._stopping, on_lost=self.clear)
+
+
+user_cache = UserCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+metrics.gauge("user_cache.size", user_cache.size)
+
+
+def invalidate_user(user_id: int, username: str | None = None) -> None:
+    """Drop the user from this worker's cache and tell every other worker to do the same."""
+    user_cache.invalidate_local(user_id, username)
+    try:
+        redis_client.publish(INVALIDATE_CHANNEL, json.dumps({"user_id": user_id, "username": username}))
+    except RedisError:
+        # other workers fall back to the TTL
+        logger.warning("could not publish user cache invalidation for user %s", user_id)
@@ -0,0 +1,131 @@
+import argparse
+import os
+import signal
+import socket
+from redis.exceptions import ResponseError  # pyright: ignore[reportMissingImports]
+from sqlalchemy import select  # pyright: ignore[reportMissingImports]
+from .config import settings
+from .database import SessionLocal
+from .models import AttendanceRecord
+from .redis_client import redis_client
+from .crud.attendance import bulk_insert_records
+from .services.signin_stream import decode_signin
+
+
+DEAD_LETTER_SUFFIX = ":dead"
+
+
+class SignInWorker:
+    """Drains the sign-in stream into ``attendance_record``.
+
+    Each entry is inserted with its stream id as ``sign_key`` (unique), so a
+    batch that is redelivered after a crash between COMMIT and XACK is skipped
+    rather than duplicated. Entries that keep failing are moved to the
+    dead-letter stream after ``max_deliveries`` attempts.
+    """
+
+    def __init__(self, consumer: str, batch_size: int = 500, block_ms: int = 1000, claim_idle_ms: int = 30000):
+        self.stream = settings.signin_stream
+        self.group = settings.signin_stream_group
+        self.dead_stream = self.stream + DEAD_LETTER_SUFFIX
+        self.consumer = consumer
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = settings.signin_stream_max_deliveries
+        self._stopping = False
+
+    def stop(self, *_):
+        self._stopping = True
+
+    def ensure_group(self) -> None:
+        try:
+            redis_client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    def run(self) -> None:
+        self.ensure_group()
+        print(f"signin worker {self.consumer} consuming {self.stream} as {self.group}")
+        while not self._stopping:
+            self.retry_stale()
+            resp = redis_client.xreadgroup(self.group, self.consumer, {self.stream: ">"}, count=self.batch_size, block=self.block_ms)
+            for _, entries in resp or []:
+                self.process(entries)
+
+    def process(self, entries: list) -> None:
+        if not entries:
+            return
+        try:
+            self._insert(entries)
+            done = [entry_id for entry_id, _ in entries]
+        except Exception:
+            # fall back to one entry per transaction so a poison entry only blocks itself
+            done = []
+            for entry in entries:
+                try:
+                    self._insert([entry])
+                    done.append(entry[0])
+                except Exception as exc:
+                    print(f"sign-in {entry[0]} failed, left pending for retry: {exc}")
+        if done:
+            redis_client.xack(self.stream, self.group, *done)
+
+    def _insert(self, entries: list) -> None:
+        rows = {entry_id: {**decode_signin(fields), "sign_key": entry_id} for entry_id, fields in entries}
+        db = SessionLocal()
+        try:
+            seen = set(db.scalars(select(AttendanceRecord.sign_key).where(AttendanceRecord.sign_key.in_(list(rows)))))
+            bulk_insert_records(db, [row for key, row in rows.items() if key not in seen])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def retry_stale(self) -> None:
+        """Re-process entries another consumer read but never acknowledged."""
+        pending = redis_client.xpending_range(self.stream, self.group, min="-", max="+", count=self.batch_size, idle=self.claim_idle_ms)
+        if not pending:
+            return
+        dead = [p["message_id"] for p in pending if p["times_delivered"] >= self.max_deliveries]
+        retry = [p["message_id"] for p in pending if p["times_delivered"] < self.max_deliveries]
+        if dead:
+            self.dead_letter(dead)
+        if retry:
+            claimed = redis_client.xclaim(self.stream, self.group, self.consumer, self.claim_idle_ms, retry)
+            self.process([entry for entry in claimed if entry[1]])
+            trimmed = [entry_id for entry_id, fields in claimed if not fields]
+            if trimmed:
+                redis_client.xack(self.stream, self.group, *trimmed)
+
+    def dead_letter(self, entry_ids: list) -> None:
+        reads = redis_client.pipeline(transaction=False)
+        for entry_id in entry_ids:
+            reads.xrange(self.stream, min=entry_id, max=entry_id)
+        pipe = redis_client.pipeline()
+        for entry_id, entries in zip(entry_ids, reads.execute()):
+            for _, fields in entries:
+                pipe.xadd(self.dead_stream, {**fields, "source_id": entry_id})
+        pipe.xack(self.stream, self.group, *entry_ids)
+        pipe.execute()
+        print(f"moved {len(entry_ids)} sign-ins to {self.dead_stream}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consume the sign-in stream and bulk-insert attendance records")
+    parser.add_argument("--consumer", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--block-ms", type=int, default=1000)
+    parser.add_argument("--claim-idle-ms", type=int, default=30000)
+    args = parser.parse_args()
+    worker = SignInWorker(args.consumer, args.batch_size, args.block_ms, args.claim_idle_ms)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""EXPLAIN plans and latencies of the hot attendance_record queries, without and with the indexes.
+
+    python -m benchmarks.bench_attendance_indexes [--rows 1000000] [--db-url sqlite:////tmp/bench_indexes.db] [--repeat 5]
+
+Seeds ``--rows`` synthetic records once (re-used on later runs), drops the
+``ix_attendance_*`` indexes, records the plan and best-of-``--repeat`` latency
+of each query, recreates the indexes and measures again. Point --db-url at a
+scratch MySQL database for representative plans; nothing but
+``attendance_record`` is touched, and the indexes are left in place.
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+import numpy as np  # pyright: ignore[reportMissingImports]
+
+
+COURSES = 200
+STUDENTS = 20000
+CLASSES = 400
+DAYS = 365
+
+
+def queries(AttendanceRecord, RecordStatus, func, select):
+    start = datetime(2024, 3, 1)
+    end = start + timedelta(days=30)
+    return {
+        "attendance_rate (course, status)": select(func.count(AttendanceRecord.record_id)).where(
+            AttendanceRecord.course_id == 17, AttendanceRecord.status == RecordStatus.present),
+        "personal_records (student)": select(AttendanceRecord).where(
+            AttendanceRecord.student_id == 4242).order_by(AttendanceRecord.record_id.desc()).limit(200),
+        "query_records (class)": select(AttendanceRecord).where(
+            AttendanceRecord.class_id == 42).order_by(AttendanceRecord.record_id.desc()).limit(500),
+        "query_records (course + window)": select(AttendanceRecord).where(
+            AttendanceRecord.course_id == 17, AttendanceRecord.sign_time >= start, AttendanceRecord.sign_time <= end
+        ).order_by(AttendanceRecord.record_id.desc()).limit(500),
+        "statistics_trend (30 days)": select(func.date(AttendanceRecord.sign_time), func.count(AttendanceRecord.record_id)).where(
+            AttendanceRecord.sign_time >= start, AttendanceRecord.sign_time <= end, AttendanceRecord.status == RecordStatus.present
+        ).group_by(func.date(AttendanceRecord.sign_time)),
+    }
+
+
+def seed(engine, AttendanceRecord, RecordStatus, insert, rows: int, batch: int = 50000) -> None:
+    rng = np.random.default_rng(1)
+    statuses = [RecordStatus.present, RecordStatus.late, RecordStatus.absent, RecordStatus.leave]
+    base = datetime(2024, 1, 1)
+    for start in range(0, rows, batch):
+        n = min(batch, rows - start)
+        students = rng.integers(1, STUDENTS + 1, n)
+        offsets = rng.integers(0, DAYS * 86400, n)
+        status_idx = rng.choice(4, n, p=[0.85, 0.05, 0.07, 0.03])
+        with engine.begin() as conn:
+            conn.execute(insert(AttendanceRecord), [
+                {
+                    "course_id": int(c), "class_id": int(s % CLASSES) + 1, "student_id": int(s),
+                    "sign_time": base + timedelta(seconds=int(o)), "status": statuses[k],
+                }
+                for c, s, o, k in zip(rng.integers(1, COURSES + 1, n), students, offsets, status_idx)
+            ])
+        print(f"\rseeded {start + n}/{rows}", end="", flush=True)
+    print()
+
+
+def explain(conn, stmt) -> str:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    return "\n".join("    " + " | ".join(str(v) for v in row) for row in conn.exec_driver_sql(prefix + sql))
+
+
+def measure(engine, stmts: dict, repeat: int) -> dict:
+    results = {}
+    with engine.connect() as conn:
+        for label, stmt in stmts.items():
+            best = float("inf")
+            for _ in range(repeat):
+                started = time.perf_counter()
+                conn.execute(stmt).all()
+                best = min(best, time.perf_counter() - started)
+            results[label] = (best, explain(conn, stmt))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--db-url", default="sqlite:////tmp/bench_indexes.db")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    os.environ["DB_URL"] = args.db_url
+
+    # imported after DB_URL is set: the engine binds at import time
+    from sqlalchemy import func, insert, select, text  # pyright: ignore[reportMissingImports]
+    from app.database import engine
+    from app.models import AttendanceRecord, RecordStatus
+
+    table = AttendanceRecord.__table__
+    table.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(table)).scalar()
+    if existing < args.rows:
+        seed(engine, AttendanceRecord, RecordStatus, insert, args.rows - existing)
+    indexes = [idx for idx in table.indexes if idx.name.startswith("ix_attendance_")]
+    stmts = queries(AttendanceRecord, RecordStatus, func, select)
+
+    with engine.begin() as conn:
+        for idx in indexes:
+            idx.drop(conn, checkfirst=True)
+    before = measure(engine, stmts, args.repeat)
+    with engine.begin() as conn:
+        for idx in indexes:
+            idx.create(conn, checkfirst=True)
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+    after = measure(engine, stmts, args.repeat)
+
+    print(f"\n{args.rows} rows on {engine.dialect.name}")
+    for label in stmts:
+        (t0, plan0), (t1, plan1) = before[label], after[label]
+        print(f"\n{label}: {t0 * 1000:9.2f} ms -> {t1 * 1000:8.2f} ms  ({t0 / max(t1, 1e-9):.0f}x)")
+        print("  before:\n" + plan0)
+        print("  after:\n" + plan1)
+
+
+if __name__ == "__main__":
+    main()
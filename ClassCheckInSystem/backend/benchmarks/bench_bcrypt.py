@@ -0,0 +1,60 @@
+"""bcrypt cost calibration and login throughput on the password pool.
+
+    python -m benchmarks.bench_bcrypt [--target-ms 250] [--logins 64]
+
+Prints ms per hash for each cost (the same numbers as
+``GET /admin/auth/bcrypt-calibration``), then runs ``--logins`` concurrent
+verifications at the configured ``BCRYPT_ROUNDS`` while timing a trivial
+coroutine, to show the event loop stays responsive.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from app.config import settings
+from app.services.passwords import calibrate, hash_password_async, password_pool, verify_password_async
+
+
+async def loop_lag(stop: asyncio.Event) -> list:
+    lags = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+    return lags
+
+
+async def run(args) -> None:
+    result = await calibrate(list(range(args.min_rounds, args.max_rounds + 1)), target_ms=args.target_ms)
+    for rounds, ms in result["ms_per_hash"].items():
+        marker = "  <- recommended" if rounds == result["recommended_rounds"] else ""
+        print(f"rounds={rounds:<3} {ms:8.1f} ms/hash{marker}")
+
+    hashed = await hash_password_async("bench-password")
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(loop_lag(stop))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(verify_password_async("bench-password", hashed) for _ in range(args.logins)))
+    wall = time.perf_counter() - started
+    stop.set()
+    lags = await lag_task
+    assert all(ok for ok, _ in results)
+    print(f"{args.logins} logins at rounds={settings.bcrypt_rounds} on {password_pool.workers} worker(s): "
+          f"{args.logins / wall:.1f} logins/s, event-loop lag p50={statistics.median(lags) * 1000:.1f} ms max={max(lags) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--min-rounds", type=int, default=10)
+    parser.add_argument("--max-rounds", type=int, default=14)
+    parser.add_argument("--logins", type=int, default=64)
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    finally:
+        password_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
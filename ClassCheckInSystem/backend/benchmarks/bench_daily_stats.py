@@ -0,0 +1,138 @@
+"""Latency of statistics_trend and attendance_rate: GROUP BY over attendance_record vs the daily rollup.
+
+    python -m benchmarks.bench_daily_stats [--rows 1000000] [--db-url sqlite:////tmp/bench_daily_stats.db] [--repeat 5]
+
+Seeds a timetable-shaped table once (each course meets two classes of 40 on
+two weekdays, so a day/course/class group holds ~40 records, as in real
+use), rebuilds ``attendance_daily_stats`` from it (timed, as a backfill would be),
+then compares best-of-``--repeat`` latencies of the raw queries (per-course
+COUNT pairs for the multi-course case) with ``rollup_counts``. Both sides must return the same numbers.
+"""
+import argparse
+import os
+import time
+from datetime import date, datetime, timedelta
+import numpy as np  # pyright: ignore[reportMissingImports]
+
+
+COURSES = 200
+CLASS_SIZE = 40
+
+
+def seed(engine, AttendanceRecord, RecordStatus, insert, rows: int) -> None:
+    rng = np.random.default_rng(2)
+    statuses = [RecordStatus.present, RecordStatus.late, RecordStatus.absent, RecordStatus.leave]
+    base = datetime(2024, 1, 1)
+    done, day = 0, 0
+    while done < rows:
+        batch = []
+        for course in range(1, COURSES + 1):
+            if day % 7 not in (course % 5, course % 5 + 2):
+                continue
+            for cls in (2 * course - 1, 2 * course):
+                status_idx = rng.choice(4, CLASS_SIZE, p=[0.85, 0.05, 0.07, 0.03])
+                batch.extend({
+                    "course_id": course, "class_id": cls, "student_id": cls * CLASS_SIZE + i,
+                    "sign_time": base + timedelta(days=day % 366, seconds=8 * 3600 + int(rng.integers(0, 600))),
+                    "status": statuses[k],
+                } for i, k in enumerate(status_idx))
+        batch = batch[:rows - done]
+        with engine.begin() as conn:
+            conn.execute(insert(AttendanceRecord), batch)
+        done += len(batch)
+        day += 1
+        print(f"\rseeded {done}/{rows}", end="", flush=True)
+
+
+def best(fn, repeat: int):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--db-url", default="sqlite:////tmp/bench_daily_stats.db")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    os.environ["DB_URL"] = args.db_url
+
+    # imported after DB_URL is set: the engine binds at import time
+    from sqlalchemy import func, insert, select  # pyright: ignore[reportMissingImports]
+    from app.database import SessionLocal, engine
+    from app.models import AttendanceDailyStats, AttendanceRecord, RecordStatus, RollupState
+    from app.services.daily_stats import rebuild, rollup_counts
+
+    for model in (AttendanceRecord, AttendanceDailyStats, RollupState):
+        model.__table__.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(AttendanceRecord.__table__)).scalar()
+    if existing < args.rows:
+        seed(engine, AttendanceRecord, RecordStatus, insert, args.rows - existing)
+        print()
+
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        groups = rebuild(db)
+        print(f"rebuild: {groups} day/course/class groups in {time.perf_counter() - started:.2f}s")
+
+    start, end = date(2024, 1, 1), date(2024, 12, 31)
+    start_dt, end_dt = datetime(2024, 1, 1), datetime(2024, 12, 31, 23, 59, 59)
+
+    def raw_trend():
+        with SessionLocal() as db:
+            day = func.date(AttendanceRecord.sign_time)
+            rows = db.execute(select(day, func.count(AttendanceRecord.record_id)).where(
+                AttendanceRecord.sign_time >= start_dt, AttendanceRecord.sign_time <= end_dt, AttendanceRecord.status == RecordStatus.present
+            ).group_by(day)).all()
+            return {str(d): c for d, c in rows}
+
+    def rollup_trend():
+        with SessionLocal() as db:
+            return {str(d): c["present"] for (d,), c in rollup_counts(db, ["stat_date"], start, end).items() if c["present"]}
+
+    def raw_rate():
+        with SessionLocal() as db:
+            total = db.scalar(select(func.count(AttendanceRecord.record_id)).where(AttendanceRecord.course_id == 17))
+            present = db.scalar(select(func.count(AttendanceRecord.record_id)).where(
+                AttendanceRecord.course_id == 17, AttendanceRecord.status == RecordStatus.present))
+            return present, total
+
+    def rollup_rate():
+        with SessionLocal() as db:
+            counts = rollup_counts(db, ["course_id"], course_ids=[17])[(17,)]
+            return counts["present"], sum(counts.values())
+
+    course_ids = list(range(1, COURSES + 1))
+
+    def raw_rates():
+        # what a page did before the batch endpoint: two COUNTs per course
+        with SessionLocal() as db:
+            return {c: (
+                db.scalar(select(func.count(AttendanceRecord.record_id)).where(AttendanceRecord.course_id == c, AttendanceRecord.status == RecordStatus.present)),
+                db.scalar(select(func.count(AttendanceRecord.record_id)).where(AttendanceRecord.course_id == c)),
+            ) for c in course_ids}
+
+    def rollup_rates():
+        with SessionLocal() as db:
+            counts = rollup_counts(db, ["course_id"], course_ids=course_ids)
+            return {c: (counts[(c,)]["present"], sum(counts[(c,)].values())) for c in course_ids}
+
+    cases = (
+        ("statistics_trend (1 year)", raw_trend, rollup_trend),
+        ("attendance_rate (course)", raw_rate, rollup_rate),
+        (f"attendance_rates ({COURSES})", raw_rates, rollup_rates),
+    )
+    for label, raw, rolled in cases:
+        raw_s, raw_result = best(raw, args.repeat)
+        rollup_s, rollup_result = best(rolled, args.repeat)
+        assert raw_result == rollup_result, f"{label}: results differ"
+        print(f"{label:<28} raw {raw_s * 1000:9.1f} ms   rollup {rollup_s * 1000:7.1f} ms   x{raw_s / rollup_s:.0f}")
+
+
+if __name__ == "__main__":
+    main()
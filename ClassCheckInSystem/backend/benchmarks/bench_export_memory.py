@@ -0,0 +1,78 @@
+"""Peak traced memory of the XLSX export: pandas DataFrame + BytesIO vs write-only workbook streamed from disk.
+
+    python -m benchmarks.bench_export_memory [--rows 20000 60000] [--db-url sqlite:////tmp/bench_indexes.db]
+
+Uses (and if needed seeds) the table from bench_attendance_indexes and exports
+the first N records with each implementation. The streamed path should stay
+flat as N grows; the in-memory one grows linearly.
+"""
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+from io import BytesIO
+
+
+def traced(fn) -> tuple[float, float, int]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[20000, 60000])
+    parser.add_argument("--db-url", default="sqlite:////tmp/bench_indexes.db")
+    args = parser.parse_args()
+    os.environ["DB_URL"] = args.db_url
+
+    # imported after DB_URL is set: the engine binds at import time
+    import pandas as pd  # pyright: ignore[reportMissingImports]
+    from sqlalchemy import func, insert, select  # pyright: ignore[reportMissingImports]
+    from app.database import SessionLocal, engine
+    from app.models import AttendanceRecord, RecordStatus
+    from app.services.export import iter_file_and_remove, temp_export_path, write_records_xlsx
+    from benchmarks.bench_attendance_indexes import seed
+
+    AttendanceRecord.__table__.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(AttendanceRecord.__table__)).scalar()
+    if existing < max(args.rows):
+        seed(engine, AttendanceRecord, RecordStatus, insert, max(args.rows) - existing)
+
+    for n in args.rows:
+        def in_memory():
+            # the pre-streaming implementation of export_report
+            with SessionLocal() as db:
+                recs = db.query(AttendanceRecord).filter(AttendanceRecord.record_id <= n).all()
+                rows = [{
+                    "record_id": r.record_id,
+                    "course_id": r.course_id,
+                    "student_id": r.student_id,
+                    "status": r.status.value if hasattr(r.status, 'value') else str(r.status),
+                    "sign_method": r.sign_method.value if hasattr(r.sign_method, 'value') else str(r.sign_method),
+                    "sign_time": r.sign_time,
+                } for r in recs]
+                buf = BytesIO()
+                pd.DataFrame(rows).to_excel(buf, index=False)
+                return len(buf.getvalue())
+
+        def streamed():
+            with SessionLocal() as db:
+                path = temp_export_path(".xlsx")
+                write_records_xlsx(db, path, [AttendanceRecord.record_id <= n])
+            return sum(len(chunk) for chunk in iter_file_and_remove(path))
+
+        for label, fn in (("DataFrame + BytesIO", in_memory), ("write-only + file stream", streamed)):
+            elapsed, peak, size = traced(fn)
+            print(f"rows={n:<8} {label:<26} peak={peak:8.1f} MiB  {elapsed:6.1f} s  xlsx={size / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
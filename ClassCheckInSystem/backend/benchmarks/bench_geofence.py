@@ -0,0 +1,47 @@
+"""Per-call latency of the location check: geopy geodesic vs haversine vs fence index.
+
+    python -m benchmarks.bench_geofence [-n 100000] [--rooms 500]
+"""
+import argparse
+import random
+import time
+from geopy.distance import geodesic  # pyright: ignore[reportMissingImports]
+from app.services.geofence import Fence, GeofenceIndex, haversine_m
+
+
+CENTER = (30.5100, 114.4100)
+
+
+def report(label: str, n: int, elapsed: float) -> None:
+    print(f"{label:<36} {elapsed / n * 1e6:>9.2f} us/call")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=100000)
+    parser.add_argument("--rooms", type=int, default=500)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    fences = [Fence(i, f"R{i}", CENTER[0] + rnd.uniform(-0.02, 0.02), CENTER[1] + rnd.uniform(-0.02, 0.02), 80) for i in range(args.rooms)]
+    index = GeofenceIndex(fences, [(i % 200, i) for i in range(args.rooms)])
+    points = [(CENTER[0] + rnd.uniform(-0.03, 0.03), CENTER[1] + rnd.uniform(-0.03, 0.03), rnd.randrange(200)) for _ in range(args.n)]
+
+    started = time.perf_counter()
+    for lat, lng, _ in points:
+        geodesic((lat, lng), CENTER).meters
+    report("geopy geodesic", args.n, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for lat, lng, _ in points:
+        haversine_m(lat, lng, CENTER[0], CENTER[1])
+    report("haversine", args.n, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for lat, lng, course_id in points:
+        index.match_course(course_id, lat, lng)
+    report("index.match_course (bbox+haversine)", args.n, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Sign-in query latency while slow reports run: reports on the OLTP pool vs on the analytics pool.
+
+    python -m benchmarks.bench_pool_isolation [--db-url sqlite:////tmp/bench_pool.db] [--reports 12] [--report-seconds 1.5]
+
+``--reports`` threads loop on a CPU-bound query of ~``--report-seconds``;
+meanwhile one thread issues short "sign-in" queries on the OLTP pool and
+records their latency. With the reports on the same pool they hold all of
+its connections and sign-ins wait (or time out); on the analytics pool they
+only queue behind each other.
+"""
+import argparse
+import os
+import threading
+import time
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db-url", default="sqlite:////tmp/bench_pool.db")
+    parser.add_argument("--reports", type=int, default=12)
+    parser.add_argument("--report-seconds", type=float, default=1.5)
+    parser.add_argument("--duration", type=float, default=6.0)
+    args = parser.parse_args()
+    os.environ["DB_URL"] = args.db_url
+    os.environ.setdefault("DB_POOL_SIZE", "4")
+    os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+    os.environ.setdefault("DB_POOL_TIMEOUT", "5")
+    os.environ.setdefault("ANALYTICS_STATEMENT_TIMEOUT_MS", "0")
+
+    # imported after the env is set: engines and pools are built at import time
+    from sqlalchemy import text  # pyright: ignore[reportMissingImports]
+    from sqlalchemy.exc import TimeoutError as PoolTimeout  # pyright: ignore[reportMissingImports]
+    from app.database import engine, read_engine
+
+    # calibrate a report query that takes about --report-seconds
+    n = 200000
+    while True:
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            conn.execute(text(f"WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x+1 FROM c WHERE x < {n}) SELECT count(*) FROM c")).scalar()
+        if time.perf_counter() - started >= args.report_seconds / 2:
+            break
+        n *= 2
+    report_sql = text(f"WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x+1 FROM c WHERE x < {n * 2}) SELECT count(*) FROM c")
+
+    for label, report_engine in (("reports on OLTP pool", engine), ("reports on analytics pool", read_engine)):
+        stop = threading.Event()
+
+        def report_loop():
+            while not stop.is_set():
+                try:
+                    with report_engine.connect() as conn:
+                        conn.execute(report_sql).scalar()
+                except PoolTimeout:
+                    pass
+
+        threads = [threading.Thread(target=report_loop, daemon=True) for _ in range(args.reports)]
+        for t in threads:
+            t.start()
+        time.sleep(0.2)
+        latencies, failures = [], 0
+        deadline = time.monotonic() + args.duration
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1")).scalar()
+                latencies.append(time.perf_counter() - started)
+            except PoolTimeout:
+                failures += 1
+            time.sleep(0.02)
+        stop.set()
+        for t in threads:
+            t.join()
+        print(f"{label:<26} sign-ins={len(latencies):4d}  p50={percentile(latencies, 0.5) * 1000:8.1f} ms  "
+              f"p99={percentile(latencies, 0.99) * 1000:8.1f} ms  pool timeouts={failures}")
+
+
+if __name__ == "__main__":
+    main()
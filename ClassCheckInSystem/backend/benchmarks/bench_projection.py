@@ -0,0 +1,69 @@
+"""Rows/s and peak Python memory: ORM objects + per-row hasattr() vs Core column tuples.
+
+    python -m benchmarks.bench_projection [--rows 1000000] [--db-url sqlite:////tmp/bench_indexes.db]
+
+Uses (and if needed seeds) the same synthetic table as bench_attendance_indexes,
+then serializes every row in a date range covering all of it the way
+query_records/export_report did before and after the switch to Core.
+"""
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+
+def run(label: str, fn) -> None:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    n = len(fn())
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} rows={n}  {n / elapsed:>10.0f} rows/s  peak={peak / 2**20:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--db-url", default="sqlite:////tmp/bench_indexes.db")
+    args = parser.parse_args()
+    os.environ["DB_URL"] = args.db_url
+
+    # imported after DB_URL is set: the engine binds at import time
+    from sqlalchemy import func, insert, select  # pyright: ignore[reportMissingImports]
+    from app.database import SessionLocal, engine
+    from app.models import AttendanceRecord, RecordStatus
+    from app.crud.attendance import record_list_item, record_list_select
+    from benchmarks.bench_attendance_indexes import seed
+
+    AttendanceRecord.__table__.create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(AttendanceRecord.__table__)).scalar()
+    if existing < args.rows:
+        seed(engine, AttendanceRecord, RecordStatus, insert, args.rows - existing)
+    criteria = (AttendanceRecord.sign_time >= datetime(2000, 1, 1), AttendanceRecord.sign_time <= datetime(2100, 1, 1))
+
+    def orm_path():
+        with SessionLocal() as db:
+            return [{
+                "record_id": r.record_id,
+                "course_id": r.course_id,
+                "student_id": r.student_id,
+                "status": r.status.value if hasattr(r.status, 'value') else str(r.status),
+                "sign_method": r.sign_method.value if hasattr(r.sign_method, 'value') else str(r.sign_method),
+                "sign_time": r.sign_time.isoformat() if r.sign_time else None,
+            } for r in db.query(AttendanceRecord).filter(*criteria).all()]
+
+    def core_path():
+        with SessionLocal() as db:
+            return [record_list_item(r) for r in db.execute(record_list_select(*criteria)).all()]
+
+    run("ORM objects", orm_path)
+    run("Core column tuples", core_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Verify throughput: signed QR tokens (CPU only) vs Redis-stored tokens (GET+DEL).
+
+    python -m benchmarks.bench_qr_verify [-n 20000]
+
+The Redis side needs REDIS_URL to point at a reachable server and is skipped otherwise.
+"""
+import argparse
+import time
+from redis.exceptions import ConnectionError as RedisConnectionError  # pyright: ignore[reportMissingImports]
+from app.redis_client import redis_client, set_with_ttl, get_and_delete
+from app.services.qrcode_service import generate_qr_token, verify_qr_token
+
+
+def report(label: str, n: int, elapsed: float) -> None:
+    print(f"{label:<34} {n / elapsed:>12,.0f} ops/s  {elapsed / n * 1e6:>9.2f} us/op")
+
+
+def bench_signed(n: int) -> None:
+    tokens = [generate_qr_token(i % 50) for i in range(n)]
+    started = time.perf_counter()
+    for token in tokens:
+        assert verify_qr_token(token) is not None
+    report("signed verify (CPU)", n, time.perf_counter() - started)
+
+
+def bench_redis(n: int) -> None:
+    try:
+        redis_client.ping()
+    except RedisConnectionError:
+        print("redis GET+DEL (legacy)             skipped: Redis unreachable")
+        return
+    tokens = [f"QR:{i % 50}:bench:{i}" for i in range(n)]
+    for token in tokens:
+        set_with_ttl(f"qr:{token}", "1", 300)
+    started = time.perf_counter()
+    for token in tokens:
+        assert get_and_delete(f"qr:{token}") is not None
+    report("redis GET+DEL (legacy)", n, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=20000)
+    args = parser.parse_args()
+    bench_signed(args.n)
+    bench_redis(args.n)
+
+
+if __name__ == "__main__":
+    main()
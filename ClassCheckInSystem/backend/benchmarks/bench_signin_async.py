@@ -0,0 +1,127 @@
+"""p50/p99 of N concurrent location sign-ins: the original sync route vs the current async route.
+
+    python -m benchmarks.bench_signin_async [-n 1000] [--concurrency 0] [--db-url sqlite:////tmp/bench_signin.db]
+
+"baseline" is a copy of the route as it was before the async move: ``def``
+handler on the anyio threadpool, ``get_db`` session, user row looked up from
+the JWT subject, geopy geodesic distance, ``create_record``. "current" is the
+real ``POST /student/sign/location`` of ``app.main`` (claims-only identity,
+async session, haversine, ``create_record_async``), called with room
+coordinates and GEOFENCE_CLIENT_FALLBACK turned on for the run, so no
+geofence registration is needed. Redis is not required:
+the live-attendance update fails open. Under high concurrency the baseline
+can exhaust the DB pool (its sessions are closed on another threadpool
+thread), which shows up as errors; --concurrency caps requests in flight
+to compare the two below that point. Point --db-url at MySQL for
+representative numbers; SQLite serialises writers.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+
+def percentile(samples: list, p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+SIGN_PARAMS = {"course_id": 1, "lng": 114.4101, "lat": 30.5101, "room_lng": 114.41, "room_lat": 30.51}
+
+
+async def fire(client, n: int, concurrency: int, headers: dict) -> tuple[list, int]:
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> float | None:
+        async with gate:
+            started = time.perf_counter()
+            try:
+                r = await client.post("/student/sign/location", params={**SIGN_PARAMS, "student_id": i}, headers=headers)
+                r.raise_for_status()
+            except Exception:
+                return None
+            return time.perf_counter() - started
+
+    results = await asyncio.gather(*(one(i) for i in range(n)))
+    samples = [r for r in results if r is not None]
+    return samples, n - len(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=1000)
+    parser.add_argument("--db-url", default="sqlite:////tmp/bench_signin.db")
+    parser.add_argument("--concurrency", type=int, default=0, help="requests in flight at once (default: all n)")
+    args = parser.parse_args()
+    os.environ["DB_URL"] = args.db_url
+
+    # imported after DB_URL is set: the engines bind at import time
+    import httpx  # pyright: ignore[reportMissingImports]
+    from fastapi import Depends, FastAPI, HTTPException  # pyright: ignore[reportMissingImports]
+    from geopy.distance import geodesic  # pyright: ignore[reportMissingImports]
+    from jose import jwt  # pyright: ignore[reportMissingModuleSource]
+    from sqlalchemy import create_engine  # pyright: ignore[reportMissingImports]
+    from sqlalchemy.orm import Session, sessionmaker  # pyright: ignore[reportMissingImports]
+    from app.main import app as current_app
+    from app.auth import create_access_token, oauth2_scheme
+    from app.config import settings
+    from app.crud.attendance import create_record
+    from app.database import Base, SessionLocal, engine
+    from app.models import UserBase, RoleEnum, RecordStatus, SignMethod
+
+    settings.geofence_client_fallback = True
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        user = db.query(UserBase).filter(UserBase.username == "bench").first()
+        if not user:
+            user = UserBase(username="bench", name="bench", role=RoleEnum.teacher, password="-")
+            db.add(user)
+            db.commit()
+        claims = {"sub": "bench", "uid": user.user_id, "role": RoleEnum.teacher.value}
+    headers = {"Authorization": "Bearer " + create_access_token(claims)}
+
+    baseline_app = FastAPI()
+    # the engine and session dependency as they were configured before the pool split
+    baseline_sessions = sessionmaker(autocommit=False, autoflush=False, bind=create_engine(settings.db_url, pool_pre_ping=True, pool_recycle=3600))
+
+    def get_db():
+        db = baseline_sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def baseline_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> UserBase:
+        username = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm]).get("sub")
+        user = db.query(UserBase).filter(UserBase.username == username).first()
+        if user is None:
+            raise HTTPException(status_code=401)
+        return user
+
+    @baseline_app.post("/student/sign/location")
+    def baseline_sign(course_id: int, student_id: int, lng: float, lat: float, room_lng: float, room_lat: float, db: Session = Depends(get_db), user: UserBase = Depends(baseline_user)):
+        distance_m = geodesic((lat, lng), (room_lat, room_lng)).meters
+        if distance_m > 1000:
+            raise HTTPException(status_code=400)
+        record = create_record(db, course_id=course_id, student_id=student_id, status=RecordStatus.present, method=SignMethod.location, lng=str(lng), lat=str(lat))
+        return {"record_id": record.record_id, "distance_m": round(distance_m, 2)}
+
+    async def run():
+        for label, app in (("baseline (sync)", baseline_app), ("current (async)", current_app)):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                started = time.perf_counter()
+                samples, errors = await fire(client, args.n, args.concurrency or args.n, headers)
+                wall = time.perf_counter() - started
+                if not samples:
+                    print(f"{label:<18} n={args.n}  all requests failed")
+                    continue
+                print(f"{label:<18} n={args.n}  p50={statistics.median(samples) * 1000:8.1f} ms  "
+                      f"p99={percentile(samples, 0.99) * 1000:8.1f} ms  throughput={len(samples) / wall:8.1f} req/s  errors={errors}")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""SQL statements and latency of get_current_user per 1000 requests, with and without the user cache.
+
+    python -m benchmarks.bench_user_cache [-n 1000] [--users 50] [--db-url sqlite:////tmp/bench_user_cache.db]
+
+Each simulated request opens its own session, resolves the token's user and
+reads a column, like an endpoint that needs the full ``UserBase`` row.
+"""
+import argparse
+import os
+import random
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--db-url", default="sqlite:////tmp/bench_user_cache.db")
+    args = parser.parse_args()
+    os.environ["DB_URL"] = args.db_url
+
+    # imported after DB_URL is set: the engine binds at import time
+    from sqlalchemy import event  # pyright: ignore[reportMissingImports]
+    from app.database import Base, SessionLocal, engine
+    from app.auth import create_access_token, get_current_user
+    from app.models import UserBase, RoleEnum
+    from app.services.user_cache import UserCache, user_cache
+    from app import auth
+
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        existing = {u for (u,) in db.query(UserBase.username).filter(UserBase.username.like("bench-u%"))}
+        db.add_all([UserBase(username=f"bench-u{i}", name=f"u{i}", role=RoleEnum.student, password="-")
+                    for i in range(args.users) if f"bench-u{i}" not in existing])
+        db.commit()
+    rnd = random.Random(7)
+    tokens = [create_access_token({"sub": f"bench-u{rnd.randrange(args.users)}"}) for _ in range(args.n)]
+
+    statements = 0
+
+    def count(*_):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    for label, cache in (("no cache", UserCache(0, 60)), ("LRU+TTL cache", user_cache)):
+        auth.user_cache = cache
+        cache.clear()
+        statements = 0
+        started = time.perf_counter()
+        for token in tokens:
+            with SessionLocal() as db:
+                get_current_user(token, db).name
+        elapsed = time.perf_counter() - started
+        print(f"{label:<14} n={args.n}  SQL statements={statements:>5}  ({statements * 1000 / args.n:.0f} per 1000 requests)  "
+              f"{elapsed / args.n * 1e6:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
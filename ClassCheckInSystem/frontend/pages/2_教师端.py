@@ -82,20 +82,56 @@ with tab1:
     # 实时出勤率指标
     st.markdown("#### 📈 实时出勤率")
     
+    col1, col2 = st.columns([2, 1])
+    
+    with col1:
+        live_session_id = st.text_input("签到会话ID", key="live_session_id", placeholder="开启二维码签到后获得的 session_id")
+    
+    with col2:
+        live_listen = st.toggle("📡 实时推送", key="live_listen", disabled=not live_session_id)
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("总人数", "45", "0")
+        total_metric = st.empty()
+        total_metric.metric("总人数", "45", "0")
     
     with col2:
-        st.metric("已签到", "38", "+3")
+        signed_metric = st.empty()
+        signed_metric.metric("已签到", "38", "+3")
     
     with col3:
-        st.metric("未签到", "7", "-3")
+        unsigned_metric = st.empty()
+        unsigned_metric.metric("未签到", "7", "-3")
     
     with col4:
         attendance_rate = 38 / 45 * 100
-        st.metric("出勤率", f"{attendance_rate:.1f}%", "+6.7%")
+        rate_metric = st.empty()
+        rate_metric.metric("出勤率", f"{attendance_rate:.1f}%", "+6.7%")
+    
+    if live_listen and live_session_id:
+        # 服务端推送签到事件，原地更新指标，无需整页刷新
+        token = auth_manager.get_auth_token()
+        if token:
+            api_client.set_auth_token(token)
+        live_status = st.empty()
+        roster = 0
+        try:
+            for event, data in api_client.stream_session_events(live_session_id):
+                if event == "snapshot":
+                    roster = data["roster"]
+                    total_metric.metric("总人数", roster)
+                elif event == "closed":
+                    live_status.info("签到会话已关闭")
+                signed = data.get("signed", 0)
+                delta = f"+{data['delta']}" if event == "signin" else None
+                signed_metric.metric("已签到", signed, delta)
+                unsigned_metric.metric("未签到", max(roster - signed, 0))
+                rate_metric.metric("出勤率", f"{(signed / roster * 100) if roster else 0:.1f}%")
+                if event == "signin":
+                    live_status.caption(f"学生 {data['student_id']} 刚刚签到")
+        except Exception as e:
+            live_status.error(f"实时推送中断: {str(e)}")
     
     # 出勤率环形图
     st.markdown("#### 📊 出勤率分布")
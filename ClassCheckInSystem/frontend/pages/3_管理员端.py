@@ -11,7 +11,6 @@ import plotly.graph_objects as go  # pyright: ignore[reportMissingImports]
 from plotly.subplots import make_subplots  # pyright: ignore[reportMissingImports]
 from streamlit_extras.colored_header import colored_header  # pyright: ignore[reportMissingImports]
 from streamlit_extras.metric_cards import style_metric_cards  # pyright: ignore[reportMissingImports]
-import io
 
 from utils.auth import AuthManager
 from utils.api_client import APIClient
@@ -421,35 +420,64 @@ with tab3:
         # 导出报表
         st.markdown("#### 📥 导出报表")
         
-        col1, col2, col3 = st.columns(3)
+        # 按条件由服务端筛选并编码，页面只负责下载
+        col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            if st.button("📊 导出Excel", use_container_width=True):
-                # 生成Excel文件
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                    df_report.to_excel(writer, sheet_name='考勤报表', index=False)
-                
-                st.download_button(
-                    label="下载Excel报表",
-                    data=output.getvalue(),
-                    file_name=f"attendance_report_{report_start_date}_{report_end_date}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+            export_course_id = st.number_input("课程ID", min_value=0, value=0, step=1, key="export_course_id", help="0 表示全部")
         
         with col2:
-            if st.button("📄 导出CSV", use_container_width=True):
-                csv_data = df_report.to_csv(index=False)
-                st.download_button(
-                    label="下载CSV报表",
-                    data=csv_data,
-                    file_name=f"attendance_report_{report_start_date}_{report_end_date}.csv",
-                    mime="text/csv"
-                )
+            export_class_id = st.number_input("班级ID", min_value=0, value=0, step=1, key="export_class_id", help="0 表示全部")
         
         with col3:
-            if st.button("📊 导出PDF", use_container_width=True):
-                st.info("PDF导出功能开发中...")
+            export_student_id = st.number_input("学生ID", min_value=0, value=0, step=1, key="export_student_id", help="0 表示全部")
+        
+        with col4:
+            export_status = st.selectbox(
+                "考勤状态",
+                ["全部", "Present", "Late", "Absent", "Leave"],
+                key="export_status"
+            )
+        
+        export_formats = {
+            "Excel (xlsx)": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+            "CSV": ("csv", "text/csv"),
+            "NDJSON": ("ndjson", "application/x-ndjson"),
+            "Parquet": ("parquet", "application/vnd.apache.parquet"),
+        }
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            export_label = st.selectbox("导出格式", list(export_formats), key="export_format")
+        
+        with col2:
+            st.markdown("<br>", unsafe_allow_html=True)
+            if st.button("📥 导出考勤记录", use_container_width=True):
+                export_format, export_mime = export_formats[export_label]
+                token = auth_manager.get_auth_token()
+                if token:
+                    api_client.set_auth_token(token)
+                filters = {
+                    "course_id": export_course_id or None,
+                    "class_id": export_class_id or None,
+                    "student_id": export_student_id or None,
+                    "status": None if export_status == "全部" else export_status,
+                }
+                with st.spinner("正在生成导出文件..."):
+                    export_data = api_client.export_report(
+                        f"{report_start_date}T00:00:00",
+                        f"{report_end_date}T23:59:59",
+                        export_format,
+                        filters
+                    )
+                if export_data:
+                    st.download_button(
+                        label=f"下载{export_label}",
+                        data=export_data,
+                        file_name=f"attendance_{report_start_date}_{report_end_date}.{export_format}",
+                        mime=export_mime
+                    )
 
 with tab4:
     st.markdown("### 📈 数据分析")
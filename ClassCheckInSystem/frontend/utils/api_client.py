@@ -141,6 +141,41 @@ class APIClient:
             st.error(f"获取出勤率失败: {str(e)}")
             return {"error": str(e)}
     
+    def get_attendance_rates(self, course_ids: List[int] = None) -> List[Dict[str, Any]]:
+        """批量获取多门课程出勤率（不传课程时为本人所授全部课程）"""
+        try:
+            response = self.session.get(
+                f"{self.base_url}/teacher/attendance/rates",
+                params={"course_ids": course_ids} if course_ids else None
+            )
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            st.error(f"获取出勤率失败: {str(e)}")
+            return []
+    
+    def stream_session_events(self, session_id: str):
+        """订阅签到会话的实时推送（SSE），逐条产出 (事件类型, 数据)"""
+        with self.session.get(
+            f"{self.base_url}/teacher/session/{session_id}/events",
+            headers={"Accept": "text/event-stream"},
+            stream=True,
+            timeout=(5, 60)
+        ) as response:
+            response.raise_for_status()
+            event, data = "message", []
+            for line in response.iter_lines(decode_unicode=True):
+                if line is None or line.startswith(":"):
+                    continue
+                if line == "":
+                    if data:
+                        yield event, json.loads("\n".join(data))
+                    event, data = "message", []
+                elif line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data.append(line[5:].strip())
+    
     def manual_makeup(self, student_id: int, course_id: int, reason: str) -> Dict[str, Any]:
         """手动补签"""
         try:
@@ -256,20 +291,21 @@ class APIClient:
             st.error(f"获取考勤报表失败: {str(e)}")
             return {"error": str(e)}
     
-    def export_report(self, report_type: str, start_date: str, end_date: str, filters: Dict[str, Any] = None) -> bytes:
-        """导出报表"""
+    def export_report(self, start_date: str, end_date: str, export_format: str = "xlsx", filters: Dict[str, Any] = None) -> bytes:
+        """导出考勤记录（筛选在服务端完成，格式: xlsx/csv/ndjson/parquet）"""
         try:
             params = {
-                "report_type": report_type,
-                "start_date": start_date,
-                "end_date": end_date
+                "start": start_date,
+                "end": end_date,
+                "format": export_format
             }
             if filters:
-                params.update(filters)
+                params.update({k: v for k, v in filters.items() if v not in (None, "")})
             
             response = self.session.get(
-                f"{self.base_url}/api/admin/reports/export",
-                params=params
+                f"{self.base_url}/admin/report/export",
+                params=params,
+                timeout=300
             )
             response.raise_for_status()
             return response.content
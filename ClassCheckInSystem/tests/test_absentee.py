@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from backend.app.database import Base
+from backend.app.models import AttendanceRecord, ClassCourse, RecordStatus, SignMethod, Student, UserBase, RoleEnum
+from backend.app.crud.attendance import create_record
+from backend.app.services import absentee
+
+
+class _NoBits:
+    def get(self, key):
+        return None
+
+
+def test_materialize_absentees_is_idempotent(tmp_path, monkeypatch):
+    monkeypatch.setattr(absentee, "raw_redis_client", _NoBits())
+    engine = create_engine(f"sqlite:///{tmp_path / 'absent.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(UserBase(username="s", password="x", name="s", role=RoleEnum.student))
+    db.add(ClassCourse(class_id=1, course_id=1))
+    db.add_all([Student(user_base_id=1, class_id=1) for _ in range(5)])
+    db.add(Student(user_base_id=1, class_id=2))  # other class, not on the roster
+    db.commit()
+    opened_at = datetime.utcnow() - timedelta(minutes=1)
+    create_record(db, course_id=1, student_id=2, status=RecordStatus.present, method=SignMethod.qrcode)
+
+    assert absentee.materialize_absentees(db, "s1", 1, opened_at, chunk_size=2) == 4
+    assert absentee.materialize_absentees(db, "s1", 1, opened_at) == 0
+
+    absent = db.scalars(select(AttendanceRecord.student_id).where(AttendanceRecord.status == RecordStatus.absent)).all()
+    assert sorted(absent) == [1, 3, 4, 5]
@@ -0,0 +1,60 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from backend.app.main import app
+from backend.app.auth import create_access_token
+from backend.app.database import Base, get_async_db
+from backend.app.models import RoleEnum, UserBase
+from backend.app.services import passwords
+from backend.app.services.passwords import PasswordPool, pwd_context
+
+
+@pytest.fixture
+def users(tmp_path, monkeypatch):
+    path = tmp_path / "users.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(UserBase), [{"user_id": 5, "username": "u5", "name": "n5", "role": RoleEnum.student, "password": "-"}])
+    # NullPool: TestClient runs each request on its own event loop
+    sessions = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool), expire_on_commit=False)
+
+    async def db():
+        async with sessions() as session:
+            yield session
+
+    monkeypatch.setitem(app.dependency_overrides, get_async_db, db)
+    monkeypatch.setattr("backend.app.routers.admin.invalidate_user", lambda user_id, username=None: None)
+    token = create_access_token({"sub": "admin", "uid": 1, "role": RoleEnum.admin.value})
+    client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+    def stored_password():
+        with engine.connect() as conn:
+            return conn.scalar(select(UserBase.password).where(UserBase.user_id == 5))
+
+    return client, stored_password
+
+
+def test_password_is_hashed_on_the_pool(users, monkeypatch):
+    client, stored_password = users
+    pool = PasswordPool(1, 4)
+    monkeypatch.setattr(passwords, "password_pool", pool)
+    try:
+        resp = client.patch("/admin/user/5", json={"name": "new", "password": "s3cret!"})
+    finally:
+        pool.shutdown()
+    assert resp.status_code == 200 and resp.json()["name"] == "new"
+    assert pwd_context.verify("s3cret!", stored_password())
+    assert client.patch("/admin/user/99", json={"name": "x"}).status_code == 404
+    assert client.patch("/admin/user/5", json={"role": "Janitor"}).status_code == 400
+
+
+def test_busy_pool_is_503(users, monkeypatch):
+    client, stored_password = users
+    monkeypatch.setattr(passwords, "password_pool", PasswordPool(1, 0))
+    resp = client.patch("/admin/user/5", json={"password": "s3cret!"})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "2"
+    assert stored_password() == "-"
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from backend.app.deps import admission
+from backend.app.schemas import BatchSignItem
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def buckets(monkeypatch):
+    monkeypatch.setattr(admission, "_take_tokens", fakeredis.FakeAsyncRedis().register_script(admission.TOKEN_BUCKET_LUA))
+    monkeypatch.setattr(admission.settings, "admission_enabled", True)
+    monkeypatch.setattr(admission.settings, "admission_global_rate", 1.0)
+    monkeypatch.setattr(admission.settings, "admission_global_burst", 5)
+    monkeypatch.setattr(admission.settings, "admission_course_rate", 100.0)
+    monkeypatch.setattr(admission.settings, "admission_course_burst", 100)
+    monkeypatch.setattr(admission.settings, "admission_jitter_seconds", 0)
+
+
+def _admit(gen) -> int | None:
+    """Run an admission dependency; returns the Retry-After of a rejection, else None."""
+    async def run():
+        try:
+            await gen.__anext__()
+        except HTTPException as exc:
+            assert exc.status_code == 429
+            return int(exc.headers["Retry-After"])
+        await gen.aclose()
+        return None
+    return asyncio.run(run())
+
+
+def _items(n: int) -> list[BatchSignItem]:
+    return [BatchSignItem(course_id=1, student_id=i) for i in range(n)]
+
+
+def test_single_requests_share_the_global_bucket(buckets):
+    assert [_admit(admission.admit_signin(course_id=1)) for _ in range(5)] == [None] * 5
+    assert _admit(admission.admit_signin(course_id=2)) == 1
+
+
+def test_batches_pay_one_token_per_item(buckets):
+    assert _admit(admission.admit_signin_batch(_items(3))) is None
+    assert _admit(admission.admit_signin_batch(_items(3))) == 1  # 2 tokens left
+
+
+def test_batch_larger_than_burst_leaves_a_debt(buckets):
+    assert _admit(admission.admit_signin_batch(_items(20))) is None
+    assert _admit(admission.admit_signin(course_id=1)) >= 15
+
+
+def test_zero_rate_is_rejected_at_startup(buckets, monkeypatch):
+    admission.check_admission_settings()
+    monkeypatch.setattr(admission.settings, "admission_course_rate", 0.0)
+    with pytest.raises(ValueError):
+        admission.check_admission_settings()
@@ -0,0 +1,56 @@
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from backend.app.main import app
+from backend.app.auth import create_access_token
+from backend.app.config import settings
+from backend.app.database import Base, get_read_db
+from backend.app.models import AttendanceRecord, Course, CourseTeach, RecordStatus, RoleEnum
+
+
+@pytest.fixture
+def rates(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rates.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.execute(insert(Course), [{"course_id": i, "course_name": f"c{i}"} for i in (1, 2, 3)])
+        db.execute(insert(CourseTeach), [{"course_id": 2, "teacher_id": 7}, {"course_id": 3, "teacher_id": 7}])
+        db.execute(insert(AttendanceRecord), [
+            {"course_id": course_id, "student_id": 1, "status": status, "sign_time": datetime(2024, 3, 1, 8)}
+            for course_id, status in [(1, RecordStatus.present), (2, RecordStatus.present), (2, RecordStatus.late), (3, RecordStatus.absent)]
+        ])
+        db.commit()
+
+    def db():
+        with factory() as session:
+            yield session
+
+    monkeypatch.setitem(app.dependency_overrides, get_read_db, db)
+    monkeypatch.setattr(settings, "page_size_max", 2)
+
+    def get(role, teacher_id=None, **params):
+        claims = {"sub": "u", "uid": 1, "role": role.value}
+        if teacher_id is not None:
+            claims["tid"] = teacher_id
+        client = TestClient(app, headers={"Authorization": f"Bearer {create_access_token(claims)}"})
+        return client.get("/teacher/attendance/rates", params=params)
+
+    return get
+
+
+def test_explicit_ids_keep_order_and_are_capped(rates):
+    resp = rates(RoleEnum.teacher, 7, course_ids=[2, 1, 2])
+    assert resp.status_code == 200
+    assert [(r["course_id"], r["present"], r["late"], r["rate"]) for r in resp.json()] == [(2, 1, 1, 0.5), (1, 1, 0, 1.0)]
+    assert rates(RoleEnum.teacher, 7, course_ids=[1, 2, 3]).status_code == 400
+
+
+def test_defaults_list_taught_or_all_courses(rates):
+    assert [r["course_id"] for r in rates(RoleEnum.teacher, 7).json()] == [2, 3]
+    assert rates(RoleEnum.teacher, 8).json() == []
+    everything = rates(RoleEnum.admin)  # more courses than PAGE_SIZE_MAX
+    assert everything.status_code == 200
+    assert [(r["course_id"], r["total"]) for r in everything.json()] == [(1, 1), (2, 2), (3, 1)]
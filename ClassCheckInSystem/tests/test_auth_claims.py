@@ -0,0 +1,16 @@
+import pytest
+from fastapi import HTTPException
+from backend.app.auth import create_access_token, get_token_user
+from backend.app.models import RoleEnum
+
+
+def test_token_user_from_claims_only():
+    token = create_access_token({"sub": "s001", "uid": 3, "role": RoleEnum.student.value, "sid": 1})
+    user = get_token_user(token)
+    assert (user.user_id, user.username, user.role, user.student_id, user.teacher_id) == (3, "s001", RoleEnum.student, 1, None)
+
+
+def test_token_without_claims_is_rejected():
+    with pytest.raises(HTTPException) as exc:
+        get_token_user(create_access_token({"sub": "s001", "role": RoleEnum.student.value}))
+    assert exc.value.status_code == 401
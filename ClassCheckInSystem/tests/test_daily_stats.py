@@ -0,0 +1,68 @@
+from datetime import date, datetime
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import sessionmaker
+from backend.app.database import Base
+from backend.app.models import AttendanceRecord, RecordStatus, RollupState
+from backend.app.services import daily_stats
+
+
+def _add(db, course_id, class_id, status, day):
+    db.execute(insert(AttendanceRecord), [{"course_id": course_id, "class_id": class_id, "student_id": 1, "status": status, "sign_time": datetime(2024, 3, day, 8)}])
+    db.commit()
+
+
+def test_rollup_plus_tail_matches_records(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    _add(db, 1, 1, RecordStatus.present, 1)
+    _add(db, 1, None, RecordStatus.late, 1)
+    daily_stats.refresh(db)
+    daily_stats.refresh(db)  # the second run folds what the first one saw
+    _add(db, 1, 1, RecordStatus.present, 2)  # still in the tail
+    _add(db, 2, 3, RecordStatus.absent, 2)
+
+    by_day = daily_stats.rollup_counts(db, ["stat_date"], date(2024, 3, 1), date(2024, 3, 2), course_ids=[1])
+    assert by_day[(date(2024, 3, 1),)] == {"present": 1, "late": 1, "absent": 0, "leave": 0}
+    assert by_day[(date(2024, 3, 2),)]["present"] == 1
+
+    daily_stats.refresh(db)
+    daily_stats.refresh(db)
+    by_class = daily_stats.rollup_counts(db, ["course_id", "class_id"])
+    assert by_class == {
+        (1, 0): {"present": 0, "late": 1, "absent": 0, "leave": 0},
+        (1, 1): {"present": 2, "late": 0, "absent": 0, "leave": 0},
+        (2, 3): {"present": 0, "late": 0, "absent": 1, "leave": 0},
+    }
+    assert daily_stats.rebuild(db) == 4
+    assert daily_stats.rollup_counts(db, ["course_id", "class_id"]) == by_class
+
+
+def test_late_commit_below_watermark_is_refolded(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'late.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    now = datetime.utcnow()
+    row = {"course_id": 1, "class_id": 1, "student_id": 1, "status": RecordStatus.present, "sign_time": now}
+    db.execute(insert(AttendanceRecord), [{**row, "record_id": 1}, {**row, "record_id": 3}])
+    db.commit()
+    daily_stats.refresh(db)
+    daily_stats.refresh(db)
+    # id 2 was taken before id 3 but its transaction commits only now
+    db.execute(insert(AttendanceRecord), [{**row, "record_id": 2}])
+    db.commit()
+    daily_stats.refresh(db)
+    assert daily_stats.rollup_counts(db, ["course_id"])[(1,)]["present"] == 2
+
+    daily_stats.refold_recent(db, 1)
+    assert daily_stats.rollup_counts(db, ["course_id"])[(1,)]["present"] == 3
+
+
+def test_rollup_counts_does_not_write_state(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ro.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    _add(db, 1, 1, RecordStatus.present, 1)
+    assert daily_stats.rollup_counts(db, ["course_id"]) == {(1,): {"present": 1, "late": 0, "absent": 0, "leave": 0}}
+    assert not db.new and not db.dirty
+    assert db.scalar(select(func.count()).select_from(RollupState)) == 0
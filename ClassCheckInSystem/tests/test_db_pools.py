@@ -0,0 +1,19 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from backend.app.database import apply_statement_timeout, is_statement_timeout, timed_pool
+from backend.app import metrics
+
+SLOW = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x+1 FROM c WHERE x < 100000000) SELECT count(*) FROM c"
+
+
+def test_statement_timeout_interrupts_and_can_be_lifted(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=timed_pool("test"), pool_size=1, max_overflow=0)
+    apply_statement_timeout(engine, 100)
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError) as exc:
+            conn.execute(text(SLOW)).scalar()
+        assert is_statement_timeout(exc.value)
+        quick = text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x+1 FROM c WHERE x < 1000) SELECT count(*) FROM c")
+        assert conn.execute(quick.execution_options(timeout_ms=0)).scalar() == 1000
+    assert metrics.latency("db.pool.test.checkout_wait").snapshot()["count"] >= 1
@@ -0,0 +1,25 @@
+import csv
+import io
+import json
+from datetime import datetime
+from backend.app.services.export import csv_chunk, csv_header, ndjson_chunk
+
+
+ROWS = [
+    (1, 2, 3, "Present", "QRCode", datetime(2024, 3, 1, 8, 0, 5)),
+    (2, 2, 4, "Absent", None, None),
+]
+
+
+def test_csv_chunks_parse_back():
+    parsed = list(csv.reader(io.StringIO((csv_header() + csv_chunk(ROWS)).decode())))
+    assert parsed[0] == ["record_id", "course_id", "student_id", "status", "sign_method", "sign_time"]
+    assert parsed[1] == ["1", "2", "3", "Present", "QRCode", "2024-03-01 08:00:05"]
+    assert parsed[2] == ["2", "2", "4", "Absent", "", ""]
+
+
+def test_ndjson_one_object_per_line():
+    lines = ndjson_chunk(ROWS).decode().splitlines()
+    assert [json.loads(line)["record_id"] for line in lines] == [1, 2]
+    assert json.loads(lines[0])["sign_time"] == "2024-03-01T08:00:05"
+    assert json.loads(lines[1])["sign_method"] is None
@@ -0,0 +1,56 @@
+import time
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from backend.app.database import Base
+from backend.app.models import AttendanceRecord, RecordStatus
+from backend.app.services import export_jobs
+from backend.app.services.export_jobs import JOB_STALE_SECONDS, ExportJobs, describe_job, get_export_job, result_key
+
+
+PARAMS = {"start": "2024-01-01T00:00:00", "end": "2024-12-31T23:59:59", "course_id": 3, "status": None, "format": "csv"}
+
+
+def test_result_key_follows_params_and_watermark():
+    key = result_key(PARAMS, (100, 5000))
+    assert key == result_key(dict(reversed(PARAMS.items())), (100, 5000))
+    assert key != result_key(PARAMS, (101, 5001))
+    assert key != result_key({**PARAMS, "format": "xlsx"}, (100, 5000))
+
+
+def test_running_job_reports_eta():
+    job = {"status": "running", "format": "csv", "rows_total": "1000", "rows_done": "250", "started_at": str(time.time() - 10), "updated_at": str(time.time() - 1)}
+    info = describe_job("j1", job)
+    assert info["progress"] == 0.25
+    assert 25 <= info["eta_seconds"] <= 35
+
+
+def test_job_without_heartbeat_is_reported_lost():
+    stale = str(time.time() - JOB_STALE_SECONDS - 1)
+    for status in ("queued", "running"):
+        info = describe_job("j1", {"status": status, "format": "csv", "rows_total": "1000", "rows_done": "250", "started_at": stale, "updated_at": stale})
+        assert info["status"] == "failed"
+        assert info["error"].startswith("lost")
+        assert info["eta_seconds"] is None
+    done = describe_job("j2", {"status": "done", "format": "csv", "rows_total": "5", "rows_done": "5", "size": "10", "updated_at": stale})
+    assert done["status"] == "done"
+
+
+def test_running_build_keeps_queued_jobs_alive(tmp_path, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(AttendanceRecord), [{"course_id": 1, "student_id": 1, "status": RecordStatus.present, "sign_time": datetime(2024, 3, 1)}])
+    monkeypatch.setattr(export_jobs, "redis_client", fakeredis.FakeRedis(decode_responses=True))
+    monkeypatch.setattr(export_jobs, "ReadSessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(export_jobs.settings, "export_dir", str(tmp_path / "exports"))
+    stale = time.time() - JOB_STALE_SECONDS - 1
+    export_jobs.redis_client.hset("export_job:waiting", mapping={"status": "queued", "format": "csv", "rows_total": 1, "rows_done": 0, "updated_at": stale})
+
+    jobs = ExportJobs(1)
+    jobs._queued.add("waiting")  # submitted on this worker, behind the build below
+    jobs._build("building", "csv", [], str(tmp_path / "exports" / "out.csv"))
+    assert get_export_job("building")["status"] == "done"
+    assert describe_job("waiting", get_export_job("waiting"))["status"] == "queued"
@@ -0,0 +1,44 @@
+import json
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.app.database import Base
+from backend.app.models import Classroom, CourseRoom
+from backend.app.schemas import ClassroomCreate
+from backend.app.services.geofence import Fence, GeofenceIndex, build_index, haversine_m
+
+
+def test_haversine_matches_known_distance():
+    # one degree of latitude is ~111.2 km
+    assert abs(haversine_m(30.0, 114.0, 31.0, 114.0) - 111195) < 50
+
+
+def test_course_fences_circle_and_polygon():
+    circle = Fence(1, "A101", 30.5, 114.4, 100)
+    square = Fence(2, "B202", 30.6, 114.5, 0, polygon=[[114.499, 30.599], [114.501, 30.599], [114.501, 30.601], [114.499, 30.601]])
+    index = GeofenceIndex([circle, square], [(10, 1), (20, 2)])
+
+    assert index.match_course(10, 30.5005, 114.4) is circle
+    assert index.match_course(10, 30.51, 114.4) is None
+    assert index.match_course(20, 30.6, 114.5) is square
+    assert index.match_course(20, 30.5, 114.4) is None
+    assert index.fences_for_course(99) == []
+
+
+def test_bad_polygons_are_rejected_and_skipped(tmp_path):
+    with pytest.raises(ValidationError):
+        ClassroomCreate(room_name="A", lng=114.5, lat=30.6, polygon=[[114.5]])
+    with pytest.raises(ValidationError):
+        ClassroomCreate(room_name="A", lng=114.5, lat=30.6, polygon=[[114.5, 30.6], [114.6, 30.6]])
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'fence.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(Classroom(room_name="bad", lng=114.5, lat=30.6, polygon=json.dumps([[114.5]])))
+    db.add(Classroom(room_name="ok", lng=114.4, lat=30.5, radius_m=100))
+    db.add_all([CourseRoom(course_id=1, room_id=1), CourseRoom(course_id=2, room_id=2)])
+    db.commit()
+    index = build_index(db)
+    assert index.fences_for_course(1) == []
+    assert index.match_course(2, 30.5, 114.4).room_id == 2
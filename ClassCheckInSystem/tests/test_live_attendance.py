@@ -0,0 +1,40 @@
+import json
+import pytest
+from backend.app.services import live_attendance
+from backend.app.services.live_attendance import MARK_LUA, bitmap_to_ids, bits_key, events_channel, ids_to_bitmap, live_counts, roster_key
+
+
+def test_bitmap_uses_redis_bit_order():
+    # SETBIT key 0 1 sets the high bit of the first byte
+    assert ids_to_bitmap([0]) == b"\x80"
+    assert ids_to_bitmap([1, 9]) == b"\x40\x40"
+    assert ids_to_bitmap([]) == b""
+
+
+def test_bitmap_roundtrip():
+    ids = [3, 17, 18, 4096]
+    assert bitmap_to_ids(ids_to_bitmap(ids)) == ids
+    assert bitmap_to_ids(None) == []
+
+
+def test_counts_only_roster_students():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeRedis()
+    redis.set("qrsess:course:1", "s1")
+    redis.set(roster_key("s1"), ids_to_bitmap([1, 2, 3]))
+    redis.set(bits_key("s1"), ids_to_bitmap([2, 3, 40]))  # 40 is not on the roster
+    events = redis.pubsub(ignore_subscribe_messages=True)
+    events.subscribe(events_channel("s1"))
+
+    mark = redis.register_script(MARK_LUA)
+    mark(keys=["qrsess:course:1"], args=[1, 60])
+    mark(keys=["qrsess:course:1"], args=[41, 60])
+    messages = [events.get_message(timeout=0.1) for _ in range(4)]
+    published = [json.loads(m["data"]) for m in messages if m is not None]
+    assert [(e["student_id"], e["signed"]) for e in published] == [(1, 3)]
+
+    live_attendance.redis_client, original = redis, live_attendance.redis_client
+    try:
+        assert live_counts("s1") == {"signed": 3, "roster": 3, "rate": 1.0}
+    finally:
+        live_attendance.redis_client = original
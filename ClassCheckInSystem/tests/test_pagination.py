@@ -0,0 +1,14 @@
+import pytest
+from fastapi import HTTPException
+from backend.app.deps.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(123456789)) == 123456789
+
+
+@pytest.mark.parametrize("cursor", ["zzz", encode_cursor(1)[:-2], "eyJrIjogIjEifQ"])
+def test_bad_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400
@@ -0,0 +1,9 @@
+from backend.app.services.passwords import make_context
+
+
+def test_hash_with_other_cost_is_rehashed():
+    old = make_context(4).hash("pass123")
+    ok, new_hash = make_context(5).verify_and_update("pass123", old)
+    assert ok and new_hash.startswith("$2b$05$")
+    assert make_context(5).verify_and_update("pass123", new_hash) == (True, None)
+    assert make_context(5).verify_and_update("wrong", old) == (False, None)
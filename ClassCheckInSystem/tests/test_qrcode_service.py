@@ -0,0 +1,69 @@
+import time
+import pytest
+from backend.app.services import qrcode_service
+from backend.app.services.qrcode_service import (
+    QRResult, check_qr_tokens, close_qr_session, current_session_token, generate_qr_token,
+    open_qr_session, release_qr_tokens, verify_qr_token,
+)
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(qrcode_service, "redis_client", redis)
+    return redis
+
+
+def test_signed_token_roundtrip():
+    token = generate_qr_token(7)
+    claims = verify_qr_token(token)
+    assert claims is not None
+    assert claims["course_id"] == 7
+    assert claims["expires_at"] > claims["issued_at"]
+
+
+def test_signed_token_rejects_tampering_and_expiry():
+    token = generate_qr_token(7, ttl_seconds=60)
+    assert verify_qr_token(token.replace("QR2.7.", "QR2.8.", 1)) is None
+    assert verify_qr_token(token[:-2] + "xx") is None
+    claims = verify_qr_token(token)
+    assert verify_qr_token(token, now=claims["expires_at"]) is None
+
+
+def test_non_ascii_tokens_are_invalid(fake_redis):
+    token = generate_qr_token(7)
+    assert verify_qr_token(token[:-1] + "签") is None
+    assert check_qr_tokens([(token[:-1] + "签", 7, 1, None), ("QS:abc:1:签到", 7, 1, None)]) == [QRResult.invalid, QRResult.invalid]
+
+
+def test_same_second_tokens_do_not_collide():
+    assert generate_qr_token(1) != generate_qr_token(1)
+
+
+def test_session_token_rotates_and_is_single_use_per_student(fake_redis):
+    session_id = open_qr_session(5, rotate_seconds=30)
+    token = current_session_token(session_id)["qr_token"]
+    now = time.time()
+    assert check_qr_tokens([(token, 5, 1, now), (token, 5, 2, now), (token, 5, 1, now)]) == [QRResult.ok, QRResult.ok, QRResult.duplicate]
+    # the previous window is still accepted, older ones are not
+    assert check_qr_tokens([(token, 5, 3, now + 30)]) == [QRResult.ok]
+    assert check_qr_tokens([(token, 5, 4, now + 90)]) == [QRResult.invalid]
+    assert check_qr_tokens([(token, 6, 5, now)]) == [QRResult.invalid]
+    assert check_qr_tokens([(token.replace(":", ":x", 1), 5, 5, now)]) == [QRResult.invalid]
+
+    release_qr_tokens([(token, 1)])
+    assert check_qr_tokens([(token, 5, 1, now)]) == [QRResult.ok]
+
+    newer = open_qr_session(5)
+    close_qr_session(session_id, 5)
+    assert fake_redis.get("qrsess:course:5") == newer  # closing an older session keeps the newer one
+    close_qr_session(newer, 5)
+    assert fake_redis.get("qrsess:course:5") is None
+    assert current_session_token(session_id) is None
+    assert check_qr_tokens([(token, 5, 6, now)]) == [QRResult.invalid]
+
+
+def test_open_session_rejects_non_positive_rotation(fake_redis):
+    with pytest.raises(ValueError):
+        open_qr_session(5, rotate_seconds=0)
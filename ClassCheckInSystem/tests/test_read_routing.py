@@ -0,0 +1,42 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from backend.app.deps import read_routing
+
+
+class _Markers:
+    def __init__(self):
+        self.keys = set()
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def set(self, key, value, ex=None):
+        self.keys.add(key)
+
+    def execute(self):
+        pass
+
+    def exists(self, key):
+        return key in self.keys
+
+
+def _db_path(session_gen):
+    db = next(session_gen)
+    try:
+        return db.get_bind().url.database
+    finally:
+        session_gen.close()
+
+
+def test_student_reads_follow_their_writes(tmp_path, monkeypatch):
+    primary = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path / 'primary.db'}"))
+    replica = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path / 'replica.db'}"))
+    monkeypatch.setattr(read_routing, "SessionLocal", primary)
+    monkeypatch.setattr(read_routing, "ReadSessionLocal", replica)
+    monkeypatch.setattr(read_routing, "redis_client", _Markers())
+    monkeypatch.setattr(read_routing.settings, "read_db_url", f"sqlite:///{tmp_path / 'replica.db'}")
+
+    assert _db_path(read_routing.get_student_read_db(7)).endswith("replica.db")
+    read_routing.note_writes([7])
+    assert _db_path(read_routing.get_student_read_db(7)).endswith("primary.db")
+    assert _db_path(read_routing.get_student_read_db(8)).endswith("replica.db")
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from backend.app.database import Base
+from backend.app.models import Class, Student
+from backend.app.services import roster_import
+from backend.app.services.roster_import import RosterError, import_roster, read_roster, validate_roster
+
+
+def test_validate_roster_reports_rows():
+    data = "学号,姓名,班级,密码\n1,a,c,p1\n1,b,c,p2\n,x,c,p3\n2,,c,2\n3,y,c,\n".encode()
+    with pytest.raises(RosterError) as exc:
+        validate_roster(read_roster(data, "r.csv"))
+    assert [(e["row"], e["error"]) for e in exc.value.errors] == [
+        (1, "学号重复"), (2, "学号重复"), (3, "username 不能为空"), (4, "name 不能为空"),
+        (4, "password 不能与学号相同"), (5, "password 不能为空"),
+    ]
+
+
+def test_validate_roster_requires_passwords():
+    with pytest.raises(RosterError, match="password"):
+        validate_roster(read_roster("学号,姓名,班级\n1,a,c\n".encode(), "r.csv"))
+    df = validate_roster(read_roster("学号,姓名,班级,年级,密码\n 2024001 ,小明,计科2401,2024, Init#42 \n".encode(), "r.csv"))
+    assert df.loc[0, "username"] == "2024001"
+    assert df.loc[0, "password"] == "Init#42"
+    assert df.loc[0, "grade"] == 2024
+
+
+def test_xls_is_rejected():
+    with pytest.raises(RosterError):
+        read_roster(b"\xd0\xcf\x11\xe0", "r.xls")
+
+
+def test_import_roster_chunks_and_resumes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'roster.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+
+    def roster(n):
+        rows = "".join(f"2024{i:03d},s{i},计科{2401 + i % 2},pw{i}\n" for i in range(n))
+        return validate_roster(read_roster(("学号,姓名,班级,密码\n" + rows).encode(), "r.csv"))
+
+    calls = []
+    first = import_roster(roster(5), rounds=4, chunk_size=2, workers=1, progress=lambda done, total: calls.append((done, total)), session_factory=factory)
+    assert first == {"rows": 5, "inserted": 5, "skipped": 0, "classes": 2}
+    assert calls == [(0, 5), (2, 5), (4, 5), (5, 5)]
+
+    again = import_roster(roster(7), rounds=4, chunk_size=2, workers=1, session_factory=factory)
+    assert again == {"rows": 7, "inserted": 2, "skipped": 5, "classes": 2}
+    with factory() as db:
+        assert db.scalar(select(func.count(Student.student_id))) == 7
+        assert db.scalar(select(func.count(Class.class_id))) == 2
+
+
+def test_second_import_is_refused_while_one_runs(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(roster_import, "redis_client", fakeredis.FakeRedis(decode_responses=True))
+    roster_import.redis_client.set(roster_import.LOCK_KEY, "other")
+    with pytest.raises(roster_import.ImportBusy):
+        roster_import.start_import_job(validate_roster(read_roster("学号,姓名,班级,密码\n1,a,c,p\n".encode(), "r.csv")))
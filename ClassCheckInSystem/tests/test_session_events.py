@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from backend.app.main import app
+from backend.app.auth import create_access_token
+from backend.app.database import Base, get_db
+from backend.app.deps.read_routing import get_student_read_db
+from backend.app.models import Class, ClassCourse, RoleEnum, Student, UserBase
+from backend.app.routers import teacher
+from backend.app.services import absentee, live_attendance, qrcode_service
+from backend.app.services.live_attendance import MARK_LUA, events_channel, init_session, mark_signed
+from backend.app.services.qrcode_service import open_qr_session
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'events.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.execute(insert(Class), [{"class_id": 1, "class_name": "c1"}])
+        db.execute(insert(ClassCourse), [{"class_id": 1, "course_id": 1}])
+        db.execute(insert(UserBase), [{"user_id": i, "username": f"s{i}", "name": f"s{i}", "role": RoleEnum.student, "password": "-"} for i in (1, 2, 3)])
+        db.execute(insert(Student), [{"student_id": i, "user_base_id": i, "class_id": 1} for i in (1, 2, 3)])
+        db.commit()
+
+    def db():
+        with factory() as s:
+            yield s
+
+    server = fakeredis.FakeServer()
+    redis = fakeredis.FakeRedis(server=server, decode_responses=True)
+    raw = fakeredis.FakeRedis(server=server)
+    async_redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    for module in (qrcode_service, live_attendance, absentee):
+        monkeypatch.setattr(module, "redis_client", redis)
+    for module in (live_attendance, absentee):
+        monkeypatch.setattr(module, "raw_redis_client", raw)
+    for module in (qrcode_service, live_attendance, teacher):
+        monkeypatch.setattr(module, "async_redis_client", async_redis)
+    monkeypatch.setattr(live_attendance, "_mark", redis.register_script(MARK_LUA))
+    monkeypatch.setitem(app.dependency_overrides, get_db, db)
+    monkeypatch.setitem(app.dependency_overrides, get_student_read_db, db)
+
+    session_id = open_qr_session(1)
+    with factory() as s:
+        init_session(s, session_id, 1)
+    token = create_access_token({"sub": "t1", "uid": 9, "role": RoleEnum.teacher.value, "tid": 1})
+    return session_id, redis, TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+
+def _parse(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.split("\n\n"):
+        lines = [line for line in block.split("\n") if line and not line.startswith(":")]
+        if lines:
+            fields = dict(line.split(": ", 1) for line in lines)
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def _stream_while(session_id, redis, client, actions) -> str:
+    """Read the session's SSE feed to its end while ``actions`` run once the feed is subscribed."""
+    def run():
+        deadline = time.monotonic() + 5
+        while redis.pubsub_numsub(events_channel(session_id))[0][1] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        actions()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    try:
+        resp = client.get(f"/teacher/session/{session_id}/events")
+    finally:
+        thread.join()
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    return resp.text
+
+
+def test_events_snapshot_signin_and_closed(session):
+    session_id, redis, client = session
+
+    def sign_and_close():
+        mark_signed(1, 2)
+        assert client.post(f"/teacher/session/{session_id}/close").status_code == 200
+
+    events = _parse(_stream_while(session_id, redis, client, sign_and_close))
+    assert [name for name, _ in events] == ["snapshot", "signin", "closed"]
+    assert events[0][1] == {"session_id": session_id, "signed": 0, "roster": 3, "rate": 0.0}
+    assert events[1][1] == {"type": "signin", "student_id": 2, "delta": 1, "signed": 1}
+    assert events[2][1]["absent_inserted"] == 2
+
+
+def test_absent_rows_show_in_personal_records(session):
+    session_id, _, client = session
+    assert client.post(f"/teacher/session/{session_id}/close").json()["absent_inserted"] == 3
+    token = create_access_token({"sub": "s3", "uid": 3, "role": RoleEnum.student.value, "sid": 3})
+    resp = TestClient(app, headers={"Authorization": f"Bearer {token}"}).get("/student/record/personal", params={"student_id": 3})
+    assert resp.status_code == 200, resp.text
+    assert [(r["status"], r["sign_method"]) for r in resp.json()["items"]] == [("Absent", None)]
+
+
+def test_unknown_session_is_404(session):
+    _, _, client = session
+    assert client.get("/teacher/session/nope/events").status_code == 404
+
+
+class _Recorded:
+    """Stands in for ``requests.Session`` by replaying a captured response body."""
+
+    def __init__(self, body: str):
+        self.body = body
+
+    def get(self, url, **kwargs):
+        assert kwargs["stream"] is True
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.body.split("\n"))
+
+
+def test_frontend_parser_reads_the_feed(session):
+    pytest.importorskip("requests")
+    pytest.importorskip("streamlit")
+    from frontend.utils.api_client import APIClient
+
+    session_id, redis, client = session
+    body = _stream_while(session_id, redis, client, lambda: (mark_signed(1, 1), client.post(f"/teacher/session/{session_id}/close")))
+    api = APIClient()
+    api.session = _Recorded(": keepalive\n\n" + body)
+    events = list(api.stream_session_events(session_id))
+    assert [name for name, _ in events] == ["snapshot", "signin", "closed"]
+    assert events[1][1]["student_id"] == 1
+    assert events[2][1]["signed"] == 1
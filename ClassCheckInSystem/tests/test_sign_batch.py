@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from backend.app.main import app
+from backend.app.auth import create_access_token
+from backend.app.config import settings
+from backend.app.database import Base, get_db
+from backend.app.models import AttendanceRecord, RoleEnum
+from backend.app.routers import student
+from backend.app.services import qrcode_service
+from backend.app.services.geofence import Fence, GeofenceIndex
+from backend.app.services.qrcode_service import generate_qr_token, verify_qr_token
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'batch.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+
+    def db():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setitem(app.dependency_overrides, get_db, db)
+    monkeypatch.setattr(qrcode_service, "redis_client", redis)
+    monkeypatch.setattr(student, "mark_signed_many", lambda pairs: None)
+    monkeypatch.setattr(student, "get_geofence_index", lambda: GeofenceIndex([Fence(1, "A101", 30.5, 114.4, 100)], [(1, 1)]))
+    token = create_access_token({"sub": "t1", "uid": 1, "role": RoleEnum.teacher.value, "tid": 1})
+    client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+
+    def post(items):
+        resp = client.post("/student/sign/batch", json=items)
+        assert resp.status_code == 200, resp.text
+        return resp.json()
+
+    def count():
+        with engine.connect() as conn:
+            return conn.execute(select(func.count(AttendanceRecord.record_id))).scalar()
+
+    return post, count, redis
+
+
+def test_retried_batch_returns_the_stored_records(batch):
+    post, count, _ = batch
+    scanned_at = (datetime.utcnow() - timedelta(seconds=30)).isoformat()
+    items = [
+        {"course_id": 1, "student_id": 1, "qr_token": generate_qr_token(1), "sign_time": scanned_at},
+        {"course_id": 1, "student_id": 2, "sign_method": "Location", "lng": 114.4, "lat": 30.5, "sign_time": scanned_at},
+    ]
+    first = post(items)
+    assert [r["ok"] for r in first] == [True, True]
+    again = post(items)
+    assert [(r["ok"], r["record_id"]) for r in again] == [(r["ok"], r["record_id"]) for r in first]
+    assert count() == 2
+
+
+def test_used_token_is_kept_for_the_whole_upload_window(batch):
+    post, count, redis = batch
+    token = generate_qr_token(1, ttl_seconds=60)
+    first = post([{"course_id": 1, "student_id": 1, "qr_token": token}])
+    assert first[0]["ok"]
+    nonce = verify_qr_token(token)["nonce"]
+    assert redis.ttl(f"qr:used:{nonce}") > settings.signin_batch_max_age_seconds
+
+    replay = post([{"course_id": 1, "student_id": 2, "qr_token": token, "sign_time": (datetime.utcnow() - timedelta(seconds=5)).isoformat()}])
+    assert replay[0] == {"index": 0, "ok": False, "record_id": None, "error": "二维码无效或过期"}
+    assert count() == 1
+
+
+def test_batch_rejects_stale_duplicate_and_unknown_items(batch):
+    post, count, _ = batch
+    too_old = (datetime.utcnow() - timedelta(seconds=settings.signin_batch_max_age_seconds + 60)).isoformat()
+    results = post([
+        {"course_id": 1, "student_id": 1, "sign_method": "Location", "lng": 114.4, "lat": 30.5, "sign_time": too_old},
+        {"course_id": 1, "student_id": 2, "sign_method": "Location", "lng": 114.4, "lat": 30.5},
+        {"course_id": 1, "student_id": 2, "sign_method": "Location", "lng": 114.4, "lat": 30.5},
+        {"course_id": 1, "student_id": 3, "sign_method": "Makeup"},
+    ])
+    assert [r["error"] for r in results] == ["签到时间超出补传期限", None, "重复签到", "不支持的签到方式"]
+    assert count() == 1
+
+
+def test_rows_that_were_not_stored_are_reported_as_failed(batch, monkeypatch):
+    post, count, _ = batch
+    token = generate_qr_token(1)
+    real_insert = student.insert_records_ignoring_duplicates
+    monkeypatch.setattr(student, "insert_records_ignoring_duplicates", lambda db, rows: 0)
+    assert post([{"course_id": 1, "student_id": 1, "qr_token": token}])[0] == {"index": 0, "ok": False, "record_id": None, "error": "写入失败"}
+    monkeypatch.setattr(student, "insert_records_ignoring_duplicates", real_insert)
+    # the token was released, so the retry goes through
+    assert post([{"course_id": 1, "student_id": 1, "qr_token": token}])[0]["ok"]
+    assert count() == 1
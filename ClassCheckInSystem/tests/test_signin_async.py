@@ -0,0 +1,75 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+from backend.app.main import app
+from backend.app.auth import create_access_token
+from backend.app.database import Base, get_async_db
+from backend.app.models import AttendanceRecord, RoleEnum, SignMethod
+from backend.app.routers import student
+from backend.app.services import qrcode_service
+from backend.app.services.qrcode_service import current_session_token, generate_qr_token, open_qr_session
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def sign(tmp_path, monkeypatch):
+    path = tmp_path / "async.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    # NullPool: TestClient runs each request on its own event loop
+    sessions = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool), expire_on_commit=False)
+
+    async def db():
+        async with sessions() as session:
+            yield session
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setitem(app.dependency_overrides, get_async_db, db)
+    monkeypatch.setattr(qrcode_service, "redis_client", fakeredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(qrcode_service, "async_redis_client", fakeredis.FakeAsyncRedis(server=server, decode_responses=True))
+
+    async def no_mark(course_id, student_id):
+        pass
+
+    monkeypatch.setattr(student, "mark_signed_async", no_mark)
+
+    def post(path, student_id=1, **params):
+        token = create_access_token({"sub": f"s{student_id}", "uid": student_id, "role": RoleEnum.student.value, "sid": student_id})
+        client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+        return client.post(path, params={"course_id": 1, "student_id": student_id, **params})
+
+    def records():
+        with engine.connect() as conn:
+            return conn.execute(select(AttendanceRecord.student_id, AttendanceRecord.sign_method)).all()
+
+    return post, records
+
+
+def test_qr_signin_is_stored_once(sign):
+    post, records = sign
+    token = generate_qr_token(1)
+    first = post("/student/sign/qrcode/verify", qr_token=token)
+    assert first.status_code == 200 and first.json()["record_id"]
+    assert post("/student/sign/qrcode/verify", qr_token=token).json()["detail"] == "二维码无效或过期"
+
+    session_token = current_session_token(open_qr_session(1))["qr_token"]
+    assert post("/student/sign/qrcode/verify", student_id=2, qr_token=session_token).status_code == 200
+    assert post("/student/sign/qrcode/verify", student_id=2, qr_token=session_token).json()["detail"] == "本节课已签到"
+    assert sorted(records()) == [(1, SignMethod.qrcode), (2, SignMethod.qrcode)]
+
+
+def test_location_signin_and_ownership(sign, monkeypatch):
+    post, records = sign
+    # without registered rooms, client coordinates are only trusted behind the flag
+    assert post("/student/sign/location", lng=114.4101, lat=30.5101, room_lng=114.41, room_lat=30.51).json()["detail"] == "该课程未登记教室位置"
+    monkeypatch.setattr(student.settings, "geofence_client_fallback", True)
+    near = post("/student/sign/location", lng=114.4101, lat=30.5101, room_lng=114.41, room_lat=30.51)
+    assert near.status_code == 200 and near.json()["distance_m"] < 50
+    assert post("/student/sign/location", lng=115.0, lat=30.5, room_lng=114.41, room_lat=30.51).status_code == 400
+    token = create_access_token({"sub": "s1", "uid": 1, "role": RoleEnum.student.value, "sid": 1})
+    other = TestClient(app, headers={"Authorization": f"Bearer {token}"}).post("/student/sign/location", params={"course_id": 1, "student_id": 2, "lng": 114.41, "lat": 30.51, "room_lng": 114.41, "room_lat": 30.51})
+    assert other.status_code == 403
+    assert records() == [(1, SignMethod.location)]
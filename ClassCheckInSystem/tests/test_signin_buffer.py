@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from backend.app.database import Base
+from backend.app.models import AttendanceRecord, RecordStatus, SignMethod
+from backend.app.crud.attendance import record_values
+from backend.app.services.signin_buffer import BufferClosed, SignInBuffer, SignInFailed
+
+
+def test_buffer_flushes_batches_and_drains_on_stop(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'buf.db'}")
+    Base.metadata.create_all(engine)
+    buf = SignInBuffer(max_rows=50, max_delay_ms=20, session_factory=sessionmaker(bind=engine))
+    buf.start()
+
+    def sign(i):
+        values = record_values(course_id=1, student_id=i, status=RecordStatus.present, method=SignMethod.qrcode)
+        return buf.submit(values).result(timeout=5)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        ids = list(pool.map(sign, range(120)))
+    buf.stop()
+
+    assert len(set(ids)) == 120
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count(AttendanceRecord.record_id))).scalar() == 120
+
+
+def test_failed_flush_and_stopped_buffer_are_reported(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'missing.db'}")  # no tables: every insert fails
+    buf = SignInBuffer(max_rows=10, max_delay_ms=10, session_factory=sessionmaker(bind=engine))
+    buf.start()
+    values = record_values(course_id=1, student_id=1, status=RecordStatus.present, method=SignMethod.qrcode)
+    with pytest.raises(SignInFailed):
+        buf.submit(values).result(timeout=5)
+    buf.stop()
+    with pytest.raises(BufferClosed):
+        buf.submit(values)
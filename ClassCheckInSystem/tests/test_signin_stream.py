@@ -0,0 +1,47 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from backend.app.database import Base
+from backend.app.models import AttendanceRecord, RecordStatus, SignMethod
+from backend.app.crud.attendance import record_values
+from backend.app.services.signin_stream import decode_signin, encode_signin
+from backend.app import signin_worker
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def test_encode_decode_roundtrip():
+    values = record_values(course_id=3, student_id=9, status=RecordStatus.late, method=SignMethod.location, lng="114.1", lat="30.5", sign_time=datetime(2024, 3, 1, 8, 5))
+    fields = encode_signin(values)
+    assert all(isinstance(v, str) for v in fields.values())
+    assert "remark" not in fields
+    assert decode_signin(fields) == {**values, "class_id": None}
+
+
+def test_worker_skips_redelivered_entries_and_dead_letters(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stream.db'}")
+    Base.metadata.create_all(engine)
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(signin_worker, "redis_client", redis)
+    monkeypatch.setattr(signin_worker, "SessionLocal", sessionmaker(bind=engine))
+    worker = signin_worker.SignInWorker("w1", batch_size=10, block_ms=1)
+    worker.ensure_group()
+    for student_id in range(3):
+        values = record_values(course_id=1, student_id=student_id, status=RecordStatus.present, method=SignMethod.qrcode)
+        redis.xadd(worker.stream, encode_signin(values))
+
+    entries = redis.xreadgroup(worker.group, worker.consumer, {worker.stream: ">"}, count=10)[0][1]
+    worker.process(entries)
+    worker.process(entries)  # redelivered after a crash between COMMIT and XACK
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count(AttendanceRecord.record_id))).scalar() == 3
+        keys = set(conn.scalars(select(AttendanceRecord.sign_key)))
+    assert keys == {entry_id for entry_id, _ in entries}
+    assert redis.xpending(worker.stream, worker.group)["pending"] == 0
+
+    poison = redis.xadd(worker.stream, {"course_id": "x"})
+    redis.xreadgroup(worker.group, worker.consumer, {worker.stream: ">"}, count=10)
+    worker.dead_letter([poison])
+    assert [fields["source_id"] for _, fields in redis.xrange(worker.dead_stream)] == [poison]
+    assert redis.xpending(worker.stream, worker.group)["pending"] == 0
@@ -0,0 +1,62 @@
+import time
+import pytest
+from backend.app.models import RoleEnum, UserBase
+from backend.app.services.user_cache import UserCache
+
+
+def _user(i: int) -> UserBase:
+    return UserBase(user_id=i, username=f"u{i}", name=f"n{i}", role=RoleEnum.student, password="-")
+
+
+def test_lru_eviction_and_invalidation():
+    cache = UserCache(max_size=2, ttl_seconds=60)
+    cache.put(_user(1))
+    cache.put(_user(2))
+    assert cache.get("u1").name == "n1"
+    cache.put(_user(3))  # evicts u2, the least recently used
+    assert cache.get("u2") is None
+    cache.invalidate_local(user_id=1)
+    assert cache.get("u1") is None
+    assert cache.get("u3").user_id == 3
+
+
+def test_entries_expire():
+    cache = UserCache(max_size=10, ttl_seconds=0)
+    cache.put(_user(1))
+    assert cache.get("u1") is None
+    assert cache.size() == 0
+
+
+def test_malformed_invalidations_are_skipped():
+    cache = UserCache(max_size=10, ttl_seconds=60)
+    cache.put(_user(1))
+    cache.put(_user(2))
+    for data in ["not json", "[1, 2]", "null", '{"user_id": 1}']:
+        cache._handle({"type": "message", "data": data})
+    assert cache.get("u1") is None
+    assert cache.get("u2").user_id == 2
+
+
+def test_listener_survives_bad_payloads(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    from backend.app import redis_client
+    from backend.app.services.user_cache import INVALIDATE_CHANNEL
+
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client, "redis_client", redis)
+    cache = UserCache(max_size=10, ttl_seconds=60)
+    cache.start()
+    try:
+        deadline = time.monotonic() + 5
+        while redis.pubsub_numsub(INVALIDATE_CHANNEL)[0][1] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        cache.put(_user(1))
+        cache.put(_user(2))
+        redis.publish(INVALIDATE_CHANNEL, "not json")
+        redis.publish(INVALIDATE_CHANNEL, '{"user_id": 1}')
+        while cache.get("u1") is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.get("u1") is None
+        assert cache.get("u2").user_id == 2
+    finally:
+        cache.stop()